@@ -1,3 +1,35 @@
+"""
+Celery application for ai_interviewee.
+
+Tasks are routed to two dedicated queues (see CELERY_TASK_ROUTES in settings):
+
+extraction
+    ``process_document_task``, CPU-bound text extraction and chunking, and
+    ``dispatch_documents_task``, which hands out ingestion slots whose
+    leases expired. Run on
+    a prefork pool with one process per core, reserving one task at a time:
+
+        celery -A ai_interviewee worker -Q extraction -P prefork \\
+            --prefetch-multiplier 1 -n extraction@%h -l info
+
+    Leaving out ``--concurrency`` sizes the pool to the number of cores.
+
+embedding
+    ``generate_document_embeddings_task``, ``generate_embedding_task`` and
+    ``reembed_chunks_task``, which re-embeds chunks for an embedding
+    migration. These spend nearly all their time waiting on the OpenAI API, so run them
+    on a thread pool with high concurrency and a deeper prefetch:
+
+        celery -A ai_interviewee worker -Q embedding -P threads \\
+            --concurrency 32 --prefetch-multiplier 4 -n embedding@%h -l info
+
+    The shared rate limiter keeps the combined request rate of every
+    embedding worker within the OpenAI limits, so concurrency can be raised
+    freely.
+
+Anything else lands on the ``default`` queue, which either worker can also
+consume by adding it to ``-Q``.
+"""
 import os
 
 from celery import Celery
@@ -0,0 +1,361 @@
+"""
+Local stand-in for the parts of the OpenAI API the app uses, for tests and
+offline runs. Point an OpenAI client at ``server.base_url``:
+
+    with FakeOpenAIServer() as server:
+        client = openai.OpenAI(api_key='test', base_url=server.base_url)
+
+Embeddings are deterministic pseudo-random unit vectors seeded by the text,
+so the same text always gets the same vector, and chat completions echo the
+question. Model endpoints can be given a latency and a request rate limit,
+past which they answer 429 with a Retry-After header like the real
+API. Batches run the requests in their input file once they have been
+polled ``batch_polls`` times.
+"""
+import email.parser
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+def fake_embedding(text: str, dimensions: int) -> List[float]:
+    """Unit-length vector that depends only on the text and size"""
+    rng = random.Random(hashlib.sha256(text.encode('utf-8')).digest())
+    vector = [rng.gauss(0, 1) for _ in range(dimensions)]
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector]
+
+
+class FakeOpenAIServer:
+    """
+    Threaded HTTP server implementing ``/v1/embeddings``,
+    ``/v1/chat/completions``, ``/v1/files`` and ``/v1/batches``, with
+    everything kept in memory.
+
+    Args:
+        dimensions: Size of the embeddings returned when a request doesn't
+            ask for ``dimensions``.
+        batch_polls: Times a batch is reported in progress before it completes.
+        failing_requests: ``custom_id``s of batch requests that fail with a 400.
+        embedding_latency: Seconds every embeddings request takes.
+        chat_latency: Seconds every chat completion takes.
+        jitter: Random extra latency, as a fraction of the latency.
+        rate_limit: Requests the model endpoints accept in any
+            ``rate_limit_window`` before answering 429. None never limits.
+        rate_limit_window: Length of the rate-limit window in seconds.
+        seed: Seed for the jitter.
+    """
+
+    MODEL_PATHS = ('/v1/embeddings', '/v1/chat/completions')
+
+    def __init__(
+        self,
+        dimensions: int = 1536,
+        batch_polls: int = 1,
+        failing_requests: Optional[set] = None,
+        embedding_latency: float = 0.0,
+        chat_latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limit: Optional[int] = None,
+        rate_limit_window: float = 60.0,
+        seed: int = 0,
+    ) -> None:
+        self.dimensions = dimensions
+        self.batch_polls = batch_polls
+        self.failing_requests = set(failing_requests or ())
+        self.latency = {'/v1/embeddings': embedding_latency, '/v1/chat/completions': chat_latency}
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.rng = random.Random(seed)
+        self.files: Dict[str, dict] = {}
+        self.batches: Dict[str, dict] = {}
+        self.requests: List[str] = []
+        self.rate_limited = 0
+        self.recent = deque()
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def start(self) -> 'FakeOpenAIServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> 'FakeOpenAIServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    # Endpoints: each returns (status, JSON-serializable body or raw bytes)
+
+    def embeddings(self, body: dict):
+        inputs = body.get('input')
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        if not inputs or any(not isinstance(text, str) or not text for text in inputs):
+            return 400, _error("'input' must be a non-empty string or list of strings")
+        dimensions = body.get('dimensions') or self.dimensions
+        return 200, {
+            'object': 'list',
+            'model': body.get('model', ''),
+            'data': [
+                {'object': 'embedding', 'index': index, 'embedding': fake_embedding(text, dimensions)}
+                for index, text in enumerate(inputs)
+            ],
+            'usage': {
+                'prompt_tokens': sum(len(text.split()) for text in inputs),
+                'total_tokens': sum(len(text.split()) for text in inputs),
+            },
+        }
+
+    def chat_completion(self, body: dict):
+        messages = body.get('messages') or []
+        if not messages:
+            return 400, _error("'messages' must be a non-empty list")
+        question = next(
+            (message.get('content') or '' for message in reversed(messages) if message.get('role') == 'user'), ''
+        )
+        content = f"Synthetic answer to: {question}"
+        prompt_tokens = sum(len(str(message.get('content') or '').split()) for message in messages)
+        return 200, {
+            'id': f'chatcmpl-{uuid.uuid4().hex}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', ''),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': len(content.split()),
+                'total_tokens': prompt_tokens + len(content.split()),
+            },
+        }
+
+    def create_file(self, fields: dict, content: bytes, filename: str):
+        file_id = f'file-{uuid.uuid4().hex}'
+        self.files[file_id] = {
+            'id': file_id,
+            'object': 'file',
+            'bytes': len(content),
+            'created_at': int(time.time()),
+            'filename': filename,
+            'purpose': fields.get('purpose', 'batch'),
+            'content': content,
+        }
+        return 200, self._file_object(file_id)
+
+    def create_batch(self, body: dict):
+        if body.get('input_file_id') not in self.files:
+            return 404, _error("No such file")
+        batch_id = f'batch_{uuid.uuid4().hex}'
+        self.batches[batch_id] = {
+            'id': batch_id,
+            'object': 'batch',
+            'endpoint': body.get('endpoint'),
+            'input_file_id': body['input_file_id'],
+            'completion_window': body.get('completion_window', '24h'),
+            'status': 'validating',
+            'output_file_id': None,
+            'error_file_id': None,
+            'created_at': int(time.time()),
+            'request_counts': {'total': 0, 'completed': 0, 'failed': 0},
+            'metadata': body.get('metadata'),
+            'polls': 0,
+        }
+        return 200, self._batch_object(batch_id)
+
+    def retrieve_batch(self, batch_id: str):
+        batch = self.batches.get(batch_id)
+        if batch is None:
+            return 404, _error("No such batch")
+        if batch['status'] in ('validating', 'in_progress'):
+            batch['polls'] += 1
+            batch['status'] = 'in_progress'
+            if batch['polls'] > self.batch_polls:
+                self._run_batch(batch)
+        return 200, self._batch_object(batch_id)
+
+    def cancel_batch(self, batch_id: str):
+        batch = self.batches.get(batch_id)
+        if batch is None:
+            return 404, _error("No such batch")
+        if batch['status'] in ('validating', 'in_progress'):
+            batch['status'] = 'cancelled'
+        return 200, self._batch_object(batch_id)
+
+    def file_content(self, file_id: str):
+        if file_id not in self.files:
+            return 404, _error("No such file")
+        return 200, self.files[file_id]['content']
+
+    def _run_batch(self, batch: dict) -> None:
+        output, errors = [], []
+        for line in self.files[batch['input_file_id']]['content'].decode('utf-8').splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            if request['custom_id'] in self.failing_requests:
+                status, body = 400, _error("Request failed")
+            elif request.get('url') != batch['endpoint']:
+                status, body = 400, _error("Request URL doesn't match the batch endpoint")
+            else:
+                status, body = self.embeddings(request.get('body') or {})
+            record = {
+                'id': f'batch_req_{uuid.uuid4().hex}',
+                'custom_id': request['custom_id'],
+                'response': {'status_code': status, 'request_id': uuid.uuid4().hex, 'body': body},
+                'error': None,
+            }
+            (output if status == 200 else errors).append(json.dumps(record))
+
+        for lines, key in ((output, 'output_file_id'), (errors, 'error_file_id')):
+            if lines:
+                _, file_object = self.create_file(
+                    {'purpose': 'batch_output'}, ('\n'.join(lines) + '\n').encode('utf-8'), f'{batch["id"]}.jsonl'
+                )
+                batch[key] = file_object['id']
+        batch['request_counts'] = {
+            'total': len(output) + len(errors),
+            'completed': len(output),
+            'failed': len(errors),
+        }
+        batch['status'] = 'completed'
+
+    def _admit(self, path: str) -> Optional[float]:
+        """
+        Count a model request against the rate limit and pick its latency.
+
+        Returns:
+            Seconds until the request would be accepted if it is over the
+            limit, otherwise None after sleeping for the endpoint's latency.
+        """
+        with self.lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                while self.recent and now - self.recent[0] >= self.rate_limit_window:
+                    self.recent.popleft()
+                if len(self.recent) >= self.rate_limit:
+                    self.rate_limited += 1
+                    return self.rate_limit_window - (now - self.recent[0])
+                self.recent.append(now)
+            latency = self.latency.get(path, 0.0)
+            if latency and self.jitter:
+                latency *= 1 + self.rng.random() * self.jitter
+        if latency:
+            time.sleep(latency)
+        return None
+
+    def _file_object(self, file_id: str) -> dict:
+        return {key: value for key, value in self.files[file_id].items() if key != 'content'}
+
+    def _batch_object(self, batch_id: str) -> dict:
+        return {key: value for key, value in self.batches[batch_id].items() if key != 'polls'}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            routes = [
+                ('POST', r'/v1/embeddings', lambda handler, raw: server.embeddings(_json(raw))),
+                ('POST', r'/v1/chat/completions', lambda handler, raw: server.chat_completion(_json(raw))),
+                ('POST', r'/v1/files', lambda handler, raw: server.create_file(*handler.multipart(raw))),
+                ('GET', r'/v1/files/(?P<id>[^/]+)/content', lambda handler, raw, id: server.file_content(id)),
+                ('POST', r'/v1/batches', lambda handler, raw: server.create_batch(_json(raw))),
+                ('GET', r'/v1/batches/(?P<id>[^/]+)', lambda handler, raw, id: server.retrieve_batch(id)),
+                ('POST', r'/v1/batches/(?P<id>[^/]+)/cancel', lambda handler, raw, id: server.cancel_batch(id)),
+            ]
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                self.dispatch('GET')
+
+            def do_POST(self):
+                self.dispatch('POST')
+
+            def dispatch(self, method):
+                path = self.path.split('?', 1)[0]
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                with server.lock:
+                    server.requests.append(f'{method} {path}')
+                for route_method, pattern, view in self.routes:
+                    match = re.fullmatch(pattern, path)
+                    if route_method != method or not match:
+                        continue
+                    if path in server.MODEL_PATHS:
+                        # Model endpoints are stateless, so they run concurrently
+                        retry_after = server._admit(path)
+                        if retry_after is not None:
+                            self.respond(429, _error("Rate limit reached", 'rate_limit_exceeded'),
+                                         {'retry-after': f'{retry_after:.3f}'})
+                            return
+                        status, body = view(self, raw, **match.groupdict())
+                    else:
+                        with server.lock:
+                            status, body = view(self, raw, **match.groupdict())
+                    break
+                else:
+                    status, body = 404, _error(f"No route for {method} {path}")
+                self.respond(status, body)
+
+            def multipart(self, raw):
+                message = email.parser.BytesParser().parsebytes(
+                    f'Content-Type: {self.headers["Content-Type"]}\r\n\r\n'.encode() + raw
+                )
+                fields, content, filename = {}, b'', 'upload.jsonl'
+                for part in message.get_payload():
+                    name = part.get_param('name', header='content-disposition')
+                    if name == 'file':
+                        content = part.get_payload(decode=True)
+                        filename = part.get_filename() or filename
+                    else:
+                        fields[name] = part.get_payload(decode=True).decode('utf-8')
+                return fields, content, filename
+
+            def respond(self, status, body, headers=None):
+                if isinstance(body, bytes):
+                    payload, content_type = body, 'application/octet-stream'
+                else:
+                    payload, content_type = json.dumps(body).encode('utf-8'), 'application/json'
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+
+def _json(raw: bytes) -> dict:
+    return json.loads(raw) if raw else {}
+
+
+def _error(message: str, code: Optional[str] = None) -> dict:
+    return {'error': {'message': message, 'type': 'invalid_request_error', 'code': code}}
@@ -0,0 +1,91 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from ai_interviewee.models import DocumentChunk, EmbeddingMigration
+from ai_interviewee.services import EmbeddingFailed, get_space_embedding_provider
+
+
+class Command(BaseCommand):
+    help = "Generate embeddings for every chunk that is missing one"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owner', type=int, help="Only backfill chunks of this user id")
+        parser.add_argument('--document', help="Only backfill chunks of this document id")
+        parser.add_argument('--page-size', type=int, default=1000,
+                            help="Chunks loaded and saved per page")
+        parser.add_argument('--concurrency', type=int,
+                            help="Embedding requests in flight at once")
+        parser.add_argument('--compact-from-full', action='store_true',
+                            help="Fill compact_embedding by shortening existing full vectors in SQL "
+                                 "instead of calling the API")
+
+    def handle(self, *args, **options):
+        if options['compact_from_full']:
+            return self.compact_from_full(options)
+
+        field, dimensions = DocumentChunk.embedding_storage()
+        queryset = DocumentChunk.objects.filter(**{f'{field}__isnull': True})
+        if options['owner']:
+            queryset = queryset.filter(document__owner_id=options['owner'])
+        if options['document']:
+            queryset = queryset.filter(document_id=options['document'])
+
+        # No max_wait: a backfill simply waits for the shared rate-limit budget
+        space = EmbeddingMigration.active_space()
+        provider = get_space_embedding_provider(
+            space,
+            dimensions=dimensions,
+            max_concurrency=options['concurrency'],
+            max_wait=None,
+        )
+
+        total = 0
+        started = time.monotonic()
+        last_id = None
+        while True:
+            page = queryset.order_by('id')
+            if last_id is not None:
+                page = page.filter(id__gt=last_id)
+            chunks = list(page.only('id', 'content')[:options['page_size']])
+            if not chunks:
+                break
+
+            try:
+                embeddings = provider.embed([chunk.content for chunk in chunks])
+            except EmbeddingFailed as e:
+                # Save the batches that finished, so a re-run skips them
+                done = []
+                for chunk, embedding in zip(chunks, e.embeddings):
+                    if embedding is not None:
+                        chunk.set_embedding(embedding, space, field)
+                        done.append(chunk)
+                DocumentChunk.objects.bulk_update(done, [field, 'embedding_model', 'embedding_version'])
+                raise CommandError(f"Embedding failed after {total + len(done)} chunks: {e.error}")
+            for chunk, embedding in zip(chunks, embeddings):
+                chunk.set_embedding(embedding, space, field)
+            DocumentChunk.objects.bulk_update(chunks, [field, 'embedding_model', 'embedding_version'])
+
+            total += len(chunks)
+            last_id = chunks[-1].id
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"Embedded {total} chunks ({total / elapsed:.1f} chunks/s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled embeddings for {total} chunks"))
+
+    def compact_from_full(self, options):
+        queryset = DocumentChunk.objects.filter(embedding__isnull=False, compact_embedding__isnull=True)
+        if options['owner']:
+            queryset = queryset.filter(document__owner_id=options['owner'])
+        if options['document']:
+            queryset = queryset.filter(document_id=options['document'])
+
+        total = 0
+        while True:
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:options['page_size']])
+            if not ids:
+                break
+            total += DocumentChunk.objects.filter(id__in=ids).update(
+                compact_embedding=DocumentChunk.compact_from('embedding')
+            )
+            self.stdout.write(f"Shortened {total} embeddings")
+
+        self.stdout.write(self.style.SUCCESS(f"Filled compact embeddings for {total} chunks"))
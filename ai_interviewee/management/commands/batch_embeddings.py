@@ -0,0 +1,77 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from ai_interviewee.models import EmbeddingMigration
+from ai_interviewee.services import BatchEmbeddingJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Embed pending chunks through the batch API instead of interactive "
+        "requests. The first run writes request files to the job directory and "
+        "submits them; later runs (or --wait) poll the batches and apply the "
+        "vectors of those that have finished. Use for large backfills and, with "
+        "--migration, for re-embedding into a running migration's target space."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help="Job directory holding request files and progress")
+        parser.add_argument('--owner', type=int, help="Only embed chunks of this user id")
+        parser.add_argument('--document', help="Only embed chunks of this document id")
+        parser.add_argument('--migration', action='store_true',
+                            help="Fill next_embedding for the embedding migration in progress")
+        parser.add_argument('--wait', action='store_true', help="Poll until every batch has been applied")
+        parser.add_argument('--poll-interval', type=float, default=60, help="Seconds between polls with --wait")
+        parser.add_argument('--page-size', type=int, default=1000, help="Chunks saved per bulk update")
+        parser.add_argument('--cancel', action='store_true', help="Cancel the job's unfinished batches")
+
+    def handle(self, *args, **options):
+        job = BatchEmbeddingJob(options['directory'], page_size=options['page_size'])
+
+        if options['cancel']:
+            job.cancel()
+            self.stdout.write(self.style.SUCCESS("Cancelled unfinished batches"))
+            return
+
+        if job.state is None:
+            migration = None
+            if options['migration']:
+                migration = EmbeddingMigration.objects.filter(status__in=['running', 'paused']).first()
+                if migration is None:
+                    raise CommandError("No embedding migration in progress")
+            parts = job.prepare(options['owner'], options['document'], migration)
+            if not parts:
+                self.stdout.write(self.style.SUCCESS("No chunks need embedding"))
+                return
+            self.stdout.write(
+                f"Wrote {sum(part['requests'] for part in parts)} requests for "
+                f"{sum(part['chunks'] for part in parts)} chunks in {len(parts)} batch files"
+            )
+        submitted = job.submit()
+        if submitted:
+            self.stdout.write(f"Submitted {submitted} batches")
+
+        while True:
+            job.poll()
+            try:
+                totals = job.apply()
+            except ValueError as e:
+                raise CommandError(str(e))
+            if totals['embedded'] or totals['failed']:
+                self.stdout.write(f"Applied {totals['embedded']} embeddings, {totals['failed']} chunks failed")
+            if job.finished or not options['wait']:
+                break
+            time.sleep(options['poll_interval'])
+
+        for part in job.parts:
+            self.stdout.write(
+                f"{part['name']}: {part['status']}, {part['embedded']} embedded, {part['failed']} failed"
+            )
+        if job.finished:
+            failed = sum(part['failed'] for part in job.parts)
+            self.stdout.write(self.style.SUCCESS(
+                f"Batch embedding finished: {sum(part['embedded'] for part in job.parts)} chunks embedded"
+                + (f", {failed} failed; start a new job to retry them" if failed else "")
+            ))
+        else:
+            pending = sum(not part['applied'] for part in job.parts)
+            self.stdout.write(f"{pending} batches still running; run again to apply them")
@@ -0,0 +1,46 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.contrib.auth.models import User
+from ai_interviewee.models import Document
+from ai_interviewee.services.chunk_transfer import ChunkExporter
+
+
+class Command(BaseCommand):
+    help = (
+        "Export documents, their chunks and embeddings to a directory: embeddings "
+        "as a .npy matrix, the other columns as JSON Lines, and a manifest with "
+        "checksums. Load the export with import_chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Directory to write the export to")
+        parser.add_argument('--owner', help="Only export documents of this user id, username or email")
+        parser.add_argument('--document', action='append', help="Only export this document id (repeatable)")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Rows fetched per query")
+
+    def handle(self, *args, **options):
+        documents = Document.objects.all()
+        if options['owner']:
+            owner = options['owner']
+            query = Q(username=owner) | Q(email=owner)
+            if owner.isdigit():
+                query |= Q(id=int(owner))
+            user = User.objects.filter(query).first()
+            if user is None:
+                raise CommandError(f"Unknown owner: {owner}")
+            documents = documents.filter(owner=user)
+        if options['document']:
+            documents = documents.filter(id__in=options['document'])
+
+        started = time.monotonic()
+        exporter = ChunkExporter(options['output'], progress=self.progress, batch_size=options['batch_size'])
+        manifest = exporter.export(documents)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {manifest['documents']} documents and {manifest['chunks']} chunks "
+            f"({manifest['embedded_chunks']} embedded) to {options['output']} in {elapsed:.1f}s"
+        ))
+
+    def progress(self, stage, done, total):
+        self.stdout.write(f"{stage}: {done}/{total}")
@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from ai_interviewee.services.chunk_transfer import ChunkImporter
+
+
+class Command(BaseCommand):
+    help = (
+        "Import an export_chunks directory with binary COPY. Checksums are checked "
+        "before loading, and counts and a sample of chunks are verified before the "
+        "single import transaction commits. The document files themselves must "
+        "already be in storage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help="Directory written by export_chunks")
+        parser.add_argument('--owner-id', type=int, help="Give every document this owner")
+        parser.add_argument('--replace', action='store_true',
+                            help="Delete existing documents with the same ids, and their chunks, first")
+        parser.add_argument('--verify-sample', type=int, default=1000,
+                            help="Chunks compared with the export after loading (0 to only check counts)")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        importer = ChunkImporter(
+            options['directory'],
+            owner_id=options['owner_id'],
+            replace=options['replace'],
+            verify_sample=options['verify_sample'],
+            progress=self.progress,
+        )
+        try:
+            counts = importer.run()
+        except (ValueError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported and verified {counts['documents']} documents and {counts['chunks']} chunks "
+            f"in {elapsed:.1f}s ({counts['chunks'] / max(elapsed, 1e-9):.0f} chunks/s)"
+        ))
+
+    def progress(self, stage, done, total):
+        self.stdout.write(f"{stage}: {done}/{total}")
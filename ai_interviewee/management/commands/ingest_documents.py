@@ -0,0 +1,158 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from ai_interviewee.models import Document, DocumentChunk, EmbeddingMigration
+from ai_interviewee.services import get_space_embedding_provider
+from ai_interviewee.services.bulk_ingestion import (
+    BulkIngestor, IngestionCheckpoint, entries_from_directory, entries_from_manifest, prepare_file,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Ingest documents from disk without going through the upload API: every "
+        "supported file in a directory (for one owner) or every file listed in a "
+        "JSON Lines or CSV manifest. Extraction and chunking run in a process pool, "
+        "rows are bulk-inserted a batch at a time with their embeddings, and "
+        "progress is checkpointed so an interrupted run can be resumed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Directory to walk, or a .jsonl/.csv manifest")
+        parser.add_argument('--owner', help="User id, username or email owning every file (directory only)")
+        parser.add_argument('--document-type', default='other', choices=[choice for choice, _ in Document.DOCUMENT_TYPES],
+                            help="Type of every document (directory only)")
+        parser.add_argument('--tags', default='', help="Comma-separated tags for every document (directory only)")
+        parser.add_argument('--private', action='store_true', help="Make the documents private (directory only)")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Extraction processes")
+        parser.add_argument('--batch-size', type=int, default=50, help="Documents inserted per batch")
+        parser.add_argument('--concurrency', type=int, help="Embedding requests in flight at once")
+        parser.add_argument('--skip-embeddings', action='store_true',
+                            help="Insert chunks without embeddings, to be filled by backfill_embeddings")
+        parser.add_argument('--checkpoint', help="Progress file (default: <source>.ingest-checkpoint.json "
+                                                 "next to a manifest, or in the working directory)")
+        parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint")
+
+    def handle(self, *args, **options):
+        source = Path(options['source']).resolve()
+        if source.is_dir():
+            if not options['owner']:
+                raise CommandError("--owner is required when ingesting a directory")
+            entries = entries_from_directory(
+                source,
+                options['owner'],
+                document_type=options['document_type'],
+                tags=tuple(tag.strip() for tag in options['tags'].split(',') if tag.strip()),
+                is_public=not options['private'],
+            )
+            default_checkpoint = Path.cwd() / f'{source.name}.ingest-checkpoint.json'
+        elif source.is_file():
+            entries = entries_from_manifest(source)
+            default_checkpoint = source.with_name(f'{source.name}.ingest-checkpoint.json')
+        else:
+            raise CommandError(f"{source} does not exist")
+
+        checkpoint_path = Path(options['checkpoint'] or default_checkpoint)
+        if options['restart'] and checkpoint_path.exists():
+            checkpoint_path.unlink()
+        try:
+            checkpoint = IngestionCheckpoint(checkpoint_path, str(source))
+            pending = [entry for entry in entries if entry.path not in checkpoint.done]
+        except ValueError as e:
+            raise CommandError(str(e))
+        if checkpoint.done:
+            self.stdout.write(f"Resuming: {len(checkpoint.done)} files already ingested")
+        if not pending:
+            self.stdout.write(self.style.SUCCESS("Nothing to ingest"))
+            return
+        owners = self.resolve_owners({entry.owner for entry in pending})
+
+        provider = None
+        if not options['skip_embeddings']:
+            _, dimensions = DocumentChunk.embedding_storage()
+            provider = get_space_embedding_provider(
+                EmbeddingMigration.active_space(),
+                dimensions=dimensions,
+                max_concurrency=options['concurrency'],
+                max_wait=None,
+            )
+        ingestor = BulkIngestor(embedding_provider=provider)
+
+        self.totals = {'documents': 0, 'chunks': 0, 'tokens': 0, 'skipped': 0, 'failed': 0}
+        self.started = time.monotonic()
+        batch = []
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for entry, prepared in self.prepare(pool, pending, options['workers'] * 4):
+                if 'error' in prepared:
+                    self.totals['failed'] += 1
+                    self.stderr.write(f"Failed {entry.path}: {prepared['error']}")
+                    checkpoint.record(failed={entry.path: prepared['error']})
+                    continue
+                batch.append((entry, owners[entry.owner], prepared))
+                if len(batch) >= options['batch_size']:
+                    self.write_batch(ingestor, checkpoint, batch)
+                    batch = []
+            if batch:
+                self.write_batch(ingestor, checkpoint, batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested {self.totals['documents']} documents ({self.totals['chunks']} chunks); "
+            f"{self.totals['skipped']} already present, {self.totals['failed']} failed. "
+            f"{self.throughput()}"
+        ))
+        if checkpoint.failed:
+            self.stdout.write(f"{len(checkpoint.failed)} files failed; run again to retry them")
+
+    def resolve_owners(self, owners):
+        """Map every owner given as id, username or email to a user id"""
+        resolved = {}
+        for owner in owners:
+            query = Q(username=owner) | Q(email=owner)
+            if owner.isdigit():
+                query |= Q(id=int(owner))
+            user = User.objects.filter(query).order_by('id').first()
+            if user is None:
+                raise CommandError(f"Unknown owner: {owner}")
+            resolved[owner] = user.id
+        return resolved
+
+    def prepare(self, pool, entries, max_pending):
+        """
+        Yield (entry, prepared file) as pool workers finish, keeping at most
+        ``max_pending`` files in flight so memory stays bounded however slowly
+        batches are written.
+        """
+        entries = iter(entries)
+        futures = {}
+        while True:
+            for entry in entries:
+                futures[pool.submit(prepare_file, entry.path)] = entry
+                if len(futures) >= max_pending:
+                    break
+            if not futures:
+                return
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield futures.pop(future), future.result()
+
+    def write_batch(self, ingestor, checkpoint, batch):
+        stats = ingestor.write_batch(batch)
+        checkpoint.record(done=[entry.path for entry, _, _ in batch])
+        for name, count in stats.items():
+            self.totals[name] += count
+        self.stdout.write(
+            f"{self.totals['documents']} documents, {self.totals['chunks']} chunks. {self.throughput()}"
+        )
+
+    def throughput(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return (
+            f"{self.totals['documents'] / elapsed:.1f} documents/s, "
+            f"{self.totals['chunks'] / elapsed:.1f} chunks/s, "
+            f"{self.totals['tokens'] / elapsed:.0f} tokens/s"
+        )
@@ -0,0 +1,20 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ai_interviewee.models import ExtractedText
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete cached extracted text that hasn't been used for a while, and "
+        "entries from older extraction versions. Run it periodically, e.g. daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help="Delete entries unused for this many days (default EXTRACTED_TEXT_MAX_AGE_DAYS)")
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.EXTRACTED_TEXT_MAX_AGE_DAYS
+        deleted = ExtractedText.prune(timedelta(days=days))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} cached extracted texts unused for {days} days"))
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from ai_interviewee.models import EmbeddingMigration
+from ai_interviewee.services import embedding_provider_class
+from ai_interviewee.tasks import reembed_chunks_task, generate_document_embeddings_task
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage background re-embedding of every chunk into a new embedding "
+        "model or pipeline version. The target model must produce vectors of "
+        "the same size as DocumentChunk.embedding."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['start', 'status', 'pause', 'resume', 'cut-over', 'cancel'])
+        parser.add_argument('--model', help="Target embedding model (start only)")
+        parser.add_argument('--target-version', type=int, default=1, help="Target pipeline version (start only)")
+        parser.add_argument('--provider',
+                            help="Embedding provider that serves the target model (start only). "
+                                 "Defaults to EMBEDDING_PROVIDER")
+        parser.add_argument('--no-auto-cut-over', action='store_true',
+                            help="Wait for 'cut-over' instead of switching as soon as coverage reaches 100%%")
+
+    def handle(self, *args, **options):
+        action = options['action']
+
+        if action == 'start':
+            if not options['model']:
+                raise CommandError("--model is required to start a migration")
+            if EmbeddingMigration.objects.filter(status__in=['running', 'paused', 'completed']).exists():
+                raise CommandError("Another embedding migration is in progress; cancel it first")
+            provider = options['provider'] or settings.EMBEDDING_PROVIDER
+            try:
+                embedding_provider_class(provider)
+            except ValueError as e:
+                raise CommandError(str(e))
+            migration = EmbeddingMigration.objects.create(
+                target_model=options['model'],
+                target_version=options['target_version'],
+                target_provider=provider,
+                auto_cut_over=not options['no_auto_cut_over'],
+            )
+            reembed_chunks_task.delay(migration.id)
+            self.stdout.write(self.style.SUCCESS(
+                f"Started embedding migration {migration.id} to {provider} model {migration.target_model}"
+            ))
+            return
+
+        migration = EmbeddingMigration.objects.exclude(status__in=['cut_over', 'cancelled']).first()
+        if migration is None:
+            active = EmbeddingMigration.active_space()
+            self.stdout.write(f"No embedding migration in progress. Active space: {active.model} v{active.version}")
+            return
+
+        if action == 'status':
+            self.stdout.write(
+                f"Migration {migration.id} to {migration.target_model} v{migration.target_version}: "
+                f"{migration.status}, {migration.processed_count} chunks re-embedded, "
+                f"{migration.coverage():.1%} coverage"
+            )
+        elif action == 'pause':
+            migration.status = 'paused'
+            migration.save(update_fields=['status', 'updated_at'])
+            self.stdout.write(self.style.SUCCESS(f"Paused embedding migration {migration.id}"))
+        elif action == 'resume':
+            migration.status = 'running'
+            migration.save(update_fields=['status', 'updated_at'])
+            reembed_chunks_task.delay(migration.id)
+            self.stdout.write(self.style.SUCCESS(f"Resumed embedding migration {migration.id}"))
+        elif action == 'cut-over':
+            try:
+                stale_documents = migration.cut_over()
+            except ValueError as e:
+                raise CommandError(f"{e} ({migration.coverage():.1%} coverage)")
+            for document_id in stale_documents:
+                generate_document_embeddings_task.delay(document_id)
+            self.stdout.write(self.style.SUCCESS(
+                f"Cut over to {migration.target_model} v{migration.target_version}"
+            ))
+        elif action == 'cancel':
+            migration.status = 'cancelled'
+            migration.save(update_fields=['status', 'updated_at'])
+            self.stdout.write(self.style.SUCCESS(f"Cancelled embedding migration {migration.id}"))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from ai_interviewee.models import DocumentChunk
+from ai_interviewee.models.document_chunk import VECTOR_INDEXES
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the HNSW index the configured RAG_RETRIEVAL_STRATEGY and "
+        "EMBEDDING_STORAGE search, without locking the table. Run it after "
+        "changing either setting. Every HNSW index slows down chunk writes, "
+        "so --drop-unused removes the ones retrieval no longer needs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drop-unused', action='store_true',
+                            help="Drop HNSW indexes the configured retrieval doesn't search")
+
+    def handle(self, *args, **options):
+        table = DocumentChunk._meta.db_table
+        with connection.cursor() as cursor:
+            existing = set(connection.introspection.get_constraints(cursor, table))
+            # A failed concurrent build leaves an invalid index behind
+            cursor.execute(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE i.indrelid = %s::regclass AND NOT i.indisvalid",
+                [table],
+            )
+            invalid = {name for name, in cursor.fetchall()}
+        wanted = DocumentChunk.vector_index()
+
+        # CONCURRENTLY can't run inside a transaction
+        with connection.schema_editor(atomic=False) as schema_editor:
+            if wanted is None:
+                self.stdout.write("The configured retrieval strategy doesn't use an HNSW index")
+            elif wanted.name in existing and wanted.name not in invalid:
+                self.stdout.write(f"{wanted.name} already exists")
+            else:
+                if wanted.name in invalid:
+                    schema_editor.remove_index(DocumentChunk, wanted, concurrently=True)
+                self.stdout.write(f"Building {wanted.name}...")
+                schema_editor.add_index(DocumentChunk, wanted, concurrently=True)
+                self.stdout.write(self.style.SUCCESS(f"Built {wanted.name}"))
+
+            if options['drop_unused']:
+                for index in VECTOR_INDEXES.values():
+                    if index is not wanted and index.name in existing:
+                        schema_editor.remove_index(DocumentChunk, index, concurrently=True)
+                        self.stdout.write(self.style.SUCCESS(f"Dropped {index.name}"))
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:10
+
+from django.db import migrations, models
+import pgvector.django.vector
+
+
+def label_existing_embeddings(apps, schema_editor):
+    # Every vector stored so far came from text-embedding-3-small
+    DocumentChunk = apps.get_model('ai_interviewee', 'DocumentChunk')
+    DocumentChunk.objects.filter(embedding__isnull=False).update(
+        embedding_model='text-embedding-3-small',
+        embedding_version=1,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interviewee', '0006_userprofile_career_start_date_userprofile_skills'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingMigration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_model', models.CharField(max_length=100)),
+                ('target_version', models.PositiveSmallIntegerField()),
+                ('status', models.CharField(choices=[('running', 'Running'), ('paused', 'Paused'), ('completed', 'Completed'), ('cut_over', 'Cut over'), ('cancelled', 'Cancelled')], default='running', max_length=20)),
+                ('auto_cut_over', models.BooleanField(default=True)),
+                ('cursor', models.UUIDField(blank=True, null=True)),
+                ('processed_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('cut_over_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='documentchunk',
+            name='embedding_model',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='documentchunk',
+            name='embedding_version',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='documentchunk',
+            name='next_embedding',
+            field=pgvector.django.vector.VectorField(blank=True, dimensions=1536, null=True),
+        ),
+        migrations.AddField(
+            model_name='documentchunk',
+            name='next_embedding_model',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='documentchunk',
+            name='next_embedding_version',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='documentchunk',
+            index=models.Index(fields=['embedding_model', 'embedding_version'], name='ai_intervie_embeddi_b6b757_idx'),
+        ),
+        migrations.RunPython(label_existing_embeddings, migrations.RunPython.noop),
+    ]
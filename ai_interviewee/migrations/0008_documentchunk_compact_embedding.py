@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:12
+
+from django.db import migrations
+import pgvector.django.halfvec
+import pgvector.django.indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interviewee', '0007_embedding_versioning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentchunk',
+            name='compact_embedding',
+            field=pgvector.django.halfvec.HalfVectorField(blank=True, dimensions=512, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='documentchunk',
+            index=pgvector.django.indexes.HnswIndex(ef_construction=64, fields=['compact_embedding'], m=16, name='chunk_compact_embedding_hnsw', opclasses=['halfvec_l2_ops']),
+        ),
+    ]
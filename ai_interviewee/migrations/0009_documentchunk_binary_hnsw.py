@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:15
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.functions.comparison
+import pgvector.django.bit
+import pgvector.django.indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interviewee', '0008_documentchunk_compact_embedding'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documentchunk',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast(models.Func(models.F('embedding'), function='binary_quantize'), output_field=pgvector.django.bit.BitField(length=1536)), name='bit_hamming_ops'), ef_construction=64, m=16, name='chunk_embedding_binary_hnsw'),
+        ),
+        migrations.AddIndex(
+            model_name='documentchunk',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast(models.Func(models.F('compact_embedding'), function='binary_quantize'), output_field=pgvector.django.bit.BitField(length=512)), name='bit_hamming_ops'), ef_construction=64, m=16, name='chunk_compact_binary_hnsw'),
+        ),
+    ]
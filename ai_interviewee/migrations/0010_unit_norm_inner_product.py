@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:18
+
+from django.db import migrations, models
+import pgvector.django.indexes
+
+
+# Scale stored vectors to unit length before the checks are added; zero
+# vectors can't be normalized, so they are cleared for re-embedding
+NORMALIZE_EXISTING_VECTORS = """
+UPDATE ai_interviewee_documentchunk
+SET embedding = NULL, embedding_model = '', embedding_version = NULL
+WHERE vector_norm(embedding) = 0;
+UPDATE ai_interviewee_documentchunk SET compact_embedding = NULL WHERE l2_norm(compact_embedding) = 0;
+UPDATE ai_interviewee_documentchunk SET next_embedding = NULL WHERE vector_norm(next_embedding) = 0;
+UPDATE ai_interviewee_documentchunk SET embedding = l2_normalize(embedding) WHERE embedding IS NOT NULL;
+UPDATE ai_interviewee_documentchunk SET compact_embedding = l2_normalize(compact_embedding) WHERE compact_embedding IS NOT NULL;
+UPDATE ai_interviewee_documentchunk SET next_embedding = l2_normalize(next_embedding) WHERE next_embedding IS NOT NULL;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interviewee', '0009_documentchunk_binary_hnsw'),
+    ]
+
+    operations = [
+        migrations.RunSQL(NORMALIZE_EXISTING_VECTORS, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='documentchunk',
+            index=pgvector.django.indexes.HnswIndex(ef_construction=64, fields=['embedding'], m=16, name='chunk_embedding_ip_hnsw', opclasses=['vector_ip_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='documentchunk',
+            index=pgvector.django.indexes.HnswIndex(ef_construction=64, fields=['compact_embedding'], m=16, name='chunk_compact_embedding_ip_hnsw', opclasses=['halfvec_ip_ops']),
+        ),
+        migrations.AddConstraint(
+            model_name='documentchunk',
+            constraint=models.CheckConstraint(check=models.Q(('embedding__isnull', True), ('embedding__norm__range', (0.99, 1.01)), _connector='OR'), name='chunk_embedding_unit_norm'),
+        ),
+        migrations.AddConstraint(
+            model_name='documentchunk',
+            constraint=models.CheckConstraint(check=models.Q(('compact_embedding__isnull', True), ('compact_embedding__norm__range', (0.99, 1.01)), _connector='OR'), name='chunk_compact_embedding_unit_norm'),
+        ),
+        migrations.AddConstraint(
+            model_name='documentchunk',
+            constraint=models.CheckConstraint(check=models.Q(('next_embedding__isnull', True), ('next_embedding__norm__range', (0.99, 1.01)), _connector='OR'), name='chunk_next_embedding_unit_norm'),
+        ),
+    ]
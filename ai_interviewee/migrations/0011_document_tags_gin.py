@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:20
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interviewee', '0010_unit_norm_inner_product'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tags'], name='document_tags_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interviewee', '0011_document_tags_gin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='processing_stats',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interviewee', '0013_documentchunk_near_duplicates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentchunk',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        # Hash existing chunks the same way as chunk_sync.content_hash
+        migrations.RunSQL(
+            "UPDATE ai_interviewee_documentchunk "
+            "SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='documentchunk',
+            index=models.Index(fields=['document', 'content_hash'], name='ai_intervie_documen_ab4a36_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:26
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interviewee', '0014_documentchunk_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('version', models.PositiveSmallIntegerField(default=1)),
+                ('compressed_text', models.BinaryField()),
+                ('text_length', models.PositiveIntegerField()),
+                ('normalization_stats', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='extractedtext',
+            constraint=models.UniqueConstraint(fields=('content_hash', 'version'), name='extracted_text_hash_version_unique'),
+        ),
+    ]
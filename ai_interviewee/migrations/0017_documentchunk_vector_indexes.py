@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:10
+
+from django.conf import settings
+from django.db import migrations
+
+# HNSW index names by (RAG_RETRIEVAL_STRATEGY, EMBEDDING_STORAGE), as of this
+# migration (see VECTOR_INDEXES)
+VECTOR_INDEX_NAMES = {
+    ('inner_product', 'full'): 'chunk_embedding_ip_hnsw',
+    ('inner_product', 'compact'): 'chunk_compact_embedding_ip_hnsw',
+    ('binary_rerank', 'full'): 'chunk_embedding_binary_hnsw',
+    ('binary_rerank', 'compact'): 'chunk_compact_binary_hnsw',
+}
+
+
+def drop_unused_vector_indexes(apps, schema_editor):
+    wanted = VECTOR_INDEX_NAMES.get((settings.RAG_RETRIEVAL_STRATEGY, settings.EMBEDDING_STORAGE))
+    for name in VECTOR_INDEX_NAMES.values():
+        if name != wanted:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}')
+
+
+class Migration(migrations.Migration):
+    """
+    HNSW indexes move out of DocumentChunk.Meta and are built per retrieval
+    strategy and storage with 'manage.py vector_indexes' (see VECTOR_INDEXES).
+
+    The half-precision L2 index isn't searched by any strategy and is dropped.
+    Of the others, the one the configured strategy and storage search is kept
+    in the database, so a deployment doesn't have to rebuild it, and the rest
+    are dropped. Unapplying doesn't rebuild them: run 'manage.py vector_indexes'.
+    """
+
+    dependencies = [
+        ('ai_interviewee', '0016_document_batch'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='documentchunk',
+            name='chunk_compact_embedding_hnsw',
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(drop_unused_vector_indexes, migrations.RunPython.noop),
+            ],
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='documentchunk',
+                    name='chunk_embedding_binary_hnsw',
+                ),
+                migrations.RemoveIndex(
+                    model_name='documentchunk',
+                    name='chunk_compact_binary_hnsw',
+                ),
+                migrations.RemoveIndex(
+                    model_name='documentchunk',
+                    name='chunk_embedding_ip_hnsw',
+                ),
+                migrations.RemoveIndex(
+                    model_name='documentchunk',
+                    name='chunk_compact_embedding_ip_hnsw',
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interviewee', '0017_documentchunk_vector_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='extractedtext',
+            index=models.Index(fields=['last_used_at'], name='ai_intervie_last_us_600f96_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:16
+
+from django.db import migrations, models
+
+
+# Migrations from before embedding providers all targeted OpenAI models
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_interviewee', '0018_extractedtext_last_used_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='embeddingmigration',
+            name='target_provider',
+            field=models.CharField(blank=True, default='openai', max_length=50),
+            preserve_default=False,
+        ),
+    ]
@@ -1,6 +1,9 @@
 from .base_model import BaseModel
 from .user_profile import UserProfile
 from .document import Document
+from .document_batch import DocumentBatch
 from .document_chunk import DocumentChunk
 from .skill import Skill
-from .user_profile_skill import UserProfileSkill
\ No newline at end of file
+from .user_profile_skill import UserProfileSkill
+from .embedding_migration import EmbeddingMigration, EmbeddingSpace
+from .extracted_text import ExtractedText
@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
 from django.contrib.auth.models import User
 import uuid
 from .base_model import BaseModel
@@ -36,10 +37,18 @@ class Document(BaseModel):
     file = models.FileField(upload_to='documents/%Y/%m/%d/')
     file_size = models.PositiveIntegerField(null=True, blank=True)  # in bytes
     mime_type = models.CharField(max_length=100, blank=True)
+    # SHA-256 of the file's bytes (see ExtractedText)
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    # Set for documents uploaded through the bulk upload endpoint
+    batch = models.ForeignKey(
+        'DocumentBatch', on_delete=models.SET_NULL, null=True, blank=True, related_name='documents'
+    )
     
     # Processing status
     processing_status = models.CharField(max_length=20, choices=PROCESSING_STATUS, default='pending')
     processing_error = models.TextField(blank=True, null=True)
+    # Measurements from processing, e.g. what text normalization removed
+    processing_stats = models.JSONField(default=dict, blank=True)
     
     # Metadata
     is_public = models.BooleanField(default=True)  # Whether others can search this document
@@ -55,4 +64,6 @@ class Document(BaseModel):
         indexes = [
             models.Index(fields=['owner', 'processing_status']),
             models.Index(fields=['document_type', 'is_public']),
+            # Tag containment filters (tags @> '["python"]') in retrieval
+            GinIndex(fields=['tags'], name='document_tags_gin', opclasses=['jsonb_path_ops']),
         ]
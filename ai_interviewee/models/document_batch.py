@@ -0,0 +1,34 @@
+import uuid
+from django.contrib.auth.models import User
+from django.db import models
+from django.db.models import Count, Q
+from .base_model import BaseModel
+
+
+class DocumentBatch(BaseModel):
+    """
+    A set of documents uploaded together, e.g. everything a candidate
+    submits during onboarding. Progress is aggregated over the batch's
+    documents rather than stored, so it is never out of date.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='document_batches')
+    # Archive entries that were not ingested, with the reason
+    skipped = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def progress(self):
+        """Document counts by processing status, and the share that is done"""
+        counts = self.documents.aggregate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(processing_status='pending')),
+            processing=Count('id', filter=Q(processing_status='processing')),
+            completed=Count('id', filter=Q(processing_status='completed')),
+            failed=Count('id', filter=Q(processing_status='failed')),
+        )
+        finished = counts['completed'] + counts['failed']
+        counts['percent_complete'] = round(100 * finished / counts['total'], 1) if counts['total'] else 100.0
+        return counts
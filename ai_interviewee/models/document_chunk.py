@@ -1,20 +1,109 @@
+from django.conf import settings
 from django.db import models
-from pgvector.django import VectorField
+from django.db.models import F, FloatField, Func, Q, Transform, Value
+from django.db.models.functions import Cast
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from pgvector.django import VectorField, HalfVectorField, BitField, HnswIndex
 import uuid
 from .base_model import BaseModel
 from .document import Document
 
+
+# Largest deviation from unit length the norm checks allow; loose enough for
+# half-precision rounding
+UNIT_NORM_TOLERANCE = 0.01
+
+
+class VectorNorm(Transform):
+    """``embedding__norm``: Euclidean length of a vector column"""
+    lookup_name = 'norm'
+    function = 'vector_norm'
+    output_field = FloatField()
+
+
+class HalfVectorNorm(VectorNorm):
+    function = 'l2_norm'
+
+
+VectorField.register_lookup(VectorNorm)
+HalfVectorField.register_lookup(HalfVectorNorm)
+
+
+def _binary_hnsw(field_name, dimensions, name):
+    """HNSW index on binary_quantize(field); must match binary_quantized() exactly"""
+    return HnswIndex(
+        OpClass(
+            Cast(Func(F(field_name), function='binary_quantize'), output_field=BitField(length=dimensions)),
+            name='bit_hamming_ops',
+        ),
+        name=name,
+        m=16,
+        ef_construction=64,
+    )
+
+
+# HNSW indexes by (RAG_RETRIEVAL_STRATEGY, EMBEDDING_STORAGE). They aren't in
+# Meta.indexes: every insert or vector update pays for each HNSW index on the
+# table, and a graph over 1536-dimension vectors can be larger than the table
+# itself, so only the ones the configured strategy searches are built, with
+# 'manage.py vector_indexes'. The 'exact' strategy has none: it scans every
+# vector, and an approximate index would make it inexact.
+VECTOR_INDEXES = {
+    ('inner_product', 'full'): HnswIndex(
+        name='chunk_embedding_ip_hnsw', fields=['embedding'], m=16, ef_construction=64,
+        opclasses=['vector_ip_ops'],
+    ),
+    ('inner_product', 'compact'): HnswIndex(
+        name='chunk_compact_embedding_ip_hnsw', fields=['compact_embedding'], m=16, ef_construction=64,
+        opclasses=['halfvec_ip_ops'],
+    ),
+    ('binary_rerank', 'full'): _binary_hnsw('embedding', 1536, 'chunk_embedding_binary_hnsw'),
+    ('binary_rerank', 'compact'): _binary_hnsw('compact_embedding', 512, 'chunk_compact_binary_hnsw'),
+}
+
+
+def unit_norm_check(field_name):
+    """Check constraint condition: the vector is null or unit length"""
+    return Q(**{f'{field_name}__isnull': True}) | Q(**{
+        f'{field_name}__norm__range': (1 - UNIT_NORM_TOLERANCE, 1 + UNIT_NORM_TOLERANCE),
+    })
+
 class DocumentChunk(BaseModel):
     """Represents a chunk of text extracted from a document with its embedding"""
+    # Size of the shortened embeddings kept in compact storage
+    COMPACT_EMBEDDING_DIMENSIONS = 512
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='chunks')
     
     # Content
     content = models.TextField()
+    # SHA-256 of content, to match chunks when a document is replaced
+    content_hash = models.CharField(max_length=64, blank=True, default='')
     chunk_index = models.PositiveIntegerField()  # Order within the document
     
-    # Embedding (using pgvector)
+    # Embedding (using pgvector); always unit length, see set_embedding
     embedding = VectorField(dimensions=1536, blank=True, null=True)  # Adjust dimensions based on your embedding model
+    # Shortened half-precision embedding, used when EMBEDDING_STORAGE = 'compact'
+    compact_embedding = HalfVectorField(dimensions=COMPACT_EMBEDDING_DIMENSIONS, blank=True, null=True)
+    # Model and pipeline version that produced the embedding; only vectors
+    # from the same space may be compared
+    embedding_model = models.CharField(max_length=100, blank=True, default='')
+    embedding_version = models.PositiveSmallIntegerField(null=True, blank=True)
+    
+    # Re-embedding in progress (see EmbeddingMigration)
+    next_embedding = VectorField(dimensions=1536, blank=True, null=True)
+    next_embedding_model = models.CharField(max_length=100, blank=True, default='')
+    next_embedding_version = models.PositiveSmallIntegerField(null=True, blank=True)
+    
+    # Near-duplicate detection (see NearDuplicateDetector): MinHash signature,
+    # its LSH band keys, and the chunk this one nearly duplicates
+    minhash = ArrayField(models.BigIntegerField(), blank=True, null=True)
+    lsh_bands = ArrayField(models.BigIntegerField(), blank=True, default=list)
+    duplicate_of = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='near_duplicates'
+    )
     
     # Metadata
     page_number = models.PositiveIntegerField(null=True, blank=True)
@@ -30,7 +119,70 @@ class DocumentChunk(BaseModel):
         ordering = ['document', 'chunk_index']
         indexes = [
             models.Index(fields=['document', 'chunk_index']),
+            models.Index(fields=['document', 'content_hash']),
+            models.Index(fields=['embedding_model', 'embedding_version']),
+            # Candidate lookup by shared LSH band (lsh_bands && ARRAY[...])
+            GinIndex(fields=['lsh_bands'], name='chunk_lsh_bands_gin'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=unit_norm_check('embedding'), name='chunk_embedding_unit_norm'),
+            models.CheckConstraint(check=unit_norm_check('compact_embedding'), name='chunk_compact_embedding_unit_norm'),
+            models.CheckConstraint(check=unit_norm_check('next_embedding'), name='chunk_next_embedding_unit_norm'),
         ]
         # Add GIN index for vector similarity search
         # You'll need to create this manually via migration:
         # CREATE INDEX CONCURRENTLY ON myapp_documentchunk USING ivfflat (embedding vector_cosine_ops);
+
+    @classmethod
+    def vector_index(cls):
+        """The VECTOR_INDEXES entry the configured retrieval needs, or None"""
+        return VECTOR_INDEXES.get((settings.RAG_RETRIEVAL_STRATEGY, settings.EMBEDDING_STORAGE))
+
+    @classmethod
+    def embedding_storage(cls):
+        """
+        Where vectors live for the configured EMBEDDING_STORAGE.
+
+        Returns:
+            A (field name, dimensions) tuple. Dimensions is what to request
+            from the embedding API, or None for the model's full size.
+        """
+        if settings.EMBEDDING_STORAGE == 'compact':
+            return 'compact_embedding', cls.COMPACT_EMBEDDING_DIMENSIONS
+        return 'embedding', None
+
+    @classmethod
+    def compact_from(cls, field_name):
+        """
+        SQL expression that shortens a full vector column into compact storage.
+
+        Models trained for shortening (text-embedding-3-*) give the same
+        result for a truncated, re-normalized vector as for a request with
+        the ``dimensions`` parameter, so compact vectors can be derived from
+        full ones without calling the API again.
+        """
+        shortened = Func(F(field_name), Value(1), Value(cls.COMPACT_EMBEDDING_DIMENSIONS), function='subvector')
+        return Cast(
+            Func(shortened, function='l2_normalize'),
+            output_field=HalfVectorField(dimensions=cls.COMPACT_EMBEDDING_DIMENSIONS),
+        )
+
+    def set_embedding(self, vector, space, field=None):
+        """
+        Store a new embedding, scaled to unit length, with the space it was
+        produced in.
+
+        Args:
+            vector: The embedding returned by the API.
+            space: The EmbeddingSpace of the model that produced it.
+            field: Storage field to write. Defaults to the configured one.
+        """
+        from ai_interviewee.utils import unit_normalize
+        setattr(self, field or self.embedding_storage()[0], unit_normalize(vector))
+        self.embedding_model, self.embedding_version = space.model, space.version
+
+    def set_next_embedding(self, vector, space):
+        """Store a unit-length embedding in the space a migration is moving to"""
+        from ai_interviewee.utils import unit_normalize
+        self.next_embedding = unit_normalize(vector)
+        self.next_embedding_model, self.next_embedding_version = space.model, space.version
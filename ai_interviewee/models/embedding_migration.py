@@ -0,0 +1,152 @@
+from typing import NamedTuple
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .base_model import BaseModel
+
+
+class EmbeddingSpace(NamedTuple):
+    """
+    The model and pipeline version that produced a set of vectors, and the
+    embedding provider that serves the model (empty for EMBEDDING_PROVIDER).
+    See get_space_embedding_provider.
+    """
+    model: str
+    version: int
+    provider: str = ''
+
+
+class EmbeddingMigration(BaseModel):
+    """
+    Background re-embedding of every chunk into a new embedding space.
+
+    While a migration runs, the new full-size vectors are written to
+    ``DocumentChunk.next_embedding`` and retrieval keeps reading the current
+    vectors. Once every chunk has a vector in the target space, ``cut_over``
+    swaps the columns for all chunks in one transaction and the target becomes
+    the active space. With compact storage, the compact vectors are derived
+    from the new full-size ones during the same update.
+    """
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('paused', 'Paused'),
+        ('completed', 'Completed'),  # 100% coverage, waiting for cut-over
+        ('cut_over', 'Cut over'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    target_model = models.CharField(max_length=100)
+    target_version = models.PositiveSmallIntegerField()
+    # Provider (EMBEDDING_PROVIDERS) that embeds with target_model; empty
+    # means EMBEDDING_PROVIDER
+    target_provider = models.CharField(max_length=50, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    auto_cut_over = models.BooleanField(default=True)
+
+    # Keyset pagination cursor: the last chunk id that was re-embedded
+    cursor = models.UUIDField(null=True, blank=True)
+    processed_count = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    cut_over_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def target_space(self):
+        return EmbeddingSpace(self.target_model, self.target_version, self.target_provider)
+
+    @classmethod
+    def active_space(cls):
+        """
+        The embedding space that queries and newly ingested chunks must use:
+        the target of the latest cut-over migration, or the configured
+        embedding provider's default if no migration has been cut over yet.
+        Once a migration has cut over, its provider keeps serving the space
+        whatever EMBEDDING_PROVIDER says.
+        """
+        latest = cls.objects.filter(status='cut_over').order_by('-cut_over_at').first()
+        if latest:
+            return latest.target_space
+
+        from ai_interviewee.services.embedding_providers import embedding_provider_class
+        provider_class = embedding_provider_class()
+        return EmbeddingSpace(provider_class.DEFAULT_MODEL, provider_class.EMBEDDING_VERSION, provider_class.name)
+
+    def remaining_chunks(self):
+        """
+        Embedded chunks that don't have a vector in the target space yet.
+        Chunks still waiting for their first embedding are left to ingestion,
+        which always embeds in the active space.
+        """
+        from .document_chunk import DocumentChunk
+        field, _ = DocumentChunk.embedding_storage()
+        return DocumentChunk.objects.filter(**{f'{field}__isnull': False}).exclude(
+            next_embedding_model=self.target_model,
+            next_embedding_version=self.target_version,
+        )
+
+    def coverage(self):
+        """Fraction of chunks that have a vector in the target space"""
+        from .document_chunk import DocumentChunk
+        field, _ = DocumentChunk.embedding_storage()
+        total = DocumentChunk.objects.filter(**{f'{field}__isnull': False}).count()
+        if not total:
+            return 1.0
+        return 1 - self.remaining_chunks().count() / total
+
+    def cut_over(self):
+        """
+        Atomically make the target space the active one.
+
+        Every chunk's ``next_embedding`` replaces its ``embedding`` in a single
+        UPDATE, inside the same transaction that marks this migration as cut
+        over, so readers see either the old space or the new one, never a mix.
+
+        Returns:
+            The ids of documents with chunks that were written in the old space
+            after the coverage check and now need embedding again.
+
+        Raises:
+            ValueError: If some chunks don't have a vector in the target space.
+        """
+        from .document_chunk import DocumentChunk
+        field, _ = DocumentChunk.embedding_storage()
+
+        with transaction.atomic():
+            migration = EmbeddingMigration.objects.select_for_update().get(pk=self.pk)
+            if migration.status == 'cut_over':
+                return []
+            if migration.remaining_chunks().exists():
+                raise ValueError("Cannot cut over before every chunk has been re-embedded")
+
+            migrated = Q(next_embedding_model=self.target_model, next_embedding_version=self.target_version)
+            swap = {
+                'embedding': F('next_embedding'),
+                'embedding_model': F('next_embedding_model'),
+                'embedding_version': F('next_embedding_version'),
+                'next_embedding': None,
+                'next_embedding_model': '',
+                'next_embedding_version': None,
+            }
+            if field == 'compact_embedding':
+                swap['compact_embedding'] = DocumentChunk.compact_from('next_embedding')
+            DocumentChunk.objects.filter(migrated).update(**swap)
+
+            # Chunks embedded in the old space since the coverage check would
+            # never match a query again, so drop their vectors for re-embedding
+            stale = DocumentChunk.objects.filter(**{f'{field}__isnull': False}).exclude(
+                embedding_model=self.target_model,
+                embedding_version=self.target_version,
+            )
+            stale_documents = list(stale.order_by().values_list('document_id', flat=True).distinct())
+            stale.update(embedding=None, compact_embedding=None, embedding_model='', embedding_version=None)
+
+            migration.status = 'cut_over'
+            migration.cut_over_at = timezone.now()
+            migration.save(update_fields=['status', 'cut_over_at', 'updated_at'])
+
+        self.refresh_from_db()
+        return stale_documents
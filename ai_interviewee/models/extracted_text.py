@@ -0,0 +1,76 @@
+import zlib
+from django.db import models
+from django.utils import timezone
+from .base_model import BaseModel
+
+
+class ExtractedText(BaseModel):
+    """
+    Normalized text extracted from a file, keyed by the SHA-256 of the file's
+    bytes and stored zlib-compressed.
+
+    Extraction (PDF above all) is the slowest step of ingestion. With this
+    cache, retries, reprocessing with new chunking settings and uploads of
+    a file that was seen before skip it entirely. Entries that haven't been
+    used for a while are deleted by prune().
+    """
+    # Bump when extraction or normalization changes so old entries are ignored
+    VERSION = 1
+
+    content_hash = models.CharField(max_length=64)
+    version = models.PositiveSmallIntegerField(default=VERSION)
+    compressed_text = models.BinaryField()
+    text_length = models.PositiveIntegerField()
+    normalization_stats = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_used_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['content_hash', 'version'], name='extracted_text_hash_version_unique'),
+        ]
+
+    @property
+    def text(self):
+        return zlib.decompress(bytes(self.compressed_text)).decode('utf-8')
+
+    @classmethod
+    def lookup(cls, content_hash):
+        """The cached entry for a file hash, or None"""
+        if not content_hash:
+            return None
+        entry = cls.objects.filter(content_hash=content_hash, version=cls.VERSION).first()
+        if entry:
+            cls.objects.filter(pk=entry.pk).update(last_used_at=timezone.now())
+        return entry
+
+    @classmethod
+    def store(cls, content_hash, text, normalization_stats):
+        """Cache the normalized text of a file, replacing any older entry"""
+        entry, _ = cls.objects.update_or_create(
+            content_hash=content_hash,
+            version=cls.VERSION,
+            defaults={
+                'compressed_text': zlib.compress(text.encode('utf-8'), 6),
+                'text_length': len(text),
+                'normalization_stats': normalization_stats,
+                'last_used_at': timezone.now(),
+            },
+        )
+        return entry
+
+    @classmethod
+    def prune(cls, unused_for):
+        """
+        Delete entries not used within ``unused_for`` (a timedelta), and every
+        entry from an older extraction version, which lookup() never returns.
+
+        Returns:
+            The number of entries deleted.
+        """
+        stale = models.Q(last_used_at__lt=timezone.now() - unused_for) | ~models.Q(version=cls.VERSION)
+        deleted, _ = cls.objects.filter(stale).delete()
+        return deleted
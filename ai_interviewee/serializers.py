@@ -1,10 +1,23 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.core.validators import FileExtensionValidator
-from .models import Document, UserProfile, Skill
+from .models import Document, DocumentBatch, UserProfile, Skill
+from .utils import hash_file
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 
+def file_metadata(file):
+    """
+    Size, MIME type and content hash of an uploaded file. StreamingUploadHandler
+    measures these while the upload streams in; other uploads are hashed here.
+    """
+    return {
+        'file_size': file.size,
+        'mime_type': getattr(file, 'sniffed_content_type', None) or file.content_type or '',
+        'content_hash': getattr(file, 'content_hash', None) or hash_file(file),
+    }
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -70,9 +83,12 @@ class DocumentUploadSerializer(serializers.ModelSerializer):
         )
 
     def validate_file(self, value):
-        # Additional file validation
-        if value.size > 10 * 1024 * 1024:  # 10MB limit
-            raise serializers.ValidationError("File size cannot exceed 10MB")
+        # Additional file validation; StreamingUploadHandler rejects larger
+        # uploads while they stream, this covers other upload handlers
+        if value.size > settings.DOCUMENT_MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError(
+                f"File size cannot exceed {settings.DOCUMENT_MAX_UPLOAD_SIZE // (1024 * 1024)}MB"
+            )
         return value
     
     def create(self, validated_data):
@@ -81,12 +97,80 @@ class DocumentUploadSerializer(serializers.ModelSerializer):
         
         # Extract file metadata
         file = validated_data['file']
-        validated_data['file_size'] = file.size
-        validated_data['mime_type'] = file.content_type or ''
+        validated_data.update(file_metadata(file))
         
         return super().create(validated_data)
 
 
+class DocumentReplaceSerializer(DocumentUploadSerializer):
+    """Uploads a new version of an existing document"""
+
+    class Meta:
+        model = Document
+        fields = ['title', 'file']
+        extra_kwargs = {
+            'title': {'required': False},
+        }
+
+    def update(self, instance, validated_data):
+        file = validated_data['file']
+        validated_data.update(file_metadata(file))
+        validated_data['processing_status'] = 'pending'
+        validated_data['processing_error'] = None
+
+        old_file = instance.file
+        instance = super().update(instance, validated_data)
+        if old_file and old_file.name != instance.file.name:
+            old_file.storage.delete(old_file.name)
+        return instance
+
+
+class DocumentBatchUploadSerializer(serializers.Serializer):
+    """Several documents, or ZIP archives of them, uploaded in one request"""
+    files = serializers.ListField(
+        child=serializers.FileField(),
+        allow_empty=False,
+        help_text='Repeat the field once per file; .zip archives are unpacked',
+    )
+    document_type = serializers.ChoiceField(choices=Document.DOCUMENT_TYPES, default='other')
+    is_public = serializers.BooleanField(default=True)
+    tags = serializers.JSONField(default=list, help_text='JSON array of tags for every document')
+
+
+class DocumentBatchSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+    documents = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DocumentBatch
+        fields = ['id', 'created_at', 'progress', 'documents', 'skipped']
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        return obj.progress()
+
+    def get_documents(self, obj):
+        return [
+            {'id': str(document.id), 'title': document.title, 'status': document.processing_status}
+            for document in obj.documents.order_by('title')
+        ]
+
+
+class RagQueryFiltersSerializer(serializers.Serializer):
+    """Optional retrieval filters passed as query parameters to RagQueryView"""
+    document_type = serializers.ListField(
+        child=serializers.ChoiceField(choices=Document.DOCUMENT_TYPES),
+        required=False,
+        help_text='Repeat to allow several types, e.g. ?document_type=cv&document_type=portfolio',
+    )
+    tags = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        help_text='Documents must have every tag given',
+    )
+    is_public = serializers.BooleanField(required=False, allow_null=True, default=None)
+
+
 class DocumentSerializer(serializers.ModelSerializer):
     owner_username = serializers.CharField(source='owner.username', read_only=True)
     file_url = serializers.SerializerMethodField()
@@ -95,13 +179,13 @@ class DocumentSerializer(serializers.ModelSerializer):
         model = Document
         fields = [
             'id', 'title', 'document_type', 'file_url', 'file_size', 
-            'mime_type', 'processing_status', 'processing_error',
+            'mime_type', 'content_hash', 'processing_status', 'processing_error', 'processing_stats',
             'is_public', 'tags', 'owner_username', 'uploaded_at', 
             'processed_at', 'updated_at'
         ]
         read_only_fields = [
-            'id', 'file_size', 'mime_type', 'processing_status', 
-            'processing_error', 'owner_username', 'uploaded_at', 
+            'id', 'file_size', 'mime_type', 'content_hash', 'processing_status', 
+            'processing_error', 'processing_stats', 'owner_username', 'uploaded_at', 
             'processed_at', 'updated_at'
         ]
     
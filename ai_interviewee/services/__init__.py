@@ -1,2 +1,15 @@
 from .rag_service import RagService
 from .openai_embedding_service import OpenAIEmbeddingService
+from .openai_rate_limiter import OpenAIRateLimiter, retry_after_seconds
+from .ingestion_scheduler import IngestionScheduler
+from .async_embedding_executor import AsyncEmbeddingExecutor, EmbeddingDeferred, EmbeddingFailed
+from .embedding_providers import (
+    EmbeddingProvider, HashingEmbeddingProvider, embedding_provider_class, get_embedding_provider,
+    get_space_embedding_provider,
+)
+from .retrieval_strategies import RETRIEVAL_STRATEGIES, RetrievalFilters, get_retrieval_strategy
+from .context_expansion import ContextExpander
+from .near_duplicates import MinHasher, NearDuplicateDetector, collapse_near_duplicates
+from .chunk_sync import content_hash, sync_document_chunks
+from .batch_upload import BatchUpload
+from .batch_embedding import BatchEmbeddingJob, OpenAIBatchClient, get_batch_client
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+from typing import List, Optional
+from django.conf import settings
+import openai
+from ai_interviewee.utils import estimate_tokens
+from .openai_embedding_service import OpenAIEmbeddingService
+from .openai_rate_limiter import OpenAIRateLimiter, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingDeferred(Exception):
+    """
+    Raised when part of the work would have to wait longer than allowed for
+    the shared rate-limit budget.
+
+    Attributes:
+        wait: Seconds until the budget should be available again.
+        embeddings: The embeddings that were generated, aligned with the
+            input texts, with None for every text that was deferred.
+    """
+
+    def __init__(self, wait: float, embeddings: List[Optional[List[float]]]) -> None:
+        super().__init__(f"Embedding deferred by {wait:.1f}s")
+        self.wait = wait
+        self.embeddings = embeddings
+
+
+class EmbeddingFailed(Exception):
+    """
+    Raised when a request failed for a reason other than rate limits. The
+    batches that did finish (and were paid for) are kept, so callers can
+    save them before retrying the rest.
+
+    Attributes:
+        error: The exception the failed request raised.
+        embeddings: The embeddings that were generated, aligned with the
+            input texts, with None for every text without one.
+    """
+
+    def __init__(self, error: Exception, embeddings: List[Optional[List[float]]]) -> None:
+        super().__init__(f"Embedding failed: {error}")
+        self.error = error
+        self.embeddings = embeddings
+
+
+class _EmbeddingRun:
+    """Shared state of one ``aembed`` call across its concurrent workers"""
+
+    def __init__(self, texts: List[str]) -> None:
+        self.texts = texts
+        self.embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        self.next = 0
+        self.lock = asyncio.Lock()
+        self.deferred_for = 0.0
+        self.error: Optional[Exception] = None
+        self.requests = 0
+
+    @property
+    def stopped(self) -> bool:
+        return self.next >= len(self.texts) or bool(self.deferred_for) or self.error is not None
+
+
+class AsyncEmbeddingExecutor:
+    """
+    Runs many embedding batch requests concurrently inside one process.
+
+    Texts are sent in batches with the async OpenAI client, with at most
+    ``max_concurrency`` requests in flight at once. Each batch is sized to the
+    shared rate-limit budget at the moment it takes that budget, so batches
+    shrink only while the budget is actually low, and rate-limit errors pause
+    every worker for as long as the API's Retry-After asks. One process can
+    therefore use the whole rate limit without needing dozens of prefork
+    children.
+
+    Args:
+        api_key: OpenAI API key. Defaults to settings.OPENAI_API_KEY.
+        base_url: API base URL. Defaults to OPENAI_BASE_URL.
+        model: The embedding model to use.
+        dimensions: Ask the API for shortened embeddings of this size.
+        max_concurrency: Requests in flight at once. Defaults to
+            OPENAI_EMBEDDING_CONCURRENCY.
+        max_wait: Longest a batch may wait for rate-limit budget before
+            ``embed`` gives up on it and raises EmbeddingDeferred. None waits
+            as long as it takes.
+        rate_limiter: Shared limiter. Defaults to the embeddings limiter.
+    """
+
+    MAX_RATE_LIMIT_RETRIES = 5
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        model: str = OpenAIEmbeddingService.DEFAULT_MODEL,
+        dimensions: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_wait: Optional[float] = 10,
+        rate_limiter: Optional[OpenAIRateLimiter] = None,
+    ) -> None:
+        api_key = api_key or settings.OPENAI_API_KEY
+        if not api_key:
+            raise ValueError(
+                "OpenAI API key not provided. Set OPENAI_API_KEY environment "
+                "variable or pass it to the constructor."
+            )
+        self.api_key = api_key
+        self.base_url = base_url or settings.OPENAI_BASE_URL
+        self.model = model
+        self.dimensions = dimensions
+        self.max_concurrency = max_concurrency or settings.OPENAI_EMBEDDING_CONCURRENCY
+        self.max_wait = max_wait
+        self.rate_limiter = rate_limiter or OpenAIRateLimiter()
+
+    def _client(self) -> openai.AsyncOpenAI:
+        # Retries are handled here so every worker shares the same back-off
+        return openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+
+    async def _wait_for_budget(self, tokens: int) -> Optional[float]:
+        """Wait for budget; return the wait instead if it is longer than max_wait."""
+        while True:
+            wait = await asyncio.to_thread(self.rate_limiter.acquire, tokens)
+            if not wait:
+                return None
+            if self.max_wait is not None and wait > self.max_wait:
+                return wait
+            await asyncio.sleep(wait)
+
+    async def _next_batch(self, run: _EmbeddingRun) -> Optional[slice]:
+        """
+        Claim the next batch and its budget; returns the batch's slice of the
+        texts, or None when nothing is left to send. One worker sizes a batch
+        at a time, so each batch is sized to the budget left after the last.
+        """
+        async with run.lock:
+            while not run.stopped:
+                size, wait = await asyncio.to_thread(self.rate_limiter.acquire_batch, run.texts[run.next:])
+                if size:
+                    batch = slice(run.next, run.next + size)
+                    run.next += size
+                    return batch
+                if self.max_wait is not None and wait > self.max_wait:
+                    run.deferred_for = max(run.deferred_for, wait)
+                    return None
+                await asyncio.sleep(wait)
+            return None
+
+    async def _send(self, client: openai.AsyncOpenAI, texts: List[str]) -> List[List[float]]:
+        """Send one batch whose budget was taken, retrying rate-limit errors"""
+        options = {"model": self.model}
+        if self.dimensions:
+            options["dimensions"] = self.dimensions
+        for attempt in range(self.MAX_RATE_LIMIT_RETRIES + 1):
+            if attempt:
+                # Retries need budget of their own
+                deferred = await self._wait_for_budget(sum(estimate_tokens(text) for text in texts))
+                if deferred:
+                    raise EmbeddingDeferred(deferred, [])
+            try:
+                response = await client.embeddings.create(input=texts, **options)
+            except openai.RateLimitError as e:
+                wait = retry_after_seconds(e, attempt)
+                await asyncio.to_thread(self.rate_limiter.block_for, wait)
+                if attempt == self.MAX_RATE_LIMIT_RETRIES:
+                    raise
+                if self.max_wait is not None and wait > self.max_wait:
+                    raise EmbeddingDeferred(wait, [])
+                await asyncio.sleep(wait)
+                continue
+            data = sorted(response.data, key=lambda item: item.index)
+            return [item.embedding for item in data]
+
+    async def _worker(self, client: openai.AsyncOpenAI, run: _EmbeddingRun) -> None:
+        while True:
+            batch = await self._next_batch(run)
+            if batch is None:
+                return
+            run.requests += 1
+            try:
+                run.embeddings[batch] = await self._send(client, run.texts[batch])
+            except EmbeddingDeferred as e:
+                run.deferred_for = max(run.deferred_for, e.wait)
+            except Exception as e:
+                # Stop claiming batches, but let the ones in flight finish
+                if run.error is None:
+                    run.error = e
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed ``texts`` concurrently.
+
+        Returns:
+            One embedding per input text, in the same order.
+
+        Raises:
+            EmbeddingDeferred: If some batches would have had to wait longer
+                than ``max_wait``. The batches that did finish are included.
+            EmbeddingFailed: If a request failed for any other reason. The
+                batches that did finish are included.
+        """
+        if any(not text or not text.strip() for text in texts):
+            raise ValueError("Cannot generate embeddings for empty or whitespace-only text")
+
+        run = _EmbeddingRun(texts)
+        async with self._client() as client:
+            await asyncio.gather(*(self._worker(client, run) for _ in range(min(self.max_concurrency, len(texts)))))
+
+        logger.debug("Embedded %d texts in %d requests", len(texts), run.requests)
+        if run.error is not None:
+            raise EmbeddingFailed(run.error, run.embeddings) from run.error
+        if run.deferred_for:
+            raise EmbeddingDeferred(run.deferred_for, run.embeddings)
+        return run.embeddings
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Synchronous wrapper around ``aembed`` for Celery tasks and commands."""
+        if not texts:
+            return []
+        return asyncio.run(self.aembed(texts))
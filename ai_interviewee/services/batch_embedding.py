@@ -0,0 +1,373 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+import openai
+from ai_interviewee.models import DocumentChunk, EmbeddingMigration, EmbeddingSpace
+from ai_interviewee.utils import estimate_tokens
+from .embedding_providers import embedding_provider_class
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_ENDPOINT = '/v1/embeddings'
+# Batch API limits for the embeddings endpoint
+MAX_INPUTS_PER_BATCH = 50000
+MAX_TOKENS_PER_REQUEST = 300000
+# Statuses after which a batch won't change any more
+FINISHED_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+
+
+class BatchStatus(NamedTuple):
+    """Where a submitted batch is, and its result files once it has finished"""
+    status: str
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+
+
+class OpenAIBatchClient:
+    """
+    Batch client for the OpenAI Batch API: request files are uploaded and
+    run asynchronously within the completion window, at a lower price and
+    against a separate quota from interactive requests.
+
+    Any class with the same four methods can be configured as
+    EMBEDDING_BATCH_CLIENT instead.
+
+    Args:
+        api_key: OpenAI API key. Defaults to OPENAI_API_KEY.
+        base_url: API base URL, e.g. a FakeOpenAIServer's. Defaults to
+            OPENAI_BASE_URL or the public API.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None) -> None:
+        self.client = openai.OpenAI(
+            api_key=api_key or settings.OPENAI_API_KEY,
+            base_url=base_url or settings.OPENAI_BASE_URL,
+        )
+
+    def submit(self, path, endpoint: str = EMBEDDINGS_ENDPOINT) -> str:
+        """Upload a JSONL request file and start a batch for it; returns the batch id"""
+        with open(path, 'rb') as requests_file:
+            uploaded = self.client.files.create(file=(Path(path).name, requests_file), purpose='batch')
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=endpoint,
+            completion_window='24h',
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> BatchStatus:
+        batch = self.client.batches.retrieve(batch_id)
+        return BatchStatus(batch.status, batch.output_file_id, batch.error_file_id)
+
+    def results(self, file_id: str) -> Iterator[dict]:
+        """Stream the records of a result file without loading it into memory"""
+        with self.client.files.with_streaming_response.content(file_id) as response:
+            for line in response.iter_lines():
+                if line.strip():
+                    yield json.loads(line)
+
+    def cancel(self, batch_id: str) -> None:
+        self.client.batches.cancel(batch_id)
+
+
+def get_batch_client():
+    """An instance of the configured EMBEDDING_BATCH_CLIENT"""
+    return import_string(settings.EMBEDDING_BATCH_CLIENT)()
+
+
+def write_request_files(
+    chunks: Iterable[Tuple[str, str]],
+    directory,
+    model: str,
+    dimensions: Optional[int] = None,
+    inputs_per_request: Optional[int] = None,
+    max_inputs: int = MAX_INPUTS_PER_BATCH,
+) -> List[dict]:
+    """
+    Write (chunk id, content) pairs as embedding batch request files.
+
+    Every request embeds up to ``inputs_per_request`` texts, and every file
+    holds at most ``max_inputs`` distinct texts, the API's limit for one
+    batch. Chunks with identical content in the same file share one input.
+    Next to each ``part-NNNN.jsonl`` a ``part-NNNN.ids.json`` maps every
+    request's ``custom_id`` to the chunk ids of each of its inputs.
+
+    Returns:
+        One ``{'name', 'requests', 'inputs', 'chunks'}`` dict per file.
+    """
+    directory = Path(directory)
+    inputs_per_request = inputs_per_request or settings.OPENAI_EMBEDDING_BATCH_SIZE
+    parts = []
+    texts: Dict[str, List[str]] = {}
+
+    def flush():
+        name = f'part-{len(parts) + 1:04d}'
+        ids_map = {}
+        with open(directory / f'{name}.jsonl', 'w', encoding='utf-8') as requests_file:
+            request_texts, tokens = [], 0
+            for text in list(texts) + [None]:
+                full = text is None or len(request_texts) >= inputs_per_request or (
+                    request_texts and tokens + estimate_tokens(text) > MAX_TOKENS_PER_REQUEST
+                )
+                if full and request_texts:
+                    custom_id = f'{name}-{len(ids_map):05d}'
+                    body = {'model': model, 'input': request_texts}
+                    if dimensions:
+                        body['dimensions'] = dimensions
+                    requests_file.write(json.dumps({
+                        'custom_id': custom_id,
+                        'method': 'POST',
+                        'url': EMBEDDINGS_ENDPOINT,
+                        'body': body,
+                    }) + '\n')
+                    ids_map[custom_id] = [texts[request_text] for request_text in request_texts]
+                    request_texts, tokens = [], 0
+                if text is not None:
+                    request_texts.append(text)
+                    tokens += estimate_tokens(text)
+        (directory / f'{name}.ids.json').write_text(json.dumps(ids_map))
+        parts.append({
+            'name': name,
+            'requests': len(ids_map),
+            'inputs': len(texts),
+            'chunks': sum(len(ids) for ids in texts.values()),
+        })
+        texts.clear()
+
+    for chunk_id, content in chunks:
+        if content not in texts and len(texts) >= max_inputs:
+            flush()
+        texts.setdefault(content, []).append(str(chunk_id))
+    if texts:
+        flush()
+    return parts
+
+
+def iter_result_embeddings(records: Iterable[dict], ids_map: Dict[str, List[List[str]]]):
+    """
+    Pair the embeddings in batch result records with their chunk ids.
+
+    Yields:
+        (chunk ids, embedding) for every input of a successful request, and
+        (chunk ids, None) for every input of a failed one.
+    """
+    for record in records:
+        input_ids = ids_map.get(record.get('custom_id'))
+        if input_ids is None:
+            logger.warning("Ignoring batch result for unknown request %s", record.get('custom_id'))
+            continue
+        response = record.get('response') or {}
+        if record.get('error') or response.get('status_code') != 200:
+            for ids in input_ids:
+                yield ids, None
+            continue
+        data = sorted(response['body']['data'], key=lambda item: item['index'])
+        for ids, item in zip(input_ids, data):
+            yield ids, item['embedding']
+
+
+class BatchEmbeddingJob:
+    """
+    Embeds a large set of chunks through a batch API instead of interactive
+    requests, for backfills and re-embedding migrations.
+
+    The pending chunks are written to request files in a working directory,
+    each file is submitted as one batch, and the finished batches' vectors
+    are applied to DocumentChunk with bulk updates. Everything the job knows
+    is kept in ``job.json`` in the same directory, so polling can stop and
+    resume at any time, even from another machine that shares the directory.
+
+    Args:
+        directory: Working directory of the job.
+        client: Batch client. Defaults to the configured EMBEDDING_BATCH_CLIENT.
+        page_size: Chunks written per bulk update.
+    """
+
+    STATE_FILE = 'job.json'
+
+    def __init__(self, directory, client=None, page_size: int = 1000) -> None:
+        self.directory = Path(directory)
+        self.client = client or get_batch_client()
+        self.page_size = page_size
+        self.state: Optional[dict] = None
+        state_path = self.directory / self.STATE_FILE
+        if state_path.exists():
+            self.state = json.loads(state_path.read_text())
+
+    @property
+    def parts(self) -> List[dict]:
+        return self.state['parts'] if self.state else []
+
+    @property
+    def finished(self) -> bool:
+        return all(part['applied'] for part in self.parts)
+
+    def prepare(
+        self,
+        owner_id: Optional[int] = None,
+        document_id: Optional[str] = None,
+        migration: Optional[EmbeddingMigration] = None,
+    ) -> List[dict]:
+        """
+        Write request files for every chunk that needs a vector: chunks
+        without an embedding, or with a migration, chunks that have no
+        vector in its target space yet.
+
+        Returns:
+            The parts written, see write_request_files.
+
+        Raises:
+            ValueError: If the directory already holds a job, or the space
+                isn't served by the OpenAI provider.
+        """
+        if self.state is not None:
+            raise ValueError(f"{self.directory} already holds a batch embedding job")
+
+        field, dimensions = DocumentChunk.embedding_storage()
+        if migration is not None:
+            queryset = migration.remaining_chunks()
+            space, dimensions = migration.target_space, None
+        else:
+            queryset = DocumentChunk.objects.filter(**{f'{field}__isnull': True})
+            space = EmbeddingMigration.active_space()
+        # The Batch API only produces vectors in OpenAI's embedding spaces
+        provider = embedding_provider_class(space.provider or None)
+        if provider.name != 'openai':
+            raise ValueError(f"Batch embedding needs the openai provider, but {space.model} is served by {provider.name}")
+        if owner_id:
+            queryset = queryset.filter(document__owner_id=owner_id)
+        if document_id:
+            queryset = queryset.filter(document_id=document_id)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        rows = queryset.order_by('id').values_list('id', 'content').iterator(chunk_size=self.page_size)
+        parts = write_request_files(rows, self.directory, space.model, dimensions)
+        self.state = {
+            'migration': migration.id if migration is not None else None,
+            'model': space.model,
+            'version': space.version,
+            'field': field,
+            'parts': [
+                {**part, 'batch_id': None, 'status': 'prepared', 'applied': False, 'embedded': 0, 'failed': 0}
+                for part in parts
+            ],
+        }
+        self._save()
+        logger.info(
+            "Prepared %d batch files for %d chunks in %s",
+            len(parts), sum(part['chunks'] for part in parts), self.directory,
+        )
+        return parts
+
+    def submit(self) -> int:
+        """Submit every part that hasn't been submitted yet; returns how many were"""
+        submitted = 0
+        for part in self.parts:
+            if part['batch_id'] is None:
+                part['batch_id'] = self.client.submit(self.directory / f"{part['name']}.jsonl")
+                part['status'] = 'submitted'
+                self._save()
+                submitted += 1
+        return submitted
+
+    def poll(self) -> List[dict]:
+        """Refresh the status of every batch that hasn't finished"""
+        for part in self.parts:
+            if part['batch_id'] and part['status'] not in FINISHED_STATUSES:
+                status = self.client.status(part['batch_id'])
+                part.update(
+                    status=status.status,
+                    output_file_id=status.output_file_id,
+                    error_file_id=status.error_file_id,
+                )
+        self._save()
+        return self.parts
+
+    def apply(self) -> Dict[str, int]:
+        """
+        Write the vectors of every finished, unapplied batch to its chunks.
+
+        Only chunks that still need a vector are updated, so applying twice,
+        or after the chunks were embedded some other way, changes nothing.
+        Chunks whose request failed keep needing one and are picked up by
+        the next job.
+
+        Returns:
+            Counts of 'embedded' and 'failed' chunks.
+
+        Raises:
+            ValueError: If the job's migration is no longer running.
+        """
+        migration = None
+        if self.state and self.state['migration'] is not None:
+            migration = EmbeddingMigration.objects.get(id=self.state['migration'])
+            if migration.status not in ('running', 'paused'):
+                raise ValueError(f"Embedding migration {migration.id} is {migration.status}")
+
+        totals = {'embedded': 0, 'failed': 0}
+        for part in self.parts:
+            if part['applied'] or part['status'] not in FINISHED_STATUSES:
+                continue
+            ids_map = json.loads((self.directory / f"{part['name']}.ids.json").read_text())
+            results = []
+            for file_id in (part.get('output_file_id'), part.get('error_file_id')):
+                if file_id:
+                    results.append(self.client.results(file_id))
+            records = (record for result in results for record in result)
+
+            embedded, returned, page = 0, 0, {}
+            for ids, embedding in iter_result_embeddings(records, ids_map):
+                if embedding is None:
+                    continue
+                returned += len(ids)
+                page.update((chunk_id, embedding) for chunk_id in ids)
+                if len(page) >= self.page_size:
+                    embedded += self._write(page, migration)
+                    page = {}
+            embedded += self._write(page, migration)
+            # Failed requests, and those an expired or cancelled batch never ran
+            failed = part['chunks'] - returned
+
+            part.update(applied=True, embedded=embedded, failed=failed)
+            self._save()
+            totals['embedded'] += embedded
+            totals['failed'] += failed
+            logger.info("Applied batch %s: %d chunks embedded, %d failed", part['batch_id'], embedded, failed)
+        return totals
+
+    def cancel(self) -> None:
+        """Cancel every batch that is still running"""
+        for part in self.parts:
+            if part['batch_id'] and part['status'] not in FINISHED_STATUSES:
+                self.client.cancel(part['batch_id'])
+
+    def _write(self, embeddings: Dict[str, List[float]], migration: Optional[EmbeddingMigration]) -> int:
+        if not embeddings:
+            return 0
+        if migration is not None:
+            queryset = migration.remaining_chunks()
+            fields = ['next_embedding', 'next_embedding_model', 'next_embedding_version']
+        else:
+            queryset = DocumentChunk.objects.filter(**{f"{self.state['field']}__isnull": True})
+            fields = [self.state['field'], 'embedding_model', 'embedding_version']
+        space = EmbeddingSpace(self.state['model'], self.state['version'])
+
+        with transaction.atomic():
+            chunks = list(queryset.filter(id__in=list(embeddings)).only('id').select_for_update())
+            for chunk in chunks:
+                if migration is not None:
+                    chunk.set_next_embedding(embeddings[str(chunk.id)], space)
+                else:
+                    chunk.set_embedding(embeddings[str(chunk.id)], space, self.state['field'])
+            DocumentChunk.objects.bulk_update(chunks, fields)
+        return len(chunks)
+
+    def _save(self) -> None:
+        temporary = self.directory / f'{self.STATE_FILE}.tmp'
+        temporary.write_text(json.dumps(self.state, indent=2))
+        os.replace(temporary, self.directory / self.STATE_FILE)
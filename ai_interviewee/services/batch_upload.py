@@ -0,0 +1,197 @@
+import hashlib
+import io
+import logging
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import List, Optional, Tuple
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from ai_interviewee.models import Document, DocumentBatch
+from ai_interviewee.upload_handlers import sniff_mime_type
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_EXTENSIONS = {'.pdf', '.txt', '.doc', '.docx'}
+ARCHIVE_EXTENSIONS = {'.zip'}
+
+
+class _StreamingReader(io.RawIOBase):
+    """
+    Read-only, non-seekable file object over an archive entry that hashes,
+    counts and sniffs the bytes as storage pulls them through, so an entry
+    is written in one pass with only one chunk in memory.
+    """
+
+    SNIFF_BYTES = 2048
+
+    def __init__(self, stream, name: str) -> None:
+        super().__init__()
+        self.stream = stream
+        self.name = name
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.head = b''
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def readinto(self, buffer) -> int:
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        self.size += len(data)
+        self.digest.update(data)
+        if len(self.head) < self.SNIFF_BYTES:
+            self.head += data[:self.SNIFF_BYTES - len(self.head)]
+        return len(data)
+
+
+class BatchUpload:
+    """
+    Collects the files of a bulk upload, storing each as it is added, and
+    then creates all their documents at once.
+
+    Plain files are stored as uploaded. ZIP archives are read entry by
+    entry straight from the uploaded temporary file and each entry is
+    streamed to storage, so an archive is never unpacked into memory or onto
+    local disk. Entries that aren't supported documents are skipped and
+    reported rather than failing the whole batch.
+
+    Args:
+        owner: User the documents belong to.
+        document_type: Type given to every document in the batch.
+        is_public: Whether the documents can be searched by others.
+        tags: Tags given to every document in the batch.
+        max_files: Most documents in one batch. Defaults to
+            DOCUMENT_BATCH_MAX_FILES.
+        max_file_size: Largest document accepted, in bytes. Defaults to
+            DOCUMENT_MAX_UPLOAD_SIZE.
+    """
+
+    def __init__(
+        self,
+        owner,
+        document_type: str = 'other',
+        is_public: bool = True,
+        tags: Optional[list] = None,
+        max_files: Optional[int] = None,
+        max_file_size: Optional[int] = None,
+    ) -> None:
+        self.owner = owner
+        self.document_type = document_type
+        self.is_public = is_public
+        self.tags = tags or []
+        self.max_files = max_files or settings.DOCUMENT_BATCH_MAX_FILES
+        self.max_file_size = max_file_size or settings.DOCUMENT_MAX_UPLOAD_SIZE
+        self.file_field = Document._meta.get_field('file')
+        self.staged: List[dict] = []
+        self.skipped: List[dict] = []
+
+    def add_file(self, file, metadata: dict) -> None:
+        """
+        Store one uploaded file, or every entry of it if it is a ZIP archive.
+
+        Args:
+            file: The uploaded file.
+            metadata: Its file_size, mime_type and content_hash.
+
+        Raises:
+            ValueError: If the batch has too many files or an archive can't be read.
+        """
+        suffix = Path(file.name).suffix.lower()
+        if suffix in ARCHIVE_EXTENSIONS:
+            self.add_archive(file)
+            return
+        if not self._accept(file.name, file.size):
+            return
+        name = self.file_field.storage.save(self.file_field.generate_filename(None, file.name), file)
+        self._stage(file.name, name, metadata)
+
+    def add_archive(self, archive) -> None:
+        """
+        Stream every supported entry of a ZIP archive to storage.
+
+        Raises:
+            ValueError: If the archive is invalid or holds too many documents.
+        """
+        try:
+            with zipfile.ZipFile(archive) as zip_file:
+                for info in zip_file.infolist():
+                    path = PurePosixPath(info.filename)
+                    if info.is_dir() or '__MACOSX' in path.parts or path.name.startswith('.'):
+                        continue
+                    # ZipFile never returns more than the declared size, so
+                    # checking it also guards against decompression bombs
+                    if not self._accept(info.filename, info.file_size):
+                        continue
+                    with zip_file.open(info) as entry:
+                        reader = _StreamingReader(entry, path.name)
+                        name = self.file_field.storage.save(
+                            self.file_field.generate_filename(None, path.name), File(reader, path.name)
+                        )
+                    self._stage(path.name, name, {
+                        'file_size': reader.size,
+                        'mime_type': sniff_mime_type(reader.head, path.name),
+                        'content_hash': reader.digest.hexdigest(),
+                    })
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"{archive.name} is not a valid ZIP archive") from e
+
+    def create(self) -> Tuple[DocumentBatch, List[Document]]:
+        """
+        Create the batch and all of its documents in one transaction.
+
+        Returns:
+            The batch and its documents, ready to be queued for processing.
+
+        Raises:
+            ValueError: If no supported document was added.
+        """
+        if not self.staged:
+            raise ValueError("The upload contains no supported documents")
+
+        with transaction.atomic():
+            batch = DocumentBatch.objects.create(owner=self.owner, skipped=self.skipped)
+            documents = Document.objects.bulk_create([
+                Document(
+                    owner=self.owner,
+                    batch=batch,
+                    document_type=self.document_type,
+                    is_public=self.is_public,
+                    tags=self.tags,
+                    **fields,
+                )
+                for fields in self.staged
+            ])
+        logger.info(
+            "Batch %s: created %d documents, skipped %d files",
+            batch.id, len(documents), len(self.skipped),
+        )
+        return batch, documents
+
+    def discard(self) -> None:
+        """Delete the files stored so far, e.g. after a failed upload"""
+        for fields in self.staged:
+            self.file_field.storage.delete(fields['file'])
+        self.staged = []
+
+    def _accept(self, file_name: str, size: int) -> bool:
+        if Path(file_name).suffix.lower() not in ALLOWED_EXTENSIONS:
+            self.skipped.append({'file': file_name, 'reason': 'unsupported file type'})
+            return False
+        if size > self.max_file_size:
+            self.skipped.append({'file': file_name, 'reason': f'larger than {self.max_file_size} bytes'})
+            return False
+        if len(self.staged) >= self.max_files:
+            raise ValueError(f"A batch can contain at most {self.max_files} documents")
+        return True
+
+    def _stage(self, file_name: str, stored_name: str, metadata: dict) -> None:
+        self.staged.append({
+            'title': Path(file_name).stem[:200],
+            'file': stored_name,
+            **metadata,
+        })
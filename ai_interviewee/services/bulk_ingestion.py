@@ -0,0 +1,301 @@
+import csv
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from ai_interviewee.models import Document, DocumentChunk, EmbeddingMigration
+from ai_interviewee.upload_handlers import sniff_mime_type
+from ai_interviewee.utils import (
+    chunk_text, estimate_tokens, extract_text_from_file, hash_file, normalize_extracted_text,
+)
+from .chunk_sync import content_hash
+from .near_duplicates import NearDuplicateDetector
+
+logger = logging.getLogger(__name__)
+
+INGESTIBLE_EXTENSIONS = {'.pdf', '.txt', '.doc', '.docx'}
+# Accepted spellings of is_public in manifests; an empty value keeps the default
+TRUE_VALUES = {'1', 'true', 'yes'}
+FALSE_VALUES = {'0', 'false', 'no'}
+
+
+class IngestionEntry(NamedTuple):
+    """One file to ingest and the document it becomes"""
+    path: str
+    owner: str
+    title: str = ''
+    document_type: str = 'other'
+    tags: tuple = ()
+    is_public: bool = True
+
+
+def entries_from_directory(directory, owner: str, **defaults) -> Iterator[IngestionEntry]:
+    """Every supported file below a directory, in a stable order, for one owner"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if Path(name).suffix.lower() in INGESTIBLE_EXTENSIONS and not name.startswith('.'):
+                yield IngestionEntry(path=os.path.join(root, name), owner=owner, **defaults)
+
+
+def entries_from_manifest(manifest) -> Iterator[IngestionEntry]:
+    """
+    Entries listed in a JSON Lines or CSV manifest with ``path`` and
+    ``owner`` (user id, username or email) and, optionally, ``title``,
+    ``document_type``, ``tags`` (a list, or ``;``-separated in CSV) and
+    ``is_public`` (true/false, yes/no or 1/0; public when empty). Relative
+    paths are resolved against the manifest.
+
+    Raises:
+        ValueError: If a row has no path or owner, or an unknown is_public.
+    """
+    manifest = Path(manifest)
+    with manifest.open(newline='') as manifest_file:
+        if manifest.suffix.lower() == '.csv':
+            rows = csv.DictReader(manifest_file)
+        else:
+            rows = (json.loads(line) for line in manifest_file if line.strip())
+        for number, row in enumerate(rows, 1):
+            if not row.get('path') or not row.get('owner'):
+                raise ValueError(f"Manifest row {number} needs a path and an owner")
+            tags = row.get('tags') or ()
+            if isinstance(tags, str):
+                tags = [tag.strip() for tag in tags.split(';') if tag.strip()]
+            is_public = row.get('is_public')
+            if not isinstance(is_public, bool):
+                value = '' if is_public is None else str(is_public).strip().lower()
+                if value in FALSE_VALUES:
+                    is_public = False
+                elif value in TRUE_VALUES or not value:
+                    is_public = True
+                else:
+                    raise ValueError(f"Manifest row {number} has an unknown is_public value {is_public!r}")
+            yield IngestionEntry(
+                path=str(manifest.parent / row['path']),
+                owner=str(row['owner']),
+                title=row.get('title') or '',
+                document_type=row.get('document_type') or 'other',
+                tags=tuple(tags),
+                is_public=is_public,
+            )
+
+
+def prepare_file(path: str) -> dict:
+    """
+    The CPU-bound part of ingesting one file: extraction, normalization,
+    chunking and near-duplicate fingerprints. Runs in pool workers, so it
+    must not touch the database.
+
+    Returns:
+        The file's measurements and chunks, or ``{'path', 'error'}`` if it
+        couldn't be processed.
+    """
+    try:
+        with open(path, 'rb') as source:
+            head = source.read(2048)
+            source.seek(0)
+            digest = hash_file(File(source))
+            text = extract_text_from_file(source, path)
+        if not text or not text.strip():
+            raise ValueError("No text content could be extracted")
+        text, normalization_stats = normalize_extracted_text(text)
+
+        detector = NearDuplicateDetector()
+        chunks = []
+        for chunk in chunk_text(text):
+            minhash, lsh_bands = detector.fingerprint(chunk['content'])
+            chunks.append({
+                **chunk,
+                'content_hash': content_hash(chunk['content']),
+                'minhash': minhash,
+                'lsh_bands': lsh_bands,
+            })
+        return {
+            'path': path,
+            'content_hash': digest,
+            'file_size': os.path.getsize(path),
+            'mime_type': sniff_mime_type(head, path),
+            'normalization': normalization_stats,
+            'chunks': chunks,
+        }
+    except Exception as e:
+        return {'path': path, 'error': f"{type(e).__name__}: {e}"}
+
+
+class IngestionCheckpoint:
+    """
+    Progress of a bulk ingestion, saved as JSON after every batch so an
+    interrupted run picks up where it stopped. Files that failed are
+    recorded with their error and tried again on the next run.
+
+    Args:
+        path: The checkpoint file.
+        source: The directory or manifest being ingested; a checkpoint for
+            a different source is refused.
+    """
+
+    def __init__(self, path, source: str) -> None:
+        self.path = Path(path)
+        self.source = source
+        self.done: set = set()
+        self.failed: Dict[str, str] = {}
+        if self.path.exists():
+            state = json.loads(self.path.read_text())
+            if state.get('source') != source:
+                raise ValueError(
+                    f"Checkpoint {self.path} belongs to {state.get('source')}, not {source}"
+                )
+            self.done = set(state.get('done', []))
+            self.failed = state.get('failed', {})
+
+    def record(self, done: Iterable[str] = (), failed: Optional[Dict[str, str]] = None) -> None:
+        self.done.update(done)
+        for path in self.done:
+            self.failed.pop(path, None)
+        self.failed.update(failed or {})
+        temporary = self.path.with_name(self.path.name + '.tmp')
+        temporary.write_text(json.dumps({
+            'source': self.source,
+            'done': sorted(self.done),
+            'failed': self.failed,
+        }))
+        os.replace(temporary, self.path)
+
+
+class BulkIngestor:
+    """
+    Writes prepared files to storage and the database in batches.
+
+    Every batch is embedded first, with identical chunk texts embedded once,
+    and then inserted in one transaction, documents and chunks each with a
+    single bulk INSERT. A batch is therefore either fully ingested and
+    searchable or not there at all, which is what makes checkpoints safe.
+    Files whose content the owner already has are skipped, so re-running a
+    batch that was interrupted after its commit doesn't duplicate it.
+
+    Args:
+        embedding_provider: EmbeddingProvider used for the chunks, or None
+            to leave them for backfill_embeddings.
+        detector: Near-duplicate detector for the new chunks.
+    """
+
+    def __init__(self, embedding_provider=None, detector: Optional[NearDuplicateDetector] = None) -> None:
+        self.embedding_provider = embedding_provider
+        self.detector = detector or NearDuplicateDetector()
+        self.file_field = Document._meta.get_field('file')
+
+    def write_batch(self, items: List[tuple]) -> Dict[str, int]:
+        """
+        Ingest one batch.
+
+        Args:
+            items: (IngestionEntry, owner id, prepared file) tuples.
+
+        Returns:
+            Counts of 'documents', 'chunks', 'tokens' and 'skipped' files.
+        """
+        existing = set(
+            Document.objects.filter(
+                owner_id__in={owner_id for _, owner_id, _ in items},
+                content_hash__in=[prepared['content_hash'] for _, _, prepared in items],
+            ).values_list('owner_id', 'content_hash')
+        )
+        new_items = []
+        for entry, owner_id, prepared in items:
+            if (owner_id, prepared['content_hash']) in existing:
+                continue
+            existing.add((owner_id, prepared['content_hash']))
+            new_items.append((entry, owner_id, prepared))
+
+        chunk_rows = [chunk for _, _, prepared in new_items for chunk in prepared['chunks']]
+        embeddings = self._embed(chunk_rows)
+
+        stored_names = []
+        try:
+            for entry, _, _ in new_items:
+                with open(entry.path, 'rb') as source:
+                    name = Path(entry.path).name
+                    stored_names.append(
+                        self.file_field.storage.save(self.file_field.generate_filename(None, name), File(source, name))
+                    )
+
+            now = timezone.now()
+            documents = [
+                Document(
+                    owner_id=owner_id,
+                    title=(entry.title or Path(entry.path).stem)[:200],
+                    document_type=entry.document_type,
+                    file=stored_name,
+                    file_size=prepared['file_size'],
+                    mime_type=prepared['mime_type'],
+                    content_hash=prepared['content_hash'],
+                    processing_status='completed',
+                    processing_stats={
+                        'normalization': prepared['normalization'],
+                        'extraction_cached': False,
+                        'chunks': {'kept': 0, 'created': len(prepared['chunks']), 'deleted': 0},
+                    },
+                    is_public=entry.is_public,
+                    tags=list(entry.tags),
+                    processed_at=now,
+                )
+                for (entry, owner_id, prepared), stored_name in zip(new_items, stored_names)
+            ]
+
+            field, _ = DocumentChunk.embedding_storage()
+            space = EmbeddingMigration.active_space()
+            chunks = []
+            chunks_by_document = []
+            for document, (_, _, prepared) in zip(documents, new_items):
+                chunks_by_document.append((document, []))
+                for index, chunk_data in enumerate(prepared['chunks']):
+                    chunk = DocumentChunk(
+                        document=document,
+                        content=chunk_data['content'],
+                        content_hash=chunk_data['content_hash'],
+                        minhash=chunk_data['minhash'],
+                        lsh_bands=chunk_data['lsh_bands'],
+                        chunk_index=index,
+                        page_number=chunk_data.get('page_number'),
+                        start_char=chunk_data.get('start_char'),
+                        end_char=chunk_data.get('end_char'),
+                        metadata=chunk_data.get('metadata', {}),
+                    )
+                    embedding = embeddings.get(chunk_data['content_hash'])
+                    if embedding is not None:
+                        chunk.set_embedding(embedding, space, field)
+                    chunks.append(chunk)
+                    chunks_by_document[-1][1].append(chunk)
+
+            with transaction.atomic():
+                Document.objects.bulk_create(documents)
+                DocumentChunk.objects.bulk_create(chunks, batch_size=1000)
+        except Exception:
+            for name in stored_names:
+                self.file_field.storage.delete(name)
+            raise
+
+        for document, document_chunks in chunks_by_document:
+            self.detector.link_duplicates(document.owner_id, document.id, document_chunks)
+
+        stats = {
+            'documents': len(documents),
+            'chunks': len(chunks),
+            'tokens': sum(estimate_tokens(chunk.content) for chunk in chunks),
+            'skipped': len(items) - len(new_items),
+        }
+        logger.info("Ingested batch: %s", stats)
+        return stats
+
+    def _embed(self, chunk_rows: List[dict]) -> Dict[str, List[float]]:
+        """Embeddings by chunk content hash, each distinct text embedded once"""
+        if self.embedding_provider is None or not chunk_rows:
+            return {}
+        texts = {chunk['content_hash']: chunk['content'] for chunk in chunk_rows}
+        hashes = list(texts)
+        vectors = self.embedding_provider.embed([texts[digest] for digest in hashes])
+        return dict(zip(hashes, vectors))
@@ -0,0 +1,87 @@
+import hashlib
+import logging
+from typing import Dict, List, Optional
+from django.db import transaction
+from ai_interviewee.models import Document, DocumentChunk
+from .near_duplicates import NearDuplicateDetector
+
+logger = logging.getLogger(__name__)
+
+# Fields that may change on a chunk whose content didn't
+POSITION_FIELDS = ['chunk_index', 'page_number', 'start_char', 'end_char', 'metadata']
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 of a chunk's text, as stored in DocumentChunk.content_hash"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def sync_document_chunks(
+    document: Document,
+    chunks: List[dict],
+    detector: Optional[NearDuplicateDetector] = None,
+) -> Dict[str, int]:
+    """
+    Make a document's chunks match a freshly chunked text.
+
+    Existing chunks are matched to the new ones by content hash. Matches are
+    kept with their embeddings (only their position is updated), new
+    content is inserted, and chunks whose content is gone are deleted, all
+    in one transaction, so retrieval sees either the old version of the
+    document or the new one. chunk_text ends chunks at content-defined cut
+    points, so editing one sentence of a document usually only changes the
+    chunk or two around it, and only those are embedded again.
+
+    Args:
+        document: The document being (re)processed.
+        chunks: Chunk dictionaries as returned by chunk_text.
+        detector: Near-duplicate detector for the new chunks.
+
+    Returns:
+        Counts of 'kept', 'created' and 'deleted' chunks.
+    """
+    detector = detector or NearDuplicateDetector()
+
+    with transaction.atomic():
+        existing: Dict[str, List[DocumentChunk]] = {}
+        for chunk in DocumentChunk.objects.select_for_update().filter(document=document).order_by('chunk_index'):
+            existing.setdefault(chunk.content_hash, []).append(chunk)
+
+        kept = []
+        created = []
+        for index, chunk_data in enumerate(chunks):
+            digest = content_hash(chunk_data['content'])
+            position = {
+                'chunk_index': index,
+                'page_number': chunk_data.get('page_number'),
+                'start_char': chunk_data.get('start_char'),
+                'end_char': chunk_data.get('end_char'),
+                'metadata': chunk_data.get('metadata', {}),
+            }
+            if existing.get(digest):
+                chunk = existing[digest].pop(0)
+                for name, value in position.items():
+                    setattr(chunk, name, value)
+                kept.append(chunk)
+                continue
+
+            minhash, lsh_bands = detector.fingerprint(chunk_data['content'])
+            created.append(DocumentChunk.objects.create(
+                document=document,
+                content=chunk_data['content'],
+                content_hash=digest,
+                minhash=minhash,
+                lsh_bands=lsh_bands,
+                **position,
+            ))
+
+        stale_ids = [chunk.id for chunks_left in existing.values() for chunk in chunks_left]
+        DocumentChunk.objects.filter(id__in=stale_ids).delete()
+        DocumentChunk.objects.bulk_update(kept, POSITION_FIELDS)
+
+    # Near-duplicates of the owner's existing chunks reuse their embeddings
+    detector.link_duplicates(document.owner_id, document.id, created)
+
+    stats = {'kept': len(kept), 'created': len(created), 'deleted': len(stale_ids)}
+    logger.info("Synced chunks of document %s: %s", document.id, stats)
+    return stats
@@ -0,0 +1,431 @@
+import hashlib
+import json
+import logging
+import struct
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from django.db import connection, transaction
+from django.db.models import Case, F, UUIDField, Value, When
+from django.utils import timezone
+from ai_interviewee.models import Document, DocumentChunk
+from ai_interviewee.utils import vector_to_list
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+DOCUMENTS = 'documents.jsonl'
+CHUNKS = 'chunks.jsonl'
+EMBEDDINGS = 'embeddings.npy'
+
+# Vector columns that are not exported: mid-migration state is rebuilt by
+# starting the migration again in the target environment
+TRANSIENT_FIELDS = {'next_embedding', 'next_embedding_model', 'next_embedding_version'}
+
+_PG_EPOCH = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+_INT8_OID = 20
+_COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+_COPY_TRAILER = struct.pack('>h', -1)
+
+
+def _json_value(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _encode_bigint_array(values) -> bytes:
+    return struct.pack('>iiiii', 1, 0, _INT8_OID, len(values), 1) + b''.join(
+        struct.pack('>iq', 8, value) for value in values
+    )
+
+
+def _encoder(db_type: str) -> Callable[[object], bytes]:
+    """Binary COPY encoder for one column type"""
+    from pgvector import HalfVector, Vector
+
+    if db_type == 'uuid':
+        return lambda value: uuid.UUID(str(value)).bytes
+    if db_type == 'text' or db_type.startswith('varchar'):
+        return lambda value: value.encode('utf-8')
+    if db_type == 'integer':
+        return lambda value: struct.pack('>i', value)
+    if db_type == 'smallint':
+        return lambda value: struct.pack('>h', value)
+    if db_type == 'bigint':
+        return lambda value: struct.pack('>q', value)
+    if db_type == 'boolean':
+        return lambda value: b'\x01' if value else b'\x00'
+    if db_type == 'jsonb':
+        return lambda value: b'\x01' + json.dumps(value).encode('utf-8')
+    if db_type == 'timestamp with time zone':
+        def encode_timestamp(value):
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            delta = value - _PG_EPOCH
+            return struct.pack('>q', (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds)
+        return encode_timestamp
+    if db_type == 'bigint[]':
+        return _encode_bigint_array
+    if db_type.startswith('vector'):
+        return lambda value: Vector(value).to_binary()
+    if db_type.startswith('halfvec'):
+        return lambda value: HalfVector(value).to_binary()
+    raise ValueError(f"No binary COPY encoder for column type {db_type}")
+
+
+class BinaryCopyStream:
+    """
+    File-like object producing PostgreSQL binary COPY data from row tuples,
+    for ``cursor.copy_expert``. Rows are encoded as psycopg2 reads, so a
+    table of any size streams through a small buffer.
+
+    Args:
+        fields: Model fields in column order.
+        rows: Tuples of Python values, one per field, None for NULL.
+        progress: Called with the number of rows encoded so far, every
+            ``progress_every`` rows.
+    """
+
+    def __init__(self, fields, rows: Iterable[tuple], progress=None, progress_every: int = 10000) -> None:
+        self.encoders = [_encoder(field.db_type(connection)) for field in fields]
+        self.rows = iter(rows)
+        self.progress = progress
+        self.progress_every = progress_every
+        self.count = 0
+        self.buffer = bytearray(_COPY_HEADER)
+        self.finished = False
+
+    def _encode(self, row) -> bytes:
+        parts = [struct.pack('>h', len(row))]
+        for encode, value in zip(self.encoders, row):
+            if value is None:
+                parts.append(struct.pack('>i', -1))
+            else:
+                data = encode(value)
+                parts.append(struct.pack('>i', len(data)))
+                parts.append(data)
+        return b''.join(parts)
+
+    def read(self, size: int = -1) -> bytes:
+        while not self.finished and (size < 0 or len(self.buffer) < size):
+            row = next(self.rows, None)
+            if row is None:
+                self.buffer += _COPY_TRAILER
+                self.finished = True
+                break
+            self.buffer += self._encode(row)
+            self.count += 1
+            if self.progress and self.count % self.progress_every == 0:
+                self.progress(self.count)
+        if size < 0:
+            size = len(self.buffer)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+def _copy(cursor, model, fields, rows, progress=None) -> int:
+    stream = BinaryCopyStream(fields, rows, progress)
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    cursor.copy_expert(
+        f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT binary)",
+        stream,
+    )
+    return stream.count
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open('rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_jsonl(path: Path) -> Iterator[dict]:
+    with path.open() as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _chunk_fields():
+    """Chunk columns in export order; the storage field comes from the .npy"""
+    storage_field, _ = DocumentChunk.embedding_storage()
+    vector_fields = {'embedding', 'compact_embedding'}
+    metadata = [
+        field for field in DocumentChunk._meta.concrete_fields
+        if field.name not in vector_fields and field.name not in TRANSIENT_FIELDS
+    ]
+    return metadata, DocumentChunk._meta.get_field(storage_field)
+
+
+class ChunkExporter:
+    """
+    Exports documents and chunks to a directory:
+
+    * ``embeddings.npy``: one row per chunk from the configured storage field
+      (float32 for ``embedding``, float16 for ``compact_embedding``), with
+      NaN rows for chunks that have no embedding yet
+    * ``chunks.jsonl``: every other chunk column, in the same row order
+    * ``documents.jsonl``: the chunks' documents (file contents stay in storage)
+    * ``manifest.json``: counts, vector layout and SHA-256 of every file
+
+    Args:
+        directory: Output directory; created if needed.
+        progress: Called with (stage, rows done, total rows).
+    """
+
+    def __init__(self, directory, progress=None, batch_size: int = 2000) -> None:
+        self.directory = Path(directory)
+        self.progress = progress or (lambda stage, done, total: None)
+        self.batch_size = batch_size
+
+    def export(self, documents) -> dict:
+        """
+        Export the given documents and all of their chunks.
+
+        Args:
+            documents: Document queryset.
+
+        Returns:
+            The manifest.
+        """
+        import numpy as np
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        metadata_fields, vector_field = _chunk_fields()
+        dtype = np.float16 if vector_field.name == 'compact_embedding' else np.float32
+        dimensions = vector_field.dimensions
+
+        document_count = 0
+        with (self.directory / DOCUMENTS).open('w') as output:
+            for values in documents.order_by('id').values_list(
+                *(field.attname for field in Document._meta.concrete_fields)
+            ).iterator(chunk_size=self.batch_size):
+                row = {field.attname: _json_value(value) for field, value in zip(Document._meta.concrete_fields, values)}
+                output.write(json.dumps(row) + '\n')
+                document_count += 1
+
+        # Near-duplicate links to chunks outside the export would dangle
+        chunks = DocumentChunk.objects.filter(document__in=documents).annotate(
+            exported_duplicate_of=Case(
+                When(duplicate_of__document__in=documents, then=F('duplicate_of_id')),
+                default=Value(None),
+                output_field=UUIDField(),
+            )
+        ).order_by('document_id', 'chunk_index', 'id')
+        total = chunks.count()
+        embeddings = np.lib.format.open_memmap(
+            self.directory / EMBEDDINGS, mode='w+', dtype=dtype, shape=(total, dimensions)
+        )
+        written = 0
+        embedded = 0
+        spaces = set()
+        columns = [
+            'exported_duplicate_of' if field.attname == 'duplicate_of_id' else field.attname
+            for field in metadata_fields
+        ] + [vector_field.attname]
+        with (self.directory / CHUNKS).open('w') as output:
+            for index, values in enumerate(chunks.values_list(*columns).iterator(chunk_size=self.batch_size)):
+                if index >= total:
+                    raise RuntimeError("Chunks were added during the export; export again")
+                *metadata, vector = values
+                row = {field.attname: _json_value(value) for field, value in zip(metadata_fields, metadata)}
+                output.write(json.dumps(row) + '\n')
+                written += 1
+                if vector is None:
+                    embeddings[index] = np.nan
+                else:
+                    embeddings[index] = vector_to_list(vector)
+                    embedded += 1
+                    spaces.add((row['embedding_model'], row['embedding_version']))
+                if (index + 1) % self.batch_size == 0:
+                    self.progress('export', index + 1, total)
+        embeddings.flush()
+        del embeddings
+        if written != total:
+            raise RuntimeError("Chunks were deleted during the export; export again")
+        self.progress('export', total, total)
+
+        manifest = {
+            'format_version': EXPORT_FORMAT_VERSION,
+            'created_at': timezone.now().isoformat(),
+            'documents': document_count,
+            'chunks': total,
+            'embedded_chunks': embedded,
+            'vector_field': vector_field.name,
+            'dimensions': dimensions,
+            'dtype': np.dtype(dtype).name,
+            'embedding_spaces': sorted([model, version] for model, version in spaces),
+            'chunk_columns': [field.attname for field in metadata_fields],
+            'sha256': {name: _sha256(self.directory / name) for name in (DOCUMENTS, CHUNKS, EMBEDDINGS)},
+        }
+        (self.directory / MANIFEST).write_text(json.dumps(manifest, indent=2))
+        logger.info("Exported %d documents and %d chunks to %s", document_count, total, self.directory)
+        return manifest
+
+
+class ChunkImporter:
+    """
+    Imports an export made by ChunkExporter with PostgreSQL binary COPY.
+
+    Every file is checked against the manifest's SHA-256 first. Documents
+    and chunks are then streamed straight from the files into COPY, with no
+    model instances and no per-row SQL, in one transaction that also runs
+    the verification, so a failed import leaves nothing behind.
+
+    Args:
+        directory: The export directory.
+        owner_id: Give every document this owner instead of the exported one,
+            e.g. when moving a tenant to another environment.
+        replace: Delete documents with the same ids (and their chunks) first.
+        verify_sample: Chunks compared field by field against the export
+            after loading.
+        progress: Called with (stage, rows done, total rows).
+    """
+
+    def __init__(
+        self,
+        directory,
+        owner_id: Optional[int] = None,
+        replace: bool = False,
+        verify_sample: int = 1000,
+        progress=None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.owner_id = owner_id
+        self.replace = replace
+        self.verify_sample = verify_sample
+        self.progress = progress or (lambda stage, done, total: None)
+
+    def load_manifest(self) -> dict:
+        """
+        Raises:
+            ValueError: If the export doesn't match this database's layout
+                or a file is corrupt.
+        """
+        manifest = json.loads((self.directory / MANIFEST).read_text())
+        if manifest.get('format_version') != EXPORT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported export format {manifest.get('format_version')}")
+        metadata_fields, vector_field = _chunk_fields()
+        if manifest['vector_field'] != vector_field.name or manifest['dimensions'] != vector_field.dimensions:
+            raise ValueError(
+                f"Export holds {manifest['vector_field']}({manifest['dimensions']}) vectors but this "
+                f"database stores {vector_field.name}({vector_field.dimensions}); check EMBEDDING_STORAGE"
+            )
+        if manifest['chunk_columns'] != [field.attname for field in metadata_fields]:
+            raise ValueError("Export columns don't match the current DocumentChunk schema")
+        for done, (name, expected) in enumerate(manifest['sha256'].items(), 1):
+            if _sha256(self.directory / name) != expected:
+                raise ValueError(f"{name} is corrupt: checksum mismatch")
+            self.progress('checksum', done, len(manifest['sha256']))
+        return manifest
+
+    def run(self) -> dict:
+        """
+        Returns:
+            Counts of imported 'documents' and 'chunks'.
+
+        Raises:
+            ValueError: If the export is invalid or verification fails.
+        """
+        import numpy as np
+
+        manifest = self.load_manifest()
+        metadata_fields, vector_field = _chunk_fields()
+        embeddings = np.load(self.directory / EMBEDDINGS, mmap_mode='r')
+        if embeddings.shape[0] != manifest['chunks']:
+            raise ValueError("embeddings.npy and the manifest disagree on the number of chunks")
+
+        document_fields = list(Document._meta.concrete_fields)
+        chunk_fields = metadata_fields + [vector_field]
+        chunk_fields += [
+            field for field in DocumentChunk._meta.concrete_fields
+            if field not in chunk_fields
+        ]
+        defaults = [field.get_default() if field.name in TRANSIENT_FIELDS else None for field in chunk_fields]
+
+        def document_rows():
+            for row in _read_jsonl(self.directory / DOCUMENTS):
+                if self.owner_id is not None:
+                    row['owner_id'] = self.owner_id
+                # Upload batches aren't exported
+                row['batch_id'] = None
+                yield tuple(row.get(field.attname) for field in document_fields)
+
+        def chunk_rows():
+            for index, row in enumerate(_read_jsonl(self.directory / CHUNKS)):
+                vector = embeddings[index]
+                row[vector_field.attname] = None if np.isnan(vector[0]) else np.asarray(vector, dtype=np.float32)
+                yield tuple(
+                    row[field.attname] if field.attname in row else default
+                    for field, default in zip(chunk_fields, defaults)
+                )
+
+        document_ids = [row['id'] for row in _read_jsonl(self.directory / DOCUMENTS)]
+        with transaction.atomic(), connection.cursor() as cursor:
+            if self.replace:
+                Document.objects.filter(id__in=document_ids).delete()
+            documents = _copy(
+                cursor, Document, document_fields, document_rows(),
+                lambda done: self.progress('documents', done, manifest['documents']),
+            )
+            chunks = _copy(
+                cursor, DocumentChunk, chunk_fields, chunk_rows(),
+                lambda done: self.progress('chunks', done, manifest['chunks']),
+            )
+            self.progress('chunks', chunks, manifest['chunks'])
+            self.verify(manifest, document_ids, embeddings)
+
+        logger.info("Imported %d documents and %d chunks from %s", documents, chunks, self.directory)
+        return {'documents': documents, 'chunks': chunks}
+
+    def verify(self, manifest: dict, document_ids: List[str], embeddings) -> None:
+        """
+        Check row counts and compare a sample of chunks with the export.
+
+        Raises:
+            ValueError: On any mismatch, which rolls the import back.
+        """
+        import numpy as np
+
+        _, vector_field = _chunk_fields()
+        imported = DocumentChunk.objects.filter(document_id__in=document_ids)
+        counts = {
+            'documents': Document.objects.filter(id__in=document_ids).count(),
+            'chunks': imported.count(),
+            'embedded_chunks': imported.filter(**{f'{vector_field.name}__isnull': False}).count(),
+        }
+        for name, count in counts.items():
+            if count != manifest[name]:
+                raise ValueError(f"Verification failed: {count} {name} imported, {manifest[name]} exported")
+
+        total = manifest['chunks']
+        step = max(total // self.verify_sample, 1) if self.verify_sample else total + 1
+        sample: Dict[str, tuple] = {}
+        for index, row in enumerate(_read_jsonl(self.directory / CHUNKS)):
+            if index % step == 0:
+                sample[row['id']] = (row['content_hash'], row['chunk_index'], index)
+        stored = imported.filter(id__in=list(sample)).values_list(
+            'id', 'content_hash', 'chunk_index', vector_field.attname
+        )
+        checked = 0
+        for chunk_id, content_hash, chunk_index, vector in stored:
+            expected_hash, expected_index, index = sample[str(chunk_id)]
+            expected_vector = embeddings[index]
+            if content_hash != expected_hash or chunk_index != expected_index:
+                raise ValueError(f"Verification failed: chunk {chunk_id} differs from the export")
+            if (vector is None) != bool(np.isnan(expected_vector[0])) or (
+                vector is not None and not np.allclose(vector_to_list(vector), expected_vector, atol=1e-3)
+            ):
+                raise ValueError(f"Verification failed: embedding of chunk {chunk_id} differs from the export")
+            checked += 1
+        if checked != len(sample):
+            raise ValueError(f"Verification failed: {len(sample) - checked} sampled chunks are missing")
+        self.progress('verify', checked, len(sample))
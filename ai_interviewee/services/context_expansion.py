@@ -0,0 +1,143 @@
+import logging
+from functools import reduce
+from operator import or_
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from django.db.models import Q
+from ai_interviewee.models import DocumentChunk
+from ai_interviewee.utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def merge_chunks(chunks: List[DocumentChunk]) -> List[str]:
+    """
+    Join chunks of one document, in chunk_index order, into passages.
+
+    Consecutive chunks become one passage with the words they share (the
+    chunking overlap) written only once. A gap in chunk_index starts a new
+    passage.
+    """
+    passages = []
+    previous = None
+    for chunk in chunks:
+        if previous is None or chunk.chunk_index != previous.chunk_index + 1:
+            passages.append(chunk.content)
+        else:
+            overlap = None
+            if chunk.start_char is not None and previous.end_char is not None:
+                overlap = previous.end_char - chunk.start_char
+            if overlap is not None and 0 < overlap <= len(chunk.content):
+                passages[-1] += chunk.content[overlap:]
+            else:
+                passages[-1] += ' ' + chunk.content
+        previous = chunk
+    return passages
+
+
+class ContextExpander:
+    """
+    Adds the chunks around each retrieved chunk to the prompt context.
+
+    A hit often starts or ends mid-thought, so for every hit the chunks
+    ``chunk_index - neighbors`` to ``chunk_index + neighbors`` of the same
+    document are fetched too. Overlapping windows are merged into spans and
+    every span is loaded in one query that uses the (document, chunk_index)
+    index. Spans are added in the order of their best hit for as long as the
+    token budget allows; a span that doesn't fit falls back to just its hits.
+    With ``neighbors`` 0 expansion is off and the hits are returned as they
+    are, in rank order.
+
+    Args:
+        neighbors: Chunks to add on each side of a hit. Defaults to
+            RAG_CONTEXT_NEIGHBORS.
+        token_budget: Most context tokens to put in the prompt. Defaults to
+            RAG_CONTEXT_TOKEN_BUDGET.
+    """
+
+    def __init__(self, neighbors: Optional[int] = None, token_budget: Optional[int] = None) -> None:
+        self.neighbors = settings.RAG_CONTEXT_NEIGHBORS if neighbors is None else neighbors
+        self.token_budget = settings.RAG_CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+
+    def spans(self, hits: List[DocumentChunk]) -> List[Tuple[object, int, int, List[DocumentChunk]]]:
+        """
+        Merge the windows around the hits into (document_id, first index,
+        last index, hits) spans, ordered by the rank of their best hit.
+        """
+        windows: Dict[object, list] = {}
+        for rank, hit in enumerate(hits):
+            windows.setdefault(hit.document_id, []).append(
+                (max(hit.chunk_index - self.neighbors, 0), hit.chunk_index + self.neighbors, rank, hit)
+            )
+
+        spans = []
+        for document_id, document_windows in windows.items():
+            document_windows.sort(key=lambda window: window[0])
+            current = None
+            for start, end, rank, hit in document_windows:
+                # Adjacent windows are merged too when expanding: together
+                # they are contiguous
+                if current and start <= current[2] + (1 if self.neighbors > 0 else 0):
+                    current[2] = max(current[2], end)
+                    current[3] = min(current[3], rank)
+                    current[4].append(hit)
+                else:
+                    current = [document_id, start, end, rank, [hit]]
+                    spans.append(current)
+        spans.sort(key=lambda span: span[3])
+        return [
+            (document_id, start, end, sorted(span_hits, key=lambda hit: hit.chunk_index))
+            for document_id, start, end, _, span_hits in spans
+        ]
+
+    def expand(self, hits: List[DocumentChunk]) -> List[str]:
+        """
+        Build the prompt context for a ranked list of hits.
+
+        Returns:
+            Context passages, most relevant first, within the token budget.
+        """
+        if not hits or self.neighbors <= 0:
+            return [hit.content for hit in hits]
+        spans = self.spans(hits)
+
+        chunks_by_span = {index: [] for index in range(len(spans))}
+        condition = reduce(or_, (
+            Q(document_id=document_id, chunk_index__range=(start, end))
+            for document_id, start, end, _ in spans
+        ))
+        chunks = DocumentChunk.objects.filter(condition).only(
+            'id', 'document_id', 'chunk_index', 'content', 'start_char', 'end_char'
+        ).order_by('document_id', 'chunk_index')
+        for chunk in chunks:
+            for index, (document_id, start, end, _) in enumerate(spans):
+                if chunk.document_id == document_id and start <= chunk.chunk_index <= end:
+                    chunks_by_span[index].append(chunk)
+                    break
+
+        # Every span costs at least its hits; the rest of the budget goes to
+        # expanding spans, best hit first
+        hit_passages = [merge_chunks(span_hits) for _, _, _, span_hits in spans]
+        hit_tokens = [sum(estimate_tokens(passage) for passage in passages) for passages in hit_passages]
+        used = 0
+        included = []
+        for index, tokens in enumerate(hit_tokens):
+            if used + tokens > self.token_budget:
+                break
+            used += tokens
+            included.append(index)
+
+        context = []
+        for index in included:
+            passages = hit_passages[index]
+            expanded = merge_chunks(chunks_by_span[index]) if chunks_by_span[index] else passages
+            extra = sum(estimate_tokens(passage) for passage in expanded) - hit_tokens[index]
+            if expanded is not passages and used + extra <= self.token_budget:
+                used += extra
+                passages = expanded
+            context.extend(passages)
+
+        logger.debug(
+            "Expanded %d hits into %d passages (%d estimated tokens)", len(hits), len(context), used
+        )
+        return context
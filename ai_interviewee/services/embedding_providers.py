@@ -0,0 +1,242 @@
+import hashlib
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from functools import cached_property, lru_cache
+from typing import List, Optional, Tuple
+from django.conf import settings
+from django.utils.module_loading import import_string
+from .async_embedding_executor import AsyncEmbeddingExecutor
+from .openai_embedding_service import OpenAIEmbeddingService
+from .openai_rate_limiter import OpenAIRateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingProvider:
+    """
+    Turns texts into embedding vectors for ingestion and retrieval.
+
+    Providers are registered by name in EMBEDDING_PROVIDERS. Every provider
+    writes vectors in its own embedding space, so an EmbeddingSpace records
+    the provider along with the model, and vectors are only ever embedded by
+    the provider of the space they go into (see get_space_embedding_provider).
+    The active space defaults to the DEFAULT_MODEL and EMBEDDING_VERSION of
+    the provider named by EMBEDDING_PROVIDER.
+
+    Args:
+        model: Model to embed with. Defaults to DEFAULT_MODEL.
+        dimensions: Size of the vectors to return. None returns the model's
+            full size.
+        max_concurrency: Requests in flight at once, for remote providers.
+        max_wait: Longest a remote provider may wait for rate-limit budget
+            before ``embed`` raises EmbeddingDeferred. None waits as long as
+            it takes.
+    """
+
+    name = ''
+    DEFAULT_MODEL = ''
+    # Bump whenever the provider changes the vectors it produces for the
+    # same model (see EmbeddingMigration)
+    EMBEDDING_VERSION = 1
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        dimensions: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_wait: Optional[float] = 10,
+    ) -> None:
+        self.model = model or self.DEFAULT_MODEL
+        self.dimensions = dimensions
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts.
+
+        Returns:
+            One embedding per input text, in the same order.
+
+        Raises:
+            ValueError: If any of the texts is empty.
+            EmbeddingDeferred: If a remote provider had to give up on some
+                texts because of rate limits.
+            EmbeddingFailed: If a remote provider's request failed for
+                another reason after other texts were already embedded.
+        """
+        raise NotImplementedError
+
+    def embed_query(self, text: str) -> Optional[List[float]]:
+        """Embed one search query, or return None if it is empty"""
+        if not text or not text.strip():
+            return None
+        return self.embed([text])[0]
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """
+    Embeddings from the OpenAI API. Batches go through the
+    AsyncEmbeddingExecutor, sharing the workers' rate-limit budget; queries
+    are single synchronous requests.
+
+    Args:
+        api_key: OpenAI API key. Defaults to OPENAI_API_KEY.
+        base_url: API base URL. Defaults to OPENAI_BASE_URL.
+    """
+
+    name = 'openai'
+    DEFAULT_MODEL = OpenAIEmbeddingService.DEFAULT_MODEL
+    EMBEDDING_VERSION = OpenAIEmbeddingService.EMBEDDING_VERSION
+
+    def __init__(self, *args, api_key: Optional[str] = None, base_url: Optional[str] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.api_key = api_key
+        self.base_url = base_url
+
+    def rate_limiter(self) -> OpenAIRateLimiter:
+        return OpenAIRateLimiter()
+
+    @cached_property
+    def executor(self) -> AsyncEmbeddingExecutor:
+        return AsyncEmbeddingExecutor(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            model=self.model,
+            dimensions=self.dimensions,
+            max_concurrency=self.max_concurrency,
+            max_wait=self.max_wait,
+            rate_limiter=self.rate_limiter(),
+        )
+
+    @cached_property
+    def service(self) -> OpenAIEmbeddingService:
+        return OpenAIEmbeddingService(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            model=self.model,
+            dimensions=self.dimensions,
+        )
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self.executor.embed(texts)
+
+    def embed_query(self, text: str) -> Optional[List[float]]:
+        return self.service.generate_embedding(text)
+
+
+@lru_cache(maxsize=1 << 16)
+def _feature_slot(feature: str, dimensions: int) -> Tuple[int, float]:
+    """Vector index and sign a feature hashes to, stable across processes"""
+    digest = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+    return digest % dimensions, 1.0 if digest >> 63 else -1.0
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic embeddings computed on the CPU with the hashing trick:
+    every lower-cased word and word bigram adds its sublinear term frequency
+    to one signed coordinate picked by a stable hash, and the result is
+    scaled to unit length.
+
+    Texts that share vocabulary get similar vectors, which is enough to
+    exercise retrieval meaningfully, and no network or API key is needed, so
+    ingestion and retrieval throughput can be measured on their own.
+    """
+
+    name = 'hashing'
+    DEFAULT_MODEL = 'feature-hashing'
+    DEFAULT_DIMENSIONS = 1536
+
+    TOKEN_PATTERN = re.compile(r'\w+')
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if any(not text or not text.strip() for text in texts):
+            raise ValueError("Cannot generate embeddings for empty or whitespace-only text")
+        return [self._embed_one(text) for text in texts]
+
+    def _embed_one(self, text: str) -> List[float]:
+        dimensions = self.dimensions or self.DEFAULT_DIMENSIONS
+        words = self.TOKEN_PATTERN.findall(text.lower())
+        features = Counter(words)
+        features.update(f'{first} {second}' for first, second in zip(words, words[1:]))
+        if not features:
+            # Only punctuation or symbols: hash the text as a whole
+            features[text.strip()] = 1
+
+        vector = [0.0] * dimensions
+        for feature, count in features.items():
+            index, sign = _feature_slot(feature, dimensions)
+            vector[index] += sign * (1.0 + math.log(count))
+        norm = math.sqrt(sum(x * x for x in vector))
+        if not norm:
+            # Every feature cancelled out; fall back to the first one alone
+            index, sign = _feature_slot(next(iter(features)), dimensions)
+            vector[index], norm = sign, 1.0
+        return [x / norm for x in vector]
+
+
+class FakeServerEmbeddingProvider(OpenAIEmbeddingProvider):
+    """
+    The OpenAI provider pointed at a FakeOpenAIServer: every request goes
+    through the real HTTP client, batching, concurrency and rate limiting,
+    but nothing leaves the machine. Uses FAKE_OPENAI_BASE_URL if set, or
+    else a server started in this process on first use. The rate-limit
+    budget is kept apart from the real API's.
+    """
+
+    name = 'fake_server'
+    DEFAULT_MODEL = 'fake-embedding'
+
+    _server = None
+    _server_lock = threading.Lock()
+
+    def __init__(self, *args, api_key: Optional[str] = None, base_url: Optional[str] = None, **kwargs) -> None:
+        super().__init__(*args, api_key=api_key or 'fake', base_url=base_url or self.server_url(), **kwargs)
+
+    @classmethod
+    def server_url(cls) -> str:
+        if settings.FAKE_OPENAI_BASE_URL:
+            return settings.FAKE_OPENAI_BASE_URL
+        with cls._server_lock:
+            if cls._server is None:
+                from ai_interviewee.fake_openai import FakeOpenAIServer
+                cls._server = FakeOpenAIServer().start()
+                logger.info("Started fake OpenAI server at %s", cls._server.base_url)
+        return cls._server.base_url
+
+    def rate_limiter(self) -> OpenAIRateLimiter:
+        return OpenAIRateLimiter(name='fake-embeddings')
+
+
+def embedding_provider_class(name: Optional[str] = None) -> type:
+    """
+    The provider class registered under a name (defaults to EMBEDDING_PROVIDER).
+
+    Raises:
+        ValueError: If no provider is registered under that name.
+    """
+    name = name or settings.EMBEDDING_PROVIDER
+    try:
+        return import_string(settings.EMBEDDING_PROVIDERS[name])
+    except KeyError:
+        raise ValueError(
+            f"Unknown embedding provider '{name}'. Choose from: {', '.join(settings.EMBEDDING_PROVIDERS)}"
+        )
+
+
+def get_embedding_provider(name: Optional[str] = None, **kwargs) -> EmbeddingProvider:
+    """Build an embedding provider by name (defaults to EMBEDDING_PROVIDER)"""
+    return embedding_provider_class(name)(**kwargs)
+
+
+def get_space_embedding_provider(space, **kwargs) -> EmbeddingProvider:
+    """
+    Build the provider that embeds in an EmbeddingSpace, with the space's
+    model, so vectors written to or compared within the space all come from
+    the same provider whatever EMBEDDING_PROVIDER is now.
+    """
+    return get_embedding_provider(space.provider or None, model=space.model, **kwargs)
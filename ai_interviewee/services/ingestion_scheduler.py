@@ -0,0 +1,211 @@
+import logging
+from typing import Optional, Sequence
+from celery import group
+from django.conf import settings
+from ai_interviewee.utils import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+# Queue a document under its owner and put the owner on the round-robin ring
+# if they aren't already on it. Smaller documents are dispatched first.
+SUBMIT_SCRIPT = """
+local prefix = ARGV[1]
+local owner = ARGV[2]
+redis.call('ZADD', prefix .. ':queue:' .. owner, ARGV[4], ARGV[3])
+if redis.call('SADD', prefix .. ':owners', owner) == 1 then
+    redis.call('RPUSH', prefix .. ':ring', owner)
+end
+return 1
+"""
+
+# Walk the owner ring once and hand out the next document of the first owner
+# that is under their in-flight cap. In-flight slots are leases, so a slot
+# held by a task that was lost for good frees itself once the lease expires.
+# The owner of every in-flight document is kept so it can be released by id.
+# Returns {document_id, owner_id} or nil when nothing can be dispatched.
+DISPATCH_SCRIPT = """
+local prefix = ARGV[1]
+local owner_cap = tonumber(ARGV[2])
+local global_cap = tonumber(ARGV[3])
+local lease = tonumber(ARGV[4])
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local ring = prefix .. ':ring'
+local global_inflight = prefix .. ':inflight'
+local owner_of = prefix .. ':owner-of'
+local expired = redis.call('ZRANGEBYSCORE', global_inflight, '-inf', now)
+if #expired > 0 then
+    redis.call('HDEL', owner_of, unpack(expired))
+    redis.call('ZREMRANGEBYSCORE', global_inflight, '-inf', now)
+end
+if redis.call('ZCARD', global_inflight) >= global_cap then
+    return nil
+end
+
+for i = 1, redis.call('LLEN', ring) do
+    local owner = redis.call('LPOP', ring)
+    local queue = prefix .. ':queue:' .. owner
+    local inflight = prefix .. ':inflight:' .. owner
+    redis.call('ZREMRANGEBYSCORE', inflight, '-inf', now)
+
+    if redis.call('ZCARD', queue) == 0 then
+        redis.call('SREM', prefix .. ':owners', owner)
+    elseif redis.call('ZCARD', inflight) >= owner_cap then
+        redis.call('RPUSH', ring, owner)
+    else
+        local document_id = redis.call('ZPOPMIN', queue)[1]
+        redis.call('ZADD', inflight, now + lease, document_id)
+        redis.call('ZADD', global_inflight, now + lease, document_id)
+        redis.call('HSET', owner_of, document_id, owner)
+        if redis.call('ZCARD', queue) > 0 then
+            redis.call('RPUSH', ring, owner)
+        else
+            redis.call('SREM', prefix .. ':owners', owner)
+        end
+        return {document_id, owner}
+    end
+end
+return nil
+"""
+
+# Free a document's slot. The owner is looked up when it isn't given (an
+# empty ARGV[2]), e.g. for a document deleted while it was in flight.
+RELEASE_SCRIPT = """
+local prefix = ARGV[1]
+local owner = ARGV[2]
+if owner == '' then
+    owner = redis.call('HGET', prefix .. ':owner-of', ARGV[3])
+end
+if owner then
+    redis.call('ZREM', prefix .. ':inflight:' .. owner, ARGV[3])
+end
+redis.call('ZREM', prefix .. ':inflight', ARGV[3])
+redis.call('HDEL', prefix .. ':owner-of', ARGV[3])
+return 1
+"""
+
+
+class IngestionScheduler:
+    """
+    Fair scheduler that sits between document uploads and the extraction workers.
+
+    Instead of pushing every upload straight onto the FIFO Celery queue,
+    documents wait in a per-owner queue in Redis and are released to Celery
+    round-robin across owners. Each owner may only have a few documents in
+    flight at once, and the total in flight is capped to roughly the number
+    of extraction worker slots. A bulk upload from one user therefore can't
+    fill the Celery queue ahead of everybody else's single CV. Within one
+    owner's queue, smaller documents go first.
+
+    When no Redis connection is configured, documents are dispatched
+    straight away, which keeps tests and local scripts simple.
+
+    Args:
+        redis_client: Redis connection. Defaults to the shared connection.
+    """
+
+    KEY_PREFIX = "ingestion"
+
+    def __init__(self, redis_client=None) -> None:
+        self.redis = redis_client if redis_client is not None else get_redis_connection()
+        self.max_in_flight_per_user = settings.INGESTION_MAX_IN_FLIGHT_PER_USER
+        self.max_in_flight = settings.INGESTION_MAX_IN_FLIGHT
+        self.lease_seconds = settings.INGESTION_LEASE_SECONDS
+        if self.redis is not None:
+            self._submit = self.redis.register_script(SUBMIT_SCRIPT)
+            self._dispatch = self.redis.register_script(DISPATCH_SCRIPT)
+            self._release = self.redis.register_script(RELEASE_SCRIPT)
+
+    @property
+    def enabled(self) -> bool:
+        return self.redis is not None
+
+    def submit(self, document) -> None:
+        """Queue a document for processing and dispatch whatever is allowed to run."""
+        from ai_interviewee.tasks import process_document_task
+
+        if not self.enabled:
+            process_document_task.delay(document.id)
+            return
+
+        self._submit(args=[self.KEY_PREFIX, document.owner_id, str(document.id), document.file_size or 0])
+        logger.info(f"Document {document.id} queued for owner {document.owner_id}")
+        self.dispatch()
+
+    def submit_batch(self, documents: Sequence) -> None:
+        """
+        Queue documents uploaded together as one workflow.
+
+        Without Redis they go to Celery as a single group. With Redis every
+        document is queued in one pipelined round trip and dispatched once,
+        so a large batch still waits its turn behind other owners.
+        """
+        from ai_interviewee.tasks import process_document_task
+
+        if not documents:
+            return
+        if not self.enabled:
+            group(process_document_task.si(document.id) for document in documents).apply_async()
+            return
+
+        pipeline = self.redis.pipeline(transaction=False)
+        for document in documents:
+            self._submit(
+                args=[self.KEY_PREFIX, document.owner_id, str(document.id), document.file_size or 0],
+                client=pipeline,
+            )
+        pipeline.execute()
+        logger.info(f"{len(documents)} documents queued for owner {documents[0].owner_id}")
+        self.dispatch()
+
+    def dispatch(self) -> int:
+        """
+        Send queued documents to the extraction workers until every owner is
+        at their cap, the global cap is reached, or nothing is left.
+
+        Returns:
+            The number of documents dispatched.
+        """
+        from ai_interviewee.tasks import dispatch_documents_task, process_document_task
+
+        if not self.enabled:
+            return 0
+
+        dispatched = 0
+        while True:
+            result = self._dispatch(args=[
+                self.KEY_PREFIX,
+                self.max_in_flight_per_user,
+                self.max_in_flight,
+                self.lease_seconds * 1000,
+            ])
+            if not result:
+                # Leases are only reaped while dispatching, so while anything
+                # is in flight make sure a dispatch runs once leases could
+                # have expired, even if nothing else is submitted or released.
+                # The guard key keeps that to one pending sweep per lease
+                # period however often dispatch() is called.
+                if dispatched or self.redis.zcard(f"{self.KEY_PREFIX}:inflight"):
+                    if self.redis.set(f"{self.KEY_PREFIX}:sweep-scheduled", 1, nx=True, ex=self.lease_seconds):
+                        dispatch_documents_task.apply_async(countdown=self.lease_seconds + 1)
+                return dispatched
+            document_id, owner_id = (value.decode() if isinstance(value, bytes) else value for value in result)
+            process_document_task.delay(document_id)
+            logger.debug(f"Dispatched document {document_id} for owner {owner_id}")
+            dispatched += 1
+
+    def release(self, owner_id: Optional[int], document_id, dispatch: bool = True) -> Optional[int]:
+        """
+        Free the in-flight slot held by a document that finished processing
+        (successfully or for good), then dispatch whatever can run next.
+        ``owner_id`` may be None when it isn't known, e.g. because the
+        document was deleted.
+        """
+        if not self.enabled:
+            return None
+        self._release(args=[self.KEY_PREFIX, '' if owner_id is None else owner_id, str(document_id)])
+        if dispatch:
+            return self.dispatch()
+        return None
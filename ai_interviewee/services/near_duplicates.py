@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import random
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from ai_interviewee.models import DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime for the universal hash family used as permutations
+_PRIME = (1 << 61) - 1
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+
+class MinHasher:
+    """
+    MinHash signatures and LSH band keys for chunk text.
+
+    Two chunks agree on each signature position with probability equal to the
+    Jaccard similarity of their word shingles. The signature is cut into
+    ``bands`` bands, and each band is hashed into one key: chunks sharing any
+    key are near-duplicate candidates, and only they need to be compared.
+    With 64 positions in 16 bands, pairs at 0.9 similarity share a key more
+    than 99.9% of the time, pairs at 0.5 about 64% of the time and pairs at
+    0.3 about 12%, so candidates are then checked with the full signature.
+
+    Args:
+        num_perm: Signature length.
+        bands: Number of LSH bands; must divide ``num_perm``.
+        shingle_size: Words per shingle.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 5) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # Fixed seed: signatures must stay comparable across processes and releases
+        rng = random.Random(1)
+        self.permutations = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)
+        ]
+
+    def shingles(self, text: str) -> set:
+        words = text.lower().split()
+        if len(words) <= self.shingle_size:
+            return {' '.join(words)}
+        return {
+            ' '.join(words[i:i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+
+    def signature(self, text: str) -> List[int]:
+        hashes = [_hash64(shingle.encode()) for shingle in self.shingles(text)]
+        return [min((a * h + b) % _PRIME for h in hashes) for a, b in self.permutations]
+
+    def band_keys(self, signature: List[int]) -> List[int]:
+        """One signed 64-bit key per band (so it fits a bigint column)"""
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            data = band.to_bytes(2, 'big') + b''.join(value.to_bytes(8, 'big') for value in rows)
+            keys.append(int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big', signed=True))
+        return keys
+
+    @staticmethod
+    def similarity(first: List[int], second: List[int]) -> float:
+        """Estimated Jaccard similarity of the texts behind two signatures"""
+        return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+class NearDuplicateDetector:
+    """
+    Finds chunks that are near-duplicates of chunks the owner already has,
+    e.g. from an earlier version of the same CV.
+
+    A near-duplicate points at its canonical chunk with ``duplicate_of``. It
+    copies the canonical chunk's embedding instead of being embedded again,
+    and only the best-ranked copy is kept at retrieval time.
+
+    Args:
+        threshold: Estimated Jaccard similarity from which chunks count as
+            near-duplicates. Defaults to NEAR_DUPLICATE_THRESHOLD.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, hasher: Optional[MinHasher] = None) -> None:
+        self.threshold = settings.NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+        self.hasher = hasher or MinHasher()
+
+    def fingerprint(self, text: str) -> Tuple[List[int], List[int]]:
+        """The (minhash, lsh_bands) values to store on a chunk"""
+        signature = self.hasher.signature(text)
+        return signature, self.hasher.band_keys(signature)
+
+    def link_duplicates(self, owner_id, document_id, chunks: List[DocumentChunk]) -> int:
+        """
+        Point new chunks of a document at near-duplicates among the owner's
+        other documents, using one indexed query for every candidate.
+
+        Returns:
+            The number of chunks marked as near-duplicates.
+        """
+        chunks = [chunk for chunk in chunks if chunk.lsh_bands]
+        if not chunks:
+            return 0
+
+        all_bands = sorted({key for chunk in chunks for key in chunk.lsh_bands})
+        candidates = list(
+            DocumentChunk.objects.filter(document__owner_id=owner_id, lsh_bands__overlap=all_bands)
+            .exclude(document_id=document_id)
+            .only('id', 'duplicate_of_id', 'minhash', 'lsh_bands')
+        )
+        by_band: Dict[int, List[DocumentChunk]] = {}
+        for candidate in candidates:
+            for key in candidate.lsh_bands:
+                by_band.setdefault(key, []).append(candidate)
+
+        linked = []
+        for chunk in chunks:
+            best, best_similarity = None, self.threshold
+            seen = set()
+            for key in chunk.lsh_bands:
+                for candidate in by_band.get(key, ()):
+                    if candidate.id in seen:
+                        continue
+                    seen.add(candidate.id)
+                    similarity = self.hasher.similarity(chunk.minhash, candidate.minhash)
+                    if similarity >= best_similarity:
+                        best, best_similarity = candidate, similarity
+            if best:
+                chunk.duplicate_of_id = best.duplicate_of_id or best.id
+                linked.append(chunk)
+
+        DocumentChunk.objects.bulk_update(linked, ['duplicate_of'])
+        logger.info(
+            "Document %s: %d of %d chunks are near-duplicates of earlier chunks",
+            document_id, len(linked), len(chunks),
+        )
+        return len(linked)
+
+
+def collapse_near_duplicates(chunks: List[DocumentChunk]) -> List[DocumentChunk]:
+    """Keep only the first (best-ranked) chunk of every near-duplicate group"""
+    seen = set()
+    collapsed = []
+    for chunk in chunks:
+        group = chunk.duplicate_of_id or chunk.id
+        if group not in seen:
+            seen.add(group)
+            collapsed.append(chunk)
+    return collapsed
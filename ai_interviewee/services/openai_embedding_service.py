@@ -17,6 +17,9 @@ class OpenAIEmbeddingService:
     Args:
         api_key: OpenAI API key. If None, reads from OPENAI_API_KEY env var.
         model: The embedding model to use. Defaults to text-embedding-3-small.
+        dimensions: Ask the API for shortened embeddings of this size. None
+            returns the model's full-size vectors.
+        base_url: API base URL. Defaults to OPENAI_BASE_URL.
         
     Raises:
         ValueError: If no API key is provided via parameter or environment variable.
@@ -24,8 +27,17 @@ class OpenAIEmbeddingService:
     
     # Class constant for default model
     DEFAULT_MODEL = "text-embedding-3-small"
+    # Bump whenever the pipeline changes the vectors it produces for the same
+    # model, so old and new vectors are never compared (see EmbeddingMigration)
+    EMBEDDING_VERSION = 1
     
-    def __init__(self, api_key: Optional[str] = None, model: str = DEFAULT_MODEL) -> None:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = DEFAULT_MODEL,
+        dimensions: Optional[int] = None,
+        base_url: Optional[str] = None,
+    ) -> None:
         api_key = api_key or settings.OPENAI_API_KEY
         if not api_key:
             raise ValueError(
@@ -33,10 +45,17 @@ class OpenAIEmbeddingService:
                 "variable or pass it to the constructor."
             )
         
-        self.client = openai.OpenAI(api_key=api_key)
+        self.client = openai.OpenAI(api_key=api_key, base_url=base_url or settings.OPENAI_BASE_URL)
         self.model = model
+        self.dimensions = dimensions
         logger.info("OpenAIEmbeddingService initialized with model: %s", self.model)
 
+    def _request_options(self) -> dict:
+        options = {"model": self.model}
+        if self.dimensions:
+            options["dimensions"] = self.dimensions
+        return options
+
     def generate_embedding(self, text: str) -> Optional[List[float]]:
         """
         Generate an embedding for the given text using the specified OpenAI model.
@@ -58,7 +77,7 @@ class OpenAIEmbeddingService:
         try:
             response = self.client.embeddings.create(
                 input=text,
-                model=self.model
+                **self._request_options()
             )
             embedding = response.data[0].embedding
             logger.debug(
@@ -73,3 +92,39 @@ class OpenAIEmbeddingService:
         except Exception as e:
             logger.error("Unexpected error during embedding generation: %s", e)
             raise
+
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for several texts in a single API request.
+        
+        Args:
+            texts: The input texts. Empty or whitespace-only texts are not allowed.
+            
+        Returns:
+            One embedding vector per input text, in the same order.
+            
+        Raises:
+            ValueError: If any of the texts is empty.
+            openai.APIError: If there's an API-related error.
+        """
+        if not texts:
+            return []
+        if any(not text or not text.strip() for text in texts):
+            raise ValueError("Cannot generate embeddings for empty or whitespace-only text")
+
+        try:
+            response = self.client.embeddings.create(
+                input=texts,
+                **self._request_options()
+            )
+            # The API may return items out of order, so sort on their index
+            data = sorted(response.data, key=lambda item: item.index)
+            logger.debug("Successfully generated %d embeddings in one request", len(data))
+            return [item.embedding for item in data]
+
+        except openai.APIError as e:
+            logger.error("OpenAI API error during batch embedding generation: %s", e)
+            raise
+        except Exception as e:
+            logger.error("Unexpected error during batch embedding generation: %s", e)
+            raise
@@ -0,0 +1,348 @@
+import logging
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import List, Optional, Tuple
+from django.conf import settings
+from ai_interviewee.utils import estimate_tokens, get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+# Atomically refills and debits two token buckets (requests and tokens per
+# minute) using the Redis server clock, so every worker sees the same budget.
+# Returns {granted, wait_ms, remaining_requests, remaining_tokens}.
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+
+local blocked_until = tonumber(redis.call('GET', KEYS[3]) or '0')
+if blocked_until > now then
+    return {0, blocked_until - now, 0, 0}
+end
+
+local function refill(key, capacity)
+    local state = redis.call('HMGET', key, 'level', 'ts')
+    local level = tonumber(state[1])
+    local ts = tonumber(state[2])
+    if level == nil or ts == nil then
+        return capacity
+    end
+    return math.min(capacity, level + (now - ts) * capacity / 60000)
+end
+
+local request_capacity = tonumber(ARGV[1])
+local token_capacity = tonumber(ARGV[2])
+local request_cost = tonumber(ARGV[3])
+local token_cost = tonumber(ARGV[4])
+
+local request_level = refill(KEYS[1], request_capacity)
+local token_level = refill(KEYS[2], token_capacity)
+
+local wait = 0
+if request_level < request_cost then
+    wait = math.max(wait, math.ceil((request_cost - request_level) * 60000 / request_capacity))
+end
+if token_level < token_cost then
+    wait = math.max(wait, math.ceil((token_cost - token_level) * 60000 / token_capacity))
+end
+
+local granted = 0
+if wait == 0 then
+    granted = 1
+    request_level = request_level - request_cost
+    token_level = token_level - token_cost
+end
+
+redis.call('HSET', KEYS[1], 'level', request_level, 'ts', now)
+redis.call('HSET', KEYS[2], 'level', token_level, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+redis.call('PEXPIRE', KEYS[2], 120000)
+
+return {granted, wait, math.floor(request_level), math.floor(token_level)}
+"""
+
+# Fits a batch to the same buckets: counts how many of the texts (token
+# costs in ARGV[4..]) fit in the token budget that is left, at least one.
+# With ARGV[3] = 0 nothing is written back, so this is a read-only view of
+# the budget. With ARGV[3] = 1 one request and the batch's tokens are taken
+# when available, so the batch is sized to the budget it actually gets.
+# Returns {fit, wait_ms, remaining_requests, remaining_tokens}; fit is 0
+# while blocked, or when taking the budget would have to wait.
+BATCH_BUDGET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+
+local blocked_until = tonumber(redis.call('GET', KEYS[3]) or '0')
+if blocked_until > now then
+    return {0, blocked_until - now, 0, 0}
+end
+
+local function refill(key, capacity)
+    local state = redis.call('HMGET', key, 'level', 'ts')
+    local level = tonumber(state[1])
+    local ts = tonumber(state[2])
+    if level == nil or ts == nil then
+        return capacity
+    end
+    return math.min(capacity, level + (now - ts) * capacity / 60000)
+end
+
+local request_capacity = tonumber(ARGV[1])
+local token_capacity = tonumber(ARGV[2])
+local debit = tonumber(ARGV[3]) == 1
+local request_level = refill(KEYS[1], request_capacity)
+local token_level = refill(KEYS[2], token_capacity)
+
+local fit = 0
+local cost = 0
+for i = 4, #ARGV do
+    local next_cost = cost + tonumber(ARGV[i])
+    if fit > 0 and next_cost > token_level then
+        break
+    end
+    cost = next_cost
+    fit = fit + 1
+end
+
+if not debit or fit == 0 then
+    return {fit, 0, math.floor(request_level), math.floor(token_level)}
+end
+
+local wait = 0
+if request_level < 1 then
+    wait = math.ceil((1 - request_level) * 60000 / request_capacity)
+end
+if token_level < cost then
+    wait = math.max(wait, math.ceil((cost - token_level) * 60000 / token_capacity))
+end
+if wait > 0 then
+    return {0, wait, math.floor(request_level), math.floor(token_level)}
+end
+
+request_level = request_level - 1
+token_level = token_level - cost
+redis.call('HSET', KEYS[1], 'level', request_level, 'ts', now)
+redis.call('HSET', KEYS[2], 'level', token_level, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+redis.call('PEXPIRE', KEYS[2], 120000)
+return {fit, 0, math.floor(request_level), math.floor(token_level)}
+"""
+
+# Only ever extends the shared cool-down, never shortens it.
+BLOCK_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local until_ms = now + tonumber(ARGV[1])
+if until_ms > current then
+    redis.call('SET', KEYS[1], until_ms, 'PX', tonumber(ARGV[1]))
+end
+return until_ms
+"""
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse durations such as '20ms', '1s' or '6m0s' into seconds."""
+    parts = _DURATION_PART.findall(value.strip())
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def retry_after_seconds(error: Exception, attempt: int = 0) -> float:
+    """
+    Work out how long to back off after a rate-limited OpenAI call.
+
+    Prefers the ``retry-after-ms``/``retry-after`` headers returned by the API,
+    then the ``x-ratelimit-reset-*`` headers, and finally falls back to
+    exponential backoff with jitter.
+
+    Args:
+        error: The exception raised by the OpenAI client.
+        attempt: How many times the caller has already retried.
+
+    Returns:
+        The number of seconds to wait before trying again.
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    resets = [
+        _parse_duration(headers[name])
+        for name in ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens')
+        if headers.get(name)
+    ]
+    resets = [reset for reset in resets if reset is not None]
+    if resets:
+        return max(resets)
+
+    return min(60.0, 2 ** attempt) + random.uniform(0, 1)
+
+
+class OpenAIRateLimiter:
+    """
+    Redis-backed token bucket shared by every Celery worker.
+
+    Tracks both requests-per-minute and tokens-per-minute for one OpenAI
+    endpoint, plus a shared cool-down that is set whenever the API answers
+    with a rate-limit error. When no Redis connection is configured the
+    limiter grants everything, which keeps tests and local scripts simple.
+
+    Args:
+        name: Namespace for the Redis keys, one per rate-limited endpoint.
+        requests_per_minute: Request budget. Defaults to OPENAI_EMBEDDING_RPM.
+        tokens_per_minute: Token budget. Defaults to OPENAI_EMBEDDING_TPM.
+        redis_client: Redis connection. Defaults to the shared connection.
+    """
+
+    KEY_PREFIX = "openai-rate-limit"
+
+    def __init__(
+        self,
+        name: str = "embeddings",
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        redis_client=None,
+    ) -> None:
+        self.requests_per_minute = requests_per_minute or settings.OPENAI_EMBEDDING_RPM
+        self.tokens_per_minute = tokens_per_minute or settings.OPENAI_EMBEDDING_TPM
+        self.redis = redis_client if redis_client is not None else get_redis_connection()
+        self.keys = [
+            f"{self.KEY_PREFIX}:{name}:requests",
+            f"{self.KEY_PREFIX}:{name}:tokens",
+            f"{self.KEY_PREFIX}:{name}:blocked",
+        ]
+        if self.redis is not None:
+            self._token_bucket = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+            self._batch_budget = self.redis.register_script(BATCH_BUDGET_SCRIPT)
+            self._block = self.redis.register_script(BLOCK_SCRIPT)
+
+    @property
+    def enabled(self) -> bool:
+        return self.redis is not None
+
+    def _run(self, requests: int, tokens: int) -> Tuple[bool, float, int, int]:
+        tokens = min(tokens, self.tokens_per_minute)
+        granted, wait_ms, remaining_requests, remaining_tokens = self._token_bucket(
+            keys=self.keys,
+            args=[self.requests_per_minute, self.tokens_per_minute, requests, tokens],
+        )
+        return bool(granted), int(wait_ms) / 1000, int(remaining_requests), int(remaining_tokens)
+
+    def acquire(self, tokens: int, requests: int = 1) -> float:
+        """
+        Try to take ``requests`` and ``tokens`` from the shared budget.
+
+        Returns:
+            0 if the budget was granted, otherwise the number of seconds to
+            wait before the budget will be available.
+        """
+        if not self.enabled:
+            return 0.0
+        granted, wait, _, _ = self._run(requests, tokens)
+        if not granted:
+            logger.debug("Rate limit budget exhausted, wait %.2fs", wait)
+        return 0.0 if granted else wait
+
+    def wait_and_acquire(self, tokens: int, requests: int = 1, max_wait: float = 300) -> None:
+        """
+        Block the calling thread until the budget is granted.
+
+        Raises:
+            TimeoutError: If the budget is not granted within ``max_wait`` seconds.
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self.acquire(tokens, requests)
+            if not wait:
+                return
+            if time.monotonic() + wait > deadline:
+                raise TimeoutError(f"Rate limit budget not available within {max_wait}s")
+            time.sleep(wait)
+
+    def _run_batch(self, costs: List[int], debit: bool) -> Tuple[int, float, int, int]:
+        fit, wait_ms, remaining_requests, remaining_tokens = self._batch_budget(
+            keys=self.keys,
+            args=[self.requests_per_minute, self.tokens_per_minute, int(debit), *costs],
+        )
+        return int(fit), int(wait_ms) / 1000, int(remaining_requests), int(remaining_tokens)
+
+    def _batch_costs(self, texts: List[str], max_batch_size: Optional[int]) -> List[int]:
+        max_batch_size = max_batch_size or settings.OPENAI_EMBEDDING_BATCH_SIZE
+        return [min(estimate_tokens(text), self.tokens_per_minute) for text in texts[:max_batch_size]]
+
+    def remaining(self) -> Tuple[int, int]:
+        """Return the (requests, tokens) currently left in the shared budget."""
+        if not self.enabled:
+            return self.requests_per_minute, self.tokens_per_minute
+        _, _, remaining_requests, remaining_tokens = self._run_batch([], debit=False)
+        return remaining_requests, remaining_tokens
+
+    def block_for(self, seconds: float) -> None:
+        """Pause every worker using this limiter for ``seconds``."""
+        if not self.enabled or seconds <= 0:
+            return
+        logger.warning("OpenAI rate limit hit, pausing all workers for %.2fs", seconds)
+        self._block(keys=[self.keys[2]], args=[int(seconds * 1000)])
+
+    def fit_batch(self, texts: List[str], max_batch_size: Optional[int] = None) -> int:
+        """
+        Pick how many of ``texts`` to send in the next request, without
+        taking any budget.
+
+        The batch grows while its estimated token count fits in the token
+        budget that is currently left, so batches shrink as the shared budget
+        runs low instead of being rejected outright. At least one text is
+        always returned so callers make progress.
+        """
+        if not texts:
+            return 0
+        costs = self._batch_costs(texts, max_batch_size)
+        if not self.enabled:
+            return len(costs)
+        # One round trip that neither spends budget nor moves the buckets on
+        fit, _, _, _ = self._run_batch(costs, debit=False)
+        return max(fit, 1)
+
+    def acquire_batch(self, texts: List[str], max_batch_size: Optional[int] = None) -> Tuple[int, float]:
+        """
+        Size the next request to the budget that is left and take that
+        budget, in one atomic step, so concurrent callers never size their
+        batches from the same stale view of the budget.
+
+        Returns:
+            ``(size, 0)`` once one request and the tokens of the first
+            ``size`` texts were taken, or ``(0, wait)`` with the seconds to
+            wait before even one text can be sent.
+        """
+        if not texts:
+            return 0, 0.0
+        costs = self._batch_costs(texts, max_batch_size)
+        if not self.enabled:
+            return len(costs), 0.0
+        fit, wait, _, _ = self._run_batch(costs, debit=True)
+        if not fit:
+            logger.debug("Rate limit budget exhausted, wait %.2fs", wait)
+            return 0, max(wait, 0.001)
+        return fit, 0.0
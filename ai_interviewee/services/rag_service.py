@@ -1,10 +1,12 @@
 import logging
 import openai
 from django.conf import settings
-from django.db.models import F
-from pgvector.django import L2Distance
-from ai_interviewee.models import Document, DocumentChunk, UserProfile
-from .openai_embedding_service import OpenAIEmbeddingService
+from typing import Optional
+from ai_interviewee.models import Document, DocumentChunk, UserProfile, EmbeddingMigration
+from .embedding_providers import get_space_embedding_provider
+from .retrieval_strategies import RetrievalFilters, get_retrieval_strategy
+from .context_expansion import ContextExpander
+from .near_duplicates import collapse_near_duplicates
 
 logger = logging.getLogger(__name__)
 
@@ -12,20 +14,42 @@ class RagService:
     """
     Service for Retrieval-Augmented Generation (RAG) using OpenAI and Django-pgvector.
     """
-    def __init__(self):
-        self.embedding_service = OpenAIEmbeddingService(api_key=settings.OPENAI_API_KEY)
-        self.openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(self, retrieval_strategy: Optional[str] = None, context_neighbors: Optional[int] = None):
+        """
+        Args:
+            retrieval_strategy: Name of the retrieval strategy to use (see
+                RETRIEVAL_STRATEGIES). Defaults to RAG_RETRIEVAL_STRATEGY.
+            context_neighbors: Chunks to add on each side of every retrieved
+                chunk. Defaults to RAG_CONTEXT_NEIGHBORS.
+        """
+        # Questions are embedded in the active space and only compared with
+        # chunks from that same space, even while a re-embedding is running
+        self.embedding_space = EmbeddingMigration.active_space()
+        self.embedding_field, dimensions = DocumentChunk.embedding_storage()
+        self.embedding_provider = get_space_embedding_provider(self.embedding_space, dimensions=dimensions)
+        self.retrieval_strategy = get_retrieval_strategy(
+            retrieval_strategy,
+            field=self.embedding_field,
+            dimensions=dimensions or 1536,
+        )
+        self.context_expander = ContextExpander(neighbors=context_neighbors)
+        self.openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
         self.chat_model = "gpt-4.1-mini" # Or gpt-4, depending on preference/availability
 
-    def call(self, question: str, persona: UserProfile) -> str:
+    def call(self, question: str, persona: UserProfile, filters: Optional[RetrievalFilters] = None) -> str:
         """
         Performs RAG logic to answer a question based on retrieved document chunks.
+
+        Args:
+            question: The interviewer's question.
+            persona: The persona whose documents are searched.
+            filters: Only search some of the persona's documents.
         """
         if not question or not persona:
             raise ValueError("Question and Persona must be provided.")
 
         # 1. Get the question's embedding
-        question_embedding = self.embedding_service.generate_embedding(question)
+        question_embedding = self.embedding_provider.embed_query(question)
         if question_embedding is None:
             logger.error("Failed to generate embedding for the question.")
             return "Error: Could not process the question."
@@ -39,12 +63,20 @@ class RagService:
 
             user = persona.user
             user_documents = Document.objects.filter(owner=user)
-            similar_chunks = DocumentChunk.objects.filter(document__in=user_documents).annotate(
-                distance=L2Distance('embedding', question_embedding)
-            ).order_by('distance')[:5]
+            candidate_chunks = DocumentChunk.objects.filter(
+                document__in=user_documents,
+                embedding_model=self.embedding_space.model,
+                embedding_version=self.embedding_space.version,
+            )
+            if filters:
+                candidate_chunks = filters.apply(candidate_chunks)
+            # Fetch extra hits so there are still 5 once near-duplicates
+            # (e.g. the same paragraph in two CV versions) are collapsed
+            similar_chunks = self.retrieval_strategy.retrieve(candidate_chunks, question_embedding, k=10)
+            similar_chunks = collapse_near_duplicates(similar_chunks)[:5]
             
-            context_chunks = [chunk.content for chunk in similar_chunks]
-            logger.debug(f"Retrieved {len(context_chunks)} similar document chunks for persona")
+            context_chunks = self.context_expander.expand(similar_chunks)
+            logger.debug(f"Retrieved {len(similar_chunks)} similar document chunks for persona")
         except Exception as e:
             logger.error(f"Error querying similar document chunks: {e}")
             return "Error: Could not retrieve relevant information."
@@ -0,0 +1,185 @@
+import abc
+import logging
+from contextlib import contextmanager
+from typing import List, NamedTuple, Optional, Sequence
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Func, Value
+from django.db.models.functions import Cast
+from pgvector.django import BitField, HammingDistance, L2Distance, MaxInnerProduct
+
+logger = logging.getLogger(__name__)
+
+# pgvector rejects hnsw.ef_search above this
+HNSW_MAX_EF_SEARCH = 1000
+
+
+class BinaryQuantize(Func):
+    """pgvector binary_quantize(): one bit per dimension, set when positive"""
+    function = 'binary_quantize'
+    output_field = BitField()
+
+
+def binary_quantized(field_name: str, dimensions: int) -> Cast:
+    """
+    The binary-quantized copy of a vector column, written exactly as the HNSW
+    expression indexes on DocumentChunk are, so the planner can use them.
+    """
+    return Cast(BinaryQuantize(F(field_name)), output_field=BitField(length=dimensions))
+
+
+@contextmanager
+def hnsw_search(**options):
+    """
+    Run the enclosed queries in a transaction with the given ``hnsw.*``
+    settings applied, e.g. ``hnsw_search(ef_search=200)``. Iterative scans
+    (``iterative_scan``) need pgvector 0.8 or later.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        for name, value in options.items():
+            cursor.execute(f"SET LOCAL hnsw.{name} = %s", [value])
+        yield
+
+
+class RetrievalFilters(NamedTuple):
+    """
+    Restricts retrieval to some of a persona's documents. Empty values don't
+    filter.
+
+    Attributes:
+        document_types: Only documents of these types (Document.DOCUMENT_TYPES).
+        tags: Only documents tagged with every one of these tags.
+        is_public: Only public (True) or only private (False) documents.
+    """
+    document_types: Sequence[str] = ()
+    tags: Sequence[str] = ()
+    is_public: Optional[bool] = None
+
+    def apply(self, chunks):
+        """Filter a DocumentChunk queryset; the conditions join on the document"""
+        if self.document_types:
+            chunks = chunks.filter(document__document_type__in=self.document_types)
+        if self.tags:
+            # JSON containment (@>), served by the GIN index on Document.tags
+            chunks = chunks.filter(document__tags__contains=list(self.tags))
+        if self.is_public is not None:
+            chunks = chunks.filter(document__is_public=self.is_public)
+        return chunks
+
+
+class RetrievalStrategy(abc.ABC):
+    """
+    Ranks chunks by similarity to a query embedding.
+
+    Args:
+        field: The vector column to search (see DocumentChunk.embedding_storage).
+        dimensions: Size of the vectors in that column.
+    """
+    name = None
+
+    def __init__(self, field: str = 'embedding', dimensions: int = 1536) -> None:
+        self.field = field
+        self.dimensions = dimensions
+
+    @abc.abstractmethod
+    def retrieve(self, queryset, query_embedding: List[float], k: int) -> list:
+        """Return the ``k`` chunks from ``queryset`` closest to the query."""
+
+
+class ExactRetrieval(RetrievalStrategy):
+    """Orders chunks by exact L2 distance on the stored vectors."""
+    name = 'exact'
+
+    def retrieve(self, queryset, query_embedding, k):
+        return list(
+            queryset.annotate(distance=L2Distance(self.field, query_embedding)).order_by('distance')[:k]
+        )
+
+
+class InnerProductRetrieval(RetrievalStrategy):
+    """
+    Orders chunks by inner product. Stored vectors are unit length (see
+    DocumentChunk.set_embedding), so this ranks exactly like L2 distance and
+    cosine similarity but skips the norm arithmetic, and uses the
+    ``*_ip_ops`` HNSW indexes.
+    """
+    name = 'inner_product'
+
+    def retrieve(self, queryset, query_embedding, k):
+        # <#> is the negative inner product, so ascending is most similar first
+        nearest = queryset.annotate(
+            distance=MaxInnerProduct(self.field, query_embedding)
+        ).order_by('distance')[:k]
+        # Keep scanning the index until k chunks pass the filters, instead of
+        # filtering the first ef_search neighbours and returning fewer
+        with hnsw_search(iterative_scan='strict_order'):
+            return list(nearest)
+
+
+class BinaryRerankRetrieval(RetrievalStrategy):
+    """
+    Two-stage retrieval that keeps the index small enough for RAM at scale.
+
+    The first stage fetches ``candidates`` chunks by Hamming distance over the
+    binary-quantized vectors (1 bit per dimension, so the HNSW index is 32x
+    smaller than on float32 vectors). The second stage re-ranks just those
+    candidates by exact L2 distance on the full vectors. Both stages run as a
+    single SQL statement, with the first as a subquery.
+
+    Args:
+        candidates: First-stage candidates to re-rank. Defaults to
+            RAG_BINARY_CANDIDATES.
+    """
+    name = 'binary_rerank'
+
+    def __init__(self, field='embedding', dimensions=1536, candidates: Optional[int] = None) -> None:
+        super().__init__(field, dimensions)
+        self.candidates = candidates or settings.RAG_BINARY_CANDIDATES
+
+    def retrieve(self, queryset, query_embedding, k):
+        # Same rule as binary_quantize(): a bit is set for each positive component
+        query_bits = ''.join('1' if x > 0 else '0' for x in query_embedding)
+        hamming = HammingDistance(
+            binary_quantized(self.field, self.dimensions),
+            Cast(Value(query_bits), output_field=BitField(length=self.dimensions)),
+        )
+        candidates = (
+            queryset.filter(**{f'{self.field}__isnull': False})
+            .annotate(hamming_distance=hamming)
+            .order_by('hamming_distance')
+            .values('pk')[:self.candidates]
+        )
+        reranked = (
+            queryset.model.objects.filter(pk__in=candidates)
+            .annotate(distance=L2Distance(self.field, query_embedding))
+            .order_by('distance')[:k]
+        )
+        # An HNSW scan returns at most ef_search rows, and only keeps going
+        # past rows that fail the filters with an iterative scan. Above
+        # HNSW_MAX_EF_SEARCH candidates the iterative scan makes up the rest.
+        ef_search = min(max(self.candidates, 40), HNSW_MAX_EF_SEARCH)
+        with hnsw_search(ef_search=ef_search, iterative_scan='relaxed_order'):
+            return list(reranked)
+
+
+RETRIEVAL_STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (ExactRetrieval, InnerProductRetrieval, BinaryRerankRetrieval)
+}
+
+
+def get_retrieval_strategy(name: Optional[str] = None, **kwargs) -> RetrievalStrategy:
+    """
+    Build a retrieval strategy by name (defaults to RAG_RETRIEVAL_STRATEGY).
+
+    Raises:
+        ValueError: If no strategy is registered under that name.
+    """
+    name = name or settings.RAG_RETRIEVAL_STRATEGY
+    try:
+        strategy_class = RETRIEVAL_STRATEGIES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown retrieval strategy '{name}'. Choose from: {', '.join(RETRIEVAL_STRATEGIES)}"
+        )
+    return strategy_class(**kwargs)
@@ -85,6 +85,124 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
+# Task routing: CPU-bound extraction and network-bound embedding run on
+# separate queues so they never compete for the same worker slots.
+# See ai_interviewee/celery.py for the matching worker launch profiles.
+from kombu import Queue
+
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_QUEUES = (
+    Queue('default'),
+    Queue('extraction'),
+    Queue('embedding'),
+)
+CELERY_TASK_ROUTES = {
+    'ai_interviewee.tasks.process_document_task': {'queue': 'extraction'},
+    'ai_interviewee.tasks.dispatch_documents_task': {'queue': 'extraction'},
+    'ai_interviewee.tasks.generate_embedding_task': {'queue': 'embedding'},
+    'ai_interviewee.tasks.generate_document_embeddings_task': {'queue': 'embedding'},
+    'ai_interviewee.tasks.reembed_chunks_task': {'queue': 'embedding'},
+}
+
+# Only acknowledge a task once it has finished, so a crashed worker's task is
+# redelivered, and only reserve one task per process at a time so long
+# extractions don't hold on to work another process could start.
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Redis used to coordinate Celery workers (shared OpenAI rate limits)
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://redis:6379/1')
+
+# OpenAI API credentials. OPENAI_BASE_URL points the clients at another
+# OpenAI-compatible server, e.g. ai_interviewee.fake_openai for offline runs
+OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL') or None
+
+# Embedding providers by name (see services.embedding_providers) and the
+# one ingestion and retrieval use until an embedding migration cuts over;
+# from then on the migration's provider serves the active space, so switch
+# providers with 'manage.py reembed_chunks start --provider ...'. 'hashing'
+# embeds on the CPU without any API calls; 'fake_server' sends real requests
+# to a FakeOpenAIServer at FAKE_OPENAI_BASE_URL, or to one started
+# in-process if that is unset
+EMBEDDING_PROVIDERS = {
+    'openai': 'ai_interviewee.services.embedding_providers.OpenAIEmbeddingProvider',
+    'hashing': 'ai_interviewee.services.embedding_providers.HashingEmbeddingProvider',
+    'fake_server': 'ai_interviewee.services.embedding_providers.FakeServerEmbeddingProvider',
+}
+EMBEDDING_PROVIDER = os.environ.get('EMBEDDING_PROVIDER', 'openai')
+FAKE_OPENAI_BASE_URL = os.environ.get('FAKE_OPENAI_BASE_URL') or None
+
+# OpenAI embedding limits shared by all workers
+OPENAI_EMBEDDING_RPM = int(os.environ.get('OPENAI_EMBEDDING_RPM', '3000'))
+OPENAI_EMBEDDING_TPM = int(os.environ.get('OPENAI_EMBEDDING_TPM', '1000000'))
+OPENAI_EMBEDDING_BATCH_SIZE = int(os.environ.get('OPENAI_EMBEDDING_BATCH_SIZE', '100'))
+# Embedding requests in flight at once inside one worker process
+OPENAI_EMBEDDING_CONCURRENCY = int(os.environ.get('OPENAI_EMBEDDING_CONCURRENCY', '8'))
+# Times in a row an embedding task may re-queue itself to wait for rate-limit
+# budget before giving up (usually a sign RPM/TPM don't match the account)
+EMBEDDING_MAX_DEFERRALS = int(os.environ.get('EMBEDDING_MAX_DEFERRALS', '20'))
+
+# How chunk vectors are stored: 'full' keeps the model's full-size float32
+# vector, 'compact' requests 512-dimension embeddings and stores them as
+# half-precision (DocumentChunk.compact_embedding). Fill the compact column
+# with 'manage.py backfill_embeddings --compact-from-full' before switching.
+EMBEDDING_STORAGE = os.environ.get('EMBEDDING_STORAGE', 'full')
+
+# How RagService finds chunks: 'exact' ranks by L2 distance on the stored
+# vectors, 'inner_product' by inner product on the same unit-length vectors
+# (same ranking, cheaper), 'binary_rerank' takes RAG_BINARY_CANDIDATES chunks by Hamming
+# distance over binary-quantized vectors and re-ranks them exactly. After
+# changing this or EMBEDDING_STORAGE, build the index the strategy searches
+# with 'manage.py vector_indexes --drop-unused'
+RAG_RETRIEVAL_STRATEGY = os.environ.get('RAG_RETRIEVAL_STRATEGY', 'exact')
+RAG_BINARY_CANDIDATES = int(os.environ.get('RAG_BINARY_CANDIDATES', '200'))
+# Chunks added on each side of every retrieved chunk, and the most context
+# tokens RagService puts in the prompt
+RAG_CONTEXT_NEIGHBORS = int(os.environ.get('RAG_CONTEXT_NEIGHBORS', '0'))
+RAG_CONTEXT_TOKEN_BUDGET = int(os.environ.get('RAG_CONTEXT_TOKEN_BUDGET', '3000'))
+
+# Client the batch_embeddings command submits request files through: any
+# class with submit/status/results/cancel (see services.batch_embedding)
+EMBEDDING_BATCH_CLIENT = os.environ.get(
+    'EMBEDDING_BATCH_CLIENT', 'ai_interviewee.services.batch_embedding.OpenAIBatchClient'
+)
+
+# Background re-embedding (EmbeddingMigration): chunks per batch and the
+# pause between batches, so re-embedding never crowds out live ingestion
+EMBEDDING_MIGRATION_BATCH_SIZE = int(os.environ.get('EMBEDDING_MIGRATION_BATCH_SIZE', '500'))
+EMBEDDING_MIGRATION_THROTTLE_SECONDS = float(os.environ.get('EMBEDDING_MIGRATION_THROTTLE_SECONDS', '5'))
+
+# Estimated Jaccard similarity (of 5-word shingles) from which a new chunk
+# counts as a near-duplicate of one the owner already has
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', '0.9'))
+
+# Document uploads: largest file accepted, and the chunk size uploads are
+# streamed to disk in (the most memory one upload holds at a time)
+DOCUMENT_MAX_UPLOAD_SIZE = int(os.environ.get('DOCUMENT_MAX_UPLOAD_SIZE', str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', str(64 * 1024)))
+
+# Extraction reads files through the storage API. Libraries that need to
+# seek get a spooled copy of non-seekable streams, kept in memory up to
+# this many bytes
+EXTRACTION_SPOOL_MAX_MEMORY = int(os.environ.get('EXTRACTION_SPOOL_MAX_MEMORY', str(5 * 1024 * 1024)))
+
+# Cached extracted text (ExtractedText) not used for this many days is
+# deleted by 'manage.py prune_extracted_text'
+EXTRACTED_TEXT_MAX_AGE_DAYS = int(os.environ.get('EXTRACTED_TEXT_MAX_AGE_DAYS', '90'))
+
+# Bulk uploads: most documents per batch, and the largest total upload
+# (all files, or one ZIP archive) per request
+DOCUMENT_BATCH_MAX_FILES = int(os.environ.get('DOCUMENT_BATCH_MAX_FILES', '50'))
+DOCUMENT_BATCH_MAX_UPLOAD_SIZE = int(os.environ.get('DOCUMENT_BATCH_MAX_UPLOAD_SIZE', str(100 * 1024 * 1024)))
+
+# Fair document ingestion: per-user and total documents in flight at once.
+# The total should roughly match the number of extraction worker processes.
+INGESTION_MAX_IN_FLIGHT_PER_USER = int(os.environ.get('INGESTION_MAX_IN_FLIGHT_PER_USER', '2'))
+INGESTION_MAX_IN_FLIGHT = int(os.environ.get('INGESTION_MAX_IN_FLIGHT', '8'))
+INGESTION_LEASE_SECONDS = int(os.environ.get('INGESTION_LEASE_SECONDS', '1800'))
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -165,6 +283,23 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files. Setting AWS_STORAGE_BUCKET_NAME stores them in S3 or an
+# S3-compatible service (AWS_S3_ENDPOINT_URL, e.g. the minio service in
+# docker-compose.yml) via django-storages, so web and worker containers can
+# run on separate nodes without a shared volume.
+AWS_STORAGE_BUCKET_NAME = os.environ.get('AWS_STORAGE_BUCKET_NAME', '')
+if AWS_STORAGE_BUCKET_NAME:
+    AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL') or None
+    AWS_S3_ACCESS_KEY_ID = os.environ.get('AWS_S3_ACCESS_KEY_ID')
+    AWS_S3_SECRET_ACCESS_KEY = os.environ.get('AWS_S3_SECRET_ACCESS_KEY')
+    AWS_S3_REGION_NAME = os.environ.get('AWS_S3_REGION_NAME') or None
+    AWS_DEFAULT_ACL = None
+    AWS_QUERYSTRING_AUTH = True
+    STORAGES = {
+        'default': {'BACKEND': 'storages.backends.s3.S3Storage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -1,16 +1,58 @@
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from django.core.files.storage import default_storage
-from ai_interviewee.models import Document, DocumentChunk
-from .utils import extract_text_from_file, chunk_text
-from .services import OpenAIEmbeddingService
+from ai_interviewee.models import Document, DocumentChunk, EmbeddingMigration, ExtractedText
+from .utils import extract_text_from_file, normalize_extracted_text, chunk_text, hash_file, vector_to_list
+from .services import (
+    IngestionScheduler, EmbeddingDeferred, EmbeddingFailed, get_space_embedding_provider, retry_after_seconds,
+    sync_document_chunks,
+)
 import logging
 import traceback
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True, max_retries=3)
+def requeue_deferred(task, args, wait, deferrals):
+    """
+    Re-queue a task that is waiting for rate-limit budget, unless it has
+    already done so EMBEDDING_MAX_DEFERRALS times in a row. Returns whether
+    it was re-queued.
+    """
+    if deferrals >= settings.EMBEDDING_MAX_DEFERRALS:
+        logger.error(
+            f"{task.name}{args} gave up after {deferrals} rate-limit deferrals; "
+            f"check OPENAI_EMBEDDING_RPM and OPENAI_EMBEDDING_TPM against the account's limits"
+        )
+        return False
+    task.apply_async(args, {'deferrals': deferrals + 1}, countdown=wait)
+    return True
+
+
+def release_ingestion_slot(document_id, owner_id=None):
+    """
+    Hand a document's in-flight slot to the next queued document. A failure
+    here is only logged: the document's own outcome stands, and the slot
+    frees itself when its lease expires.
+    """
+    try:
+        IngestionScheduler().release(owner_id, document_id)
+    except Exception as e:
+        logger.error(f"Could not release the ingestion slot of document {document_id}: {str(e)}")
+
+
+@shared_task(ignore_result=True)
+def dispatch_documents_task():
+    """
+    Dispatch queued documents, so slots whose leases expired (their task was
+    lost) are handed on even when nothing else is submitted or released.
+    """
+    return IngestionScheduler().dispatch()
+
+
+@shared_task(bind=True, max_retries=3, ignore_result=True)
 def process_document_task(self, document_id):
     """
     Main task to process an uploaded document
@@ -25,31 +67,46 @@ def process_document_task(self, document_id):
         
         logger.info(f"Starting processing for document {document_id}")
         
-        # Extract text from the document
-        text_content = extract_text_from_file(document.file.path)
-        
-        if not text_content:
-            raise Exception("No text content could be extracted from the document")
+        # Reuse the normalized text if this file was extracted before
+        if not document.content_hash:
+            with document.file.open('rb') as stored_file:
+                document.content_hash = hash_file(stored_file)
+        cached = ExtractedText.lookup(document.content_hash)
+        if cached:
+            text_content, normalization_stats = cached.text, cached.normalization_stats
+            logger.info(f"Using cached extracted text for document {document_id}")
+        else:
+            # Extract text straight from storage, so workers don't need the
+            # web server's disk
+            with document.file.open('rb') as stored_file:
+                text_content = extract_text_from_file(stored_file, document.file.name)
+            
+            if not text_content:
+                raise Exception("No text content could be extracted from the document")
+            
+            # Strip repeated headers, footers and page numbers before chunking
+            text_content, normalization_stats = normalize_extracted_text(text_content)
+            logger.info(
+                f"Normalization removed {normalization_stats['chars_removed']} characters "
+                f"(~{normalization_stats['tokens_removed']} tokens) from document {document_id}"
+            )
+            if not text_content:
+                raise Exception("No text content left after normalizing the document")
+            ExtractedText.store(document.content_hash, text_content, normalization_stats)
+        document.processing_stats = {'normalization': normalization_stats, 'extraction_cached': bool(cached)}
         
         # Chunk the text
         chunks = chunk_text(text_content)
         
         logger.info(f"Created {len(chunks)} chunks for document {document_id}")
         
-        # Create DocumentChunk objects and trigger embedding generation
-        for i, chunk_data in enumerate(chunks):
-            chunk = DocumentChunk.objects.create(
-                document=document,
-                content=chunk_data['content'],
-                chunk_index=i,
-                page_number=chunk_data.get('page_number'),
-                start_char=chunk_data.get('start_char'),
-                end_char=chunk_data.get('end_char'),
-                metadata=chunk_data.get('metadata', {})
-            )
-            
-            # Queue embedding generation (placeholder for now)
-            generate_embedding_task.delay(chunk.id)
+        # Diff against the chunks from any earlier version of the document,
+        # keeping unchanged chunks and their embeddings
+        chunk_stats = sync_document_chunks(document, chunks)
+        document.processing_stats['chunks'] = chunk_stats
+        
+        # Queue batched embedding generation for the whole document
+        generate_document_embeddings_task.delay(document.id)
         
         # Update document status
         document.processing_status = 'completed'
@@ -60,6 +117,8 @@ def process_document_task(self, document_id):
         
     except Document.DoesNotExist:
         logger.error(f"Document {document_id} not found")
+        # Nothing will ever process it, so don't keep its slot until the lease expires
+        release_ingestion_slot(document_id)
         raise
     
     except Exception as e:
@@ -73,29 +132,43 @@ def process_document_task(self, document_id):
             document.processing_status = 'failed'
             document.processing_error = str(e)
             document.save()
+            
+            # Out of retries: free the owner's in-flight slot
+            if self.request.retries >= self.max_retries:
+                release_ingestion_slot(document.id, document.owner_id)
         
         # Retry the task
         raise self.retry(exc=e, countdown=60)
+    
+    else:
+        # Outside the try, so this can't mark the finished document as failed
+        release_ingestion_slot(document.id, document.owner_id)
 
 
-@shared_task(bind=True, max_retries=3)
-def generate_embedding_task(self, chunk_id):
+@shared_task(bind=True, max_retries=3, ignore_result=True)
+def generate_embedding_task(self, chunk_id, deferrals=0):
     """
-    Placeholder task for generating embeddings
-    This is where you'll add your embedding logic later
+    Generate the embedding for a single chunk
     """
     try:
         chunk = DocumentChunk.objects.get(id=chunk_id)
         logger.info(f"Generating embedding for chunk {chunk_id}")
         
-        # Initialize the embedding service
-        embedding_service = OpenAIEmbeddingService()
+        # Embed in the active embedding space
+        space = EmbeddingMigration.active_space()
+        field, dimensions = DocumentChunk.embedding_storage()
+        provider = get_space_embedding_provider(space, dimensions=dimensions, max_wait=0)
         
-        # Generate the embedding
-        embedding = embedding_service.generate_embedding(chunk.content)
+        # Waiting for rate-limit budget re-queues the task instead of using up a retry
+        try:
+            embedding = provider.embed([chunk.content])[0]
+        except EmbeddingDeferred as e:
+            if not requeue_deferred(generate_embedding_task, (chunk_id,), e.wait, deferrals):
+                return f"Embedding for chunk {chunk_id} gave up waiting for rate-limit budget"
+            return f"Embedding for chunk {chunk_id} deferred by {e.wait:.1f}s"
         
         if embedding:
-            chunk.embedding = embedding
+            chunk.set_embedding(embedding, space, field)
             chunk.save()
             logger.info(f"Successfully generated and saved embedding for chunk {chunk_id}")
             return f"Embedding generated for chunk {chunk_id}"
@@ -109,4 +182,186 @@ def generate_embedding_task(self, chunk_id):
     except Exception as e:
         logger.error(f"Error generating embedding for chunk {chunk_id}: {str(e)}")
         # Retry the task
-        raise self.retry(exc=e, countdown=30)
+        raise self.retry(exc=e, countdown=retry_after_seconds(e, self.request.retries))
+
+
+@shared_task(bind=True, max_retries=3, ignore_result=True)
+def generate_document_embeddings_task(self, document_id, deferrals=0):
+    """
+    Generate embeddings for every chunk of a document that doesn't have one yet.
+    
+    Batches are sized to the shared OpenAI token budget that is left and sent
+    concurrently by the embedding provider. Batches that would have to
+    wait too long for budget (or for the API's Retry-After) are left for a
+    re-queued run of this task, so no worker thread sits idle waiting. Every
+    embedding that did come back is saved first, so the re-queued task only
+    picks up the chunks that are still missing one. A run that saves nothing
+    counts towards EMBEDDING_MAX_DEFERRALS.
+    """
+    try:
+        # Chunks with no embedding, or one from a space that is no longer active
+        space = EmbeddingMigration.active_space()
+        field, dimensions = DocumentChunk.embedding_storage()
+        pending = list(
+            DocumentChunk.objects.filter(
+                Q(**{f'{field}__isnull': True}) | ~Q(embedding_model=space.model, embedding_version=space.version),
+                document_id=document_id,
+            ).order_by('chunk_index')
+        )
+        if not pending:
+            return f"No pending chunks for document {document_id}"
+        
+        # Near-duplicates copy their canonical chunk's vector instead of
+        # being sent to the API again
+        completed = []
+        canonical_ids = {chunk.duplicate_of_id for chunk in pending if chunk.duplicate_of_id}
+        if canonical_ids:
+            canonical_vectors = dict(
+                DocumentChunk.objects.filter(
+                    id__in=canonical_ids,
+                    embedding_model=space.model,
+                    embedding_version=space.version,
+                    **{f'{field}__isnull': False},
+                ).values_list('id', field)
+            )
+            for chunk in pending:
+                if chunk.duplicate_of_id in canonical_vectors:
+                    chunk.set_embedding(vector_to_list(canonical_vectors[chunk.duplicate_of_id]), space, field)
+                    completed.append(chunk)
+            if completed:
+                logger.info(f"Reused {len(completed)} embeddings of near-duplicate chunks for document {document_id}")
+            reused = {chunk.id for chunk in completed}
+            pending = [chunk for chunk in pending if chunk.id not in reused]
+        
+        logger.info(f"Generating embeddings for {len(pending)} chunks of document {document_id}")
+        
+        provider = get_space_embedding_provider(space, dimensions=dimensions)
+        deferred_for = 0.0
+        failure = None
+        try:
+            embeddings = provider.embed([chunk.content for chunk in pending])
+        except EmbeddingDeferred as e:
+            embeddings = e.embeddings
+            deferred_for = e.wait
+        except EmbeddingFailed as e:
+            # Keep what was paid for; the retry only sends what's still missing
+            embeddings = e.embeddings
+            failure = e.error
+        
+        for chunk, embedding in zip(pending, embeddings):
+            if embedding is not None:
+                chunk.set_embedding(embedding, space, field)
+                completed.append(chunk)
+        DocumentChunk.objects.bulk_update(completed, [field, 'embedding_model', 'embedding_version'])
+        logger.info(f"Saved {len(completed)} embeddings for document {document_id}")
+        
+        if failure is not None:
+            raise failure
+        
+        if deferred_for:
+            # Only runs that made no progress at all count towards the limit
+            deferrals = 0 if completed else deferrals
+            if not requeue_deferred(generate_document_embeddings_task, (document_id,), deferred_for, deferrals):
+                return f"Embeddings for document {document_id} gave up waiting for rate-limit budget"
+            return f"Embeddings for document {document_id} deferred by {deferred_for:.1f}s"
+        
+        return f"Embeddings generated for document {document_id}"
+    
+    except Exception as e:
+        logger.error(f"Error generating embeddings for document {document_id}: {str(e)}")
+        raise self.retry(exc=e, countdown=retry_after_seconds(e, self.request.retries))
+
+
+@shared_task(bind=True, max_retries=3, ignore_result=True)
+def reembed_chunks_task(self, migration_id, deferrals=0):
+    """
+    Re-embed the next keyset-paginated batch of chunks into a migration's
+    target space, then re-queue itself after a pause until every chunk is
+    covered.
+    
+    The cursor is saved with every batch, so the job can be paused, resumed or
+    interrupted at any point without redoing work. Once a full pass finds
+    nothing left to do, the migration is cut over (or marked completed if
+    automatic cut-over is off).
+    """
+    try:
+        migration = EmbeddingMigration.objects.get(id=migration_id)
+        if migration.status != 'running':
+            return f"Embedding migration {migration_id} is {migration.status}"
+        
+        remaining = migration.remaining_chunks().order_by('id')
+        if migration.cursor is not None:
+            remaining = remaining.filter(id__gt=migration.cursor)
+        chunks = list(remaining.only('id', 'content')[:settings.EMBEDDING_MIGRATION_BATCH_SIZE])
+        
+        if not chunks:
+            if migration.cursor is not None:
+                # Start another pass for chunks embedded behind the cursor
+                migration.cursor = None
+                migration.save(update_fields=['cursor', 'updated_at'])
+                reembed_chunks_task.delay(migration_id)
+                return f"Embedding migration {migration_id} starting another pass"
+            
+            if migration.auto_cut_over:
+                stale_documents = migration.cut_over()
+                for document_id in stale_documents:
+                    generate_document_embeddings_task.delay(document_id)
+                logger.info(f"Embedding migration {migration_id} cut over to {migration.target_space}")
+            else:
+                migration.status = 'completed'
+                migration.save(update_fields=['status', 'updated_at'])
+            return f"Embedding migration {migration_id} finished"
+        
+        provider = get_space_embedding_provider(migration.target_space)
+        deferred_for = 0.0
+        failure = None
+        try:
+            embeddings = provider.embed([chunk.content for chunk in chunks])
+        except EmbeddingDeferred as e:
+            embeddings = e.embeddings
+            deferred_for = e.wait
+        except EmbeddingFailed as e:
+            embeddings = e.embeddings
+            failure = e.error
+        
+        # Only advance the cursor over an unbroken run of finished chunks
+        completed = []
+        for chunk, embedding in zip(chunks, embeddings):
+            if embedding is None:
+                break
+            chunk.set_next_embedding(embedding, migration.target_space)
+            completed.append(chunk)
+        
+        with transaction.atomic():
+            DocumentChunk.objects.bulk_update(
+                completed, ['next_embedding', 'next_embedding_model', 'next_embedding_version']
+            )
+            if completed:
+                migration.cursor = completed[-1].id
+                migration.processed_count += len(completed)
+                migration.save(update_fields=['cursor', 'processed_count', 'updated_at'])
+        
+        logger.info(f"Embedding migration {migration_id} re-embedded {len(completed)} chunks")
+        if failure is not None:
+            raise failure
+        if deferred_for and not completed:
+            # Nothing got through: pause the migration rather than wait forever
+            wait = max(deferred_for, settings.EMBEDDING_MIGRATION_THROTTLE_SECONDS)
+            if not requeue_deferred(reembed_chunks_task, (migration_id,), wait, deferrals):
+                migration.status = 'paused'
+                migration.save(update_fields=['status', 'updated_at'])
+                return f"Embedding migration {migration_id} paused waiting for rate-limit budget"
+            return f"Embedding migration {migration_id} deferred by {wait:.1f}s"
+        reembed_chunks_task.apply_async(
+            (migration_id,),
+            countdown=max(deferred_for, settings.EMBEDDING_MIGRATION_THROTTLE_SECONDS),
+        )
+        return f"Embedding migration {migration_id} re-embedded {len(completed)} chunks"
+    
+    except EmbeddingMigration.DoesNotExist:
+        logger.error(f"EmbeddingMigration {migration_id} not found")
+        raise
+    
+    except Exception as e:
+        logger.error(f"Error in embedding migration {migration_id}: {str(e)}")
+        raise self.retry(exc=e, countdown=retry_after_seconds(e, self.request.retries))
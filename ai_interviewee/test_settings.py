@@ -6,6 +6,9 @@ CELERY_TASK_EAGER_PROPAGATES = True
 CELERY_BROKER_URL = 'memory://'
 CELERY_RESULT_BACKEND = 'cache+memory://'
 
+# No Redis in tests: the OpenAI rate limiter grants everything
+REDIS_URL = None
+
 # Use in-memory database for faster tests (optional)
 # DATABASES = {
 #     'default': {
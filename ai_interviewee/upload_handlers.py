@@ -0,0 +1,110 @@
+import hashlib
+import logging
+from pathlib import Path
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes of the file types we accept
+DOCX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+MAGIC_NUMBERS = [
+    (b'%PDF-', 'application/pdf'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'),
+]
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Upload is too large.'
+    default_code = 'upload_too_large'
+
+
+def sniff_mime_type(head, file_name=''):
+    """
+    MIME type of a file from its first bytes. ZIP containers named .docx are
+    reported as DOCX; anything else without NUL bytes is taken as plain text
+    (UTF-8 or Latin-1, like extract_text_from_txt).
+    """
+    for magic, mime_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            if mime_type == 'application/zip' and Path(file_name or '').suffix.lower() == '.docx':
+                return DOCX_MIME_TYPE
+            return mime_type
+    if b'\x00' in head:
+        return 'application/octet-stream'
+    return 'text/plain'
+
+
+class StreamingUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams uploads to a temporary file while checking their size, hashing
+    them and sniffing their type, all in the single pass Django already makes
+    over the request body.
+
+    Requests whose Content-Length already exceeds the limit are rejected
+    before any of the body is read, and a file is rejected as soon as the
+    bytes received pass the limit, or the files received so far together
+    pass the request's limit, whatever Content-Length claimed. Files
+    never go to memory, so however many uploads run at once, each only holds
+    one chunk (UPLOAD_CHUNK_SIZE) in memory.
+
+    The finished file has ``content_hash`` (SHA-256 hex digest) and
+    ``sniffed_content_type`` attributes.
+
+    Args:
+        request: The request being uploaded.
+        max_file_size: Largest file allowed, in bytes. Defaults to
+            DOCUMENT_MAX_UPLOAD_SIZE.
+        max_files: Files the request may contain. All files together may
+            have ``max_file_size * max_files`` bytes.
+    """
+
+    # Room for the multipart boundaries and the other form fields
+    FORM_OVERHEAD = 64 * 1024
+    SNIFF_BYTES = 2048
+
+    def __init__(self, request=None, max_file_size=None, max_files=1):
+        super().__init__(request)
+        self.max_file_size = max_file_size or settings.DOCUMENT_MAX_UPLOAD_SIZE
+        self.max_total_size = self.max_file_size * max_files
+        self.max_request_size = self.max_total_size + self.FORM_OVERHEAD
+        self.total_received = 0
+        self.chunk_size = settings.UPLOAD_CHUNK_SIZE
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length and content_length > self.max_request_size:
+            logger.info(f"Rejected upload of {content_length} bytes before reading it")
+            raise UploadTooLarge(
+                f"Upload of {content_length} bytes exceeds the limit of {self.max_total_size} bytes."
+            )
+        return None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.digest = hashlib.sha256()
+        self.head = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_file_size:
+            self.upload_interrupted()
+            raise UploadTooLarge(f"File size cannot exceed {self.max_file_size} bytes.")
+        self.total_received += len(raw_data)
+        if self.total_received > self.max_total_size:
+            self.upload_interrupted()
+            raise UploadTooLarge(f"Upload cannot exceed {self.max_total_size} bytes in total.")
+        self.digest.update(raw_data)
+        if len(self.head) < self.SNIFF_BYTES:
+            self.head += raw_data[:self.SNIFF_BYTES - len(self.head)]
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.content_hash = self.digest.hexdigest()
+        file.sniffed_content_type = sniff_mime_type(self.head, self.file_name)
+        return file
@@ -13,6 +13,9 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('api/upload/', views.DocumentUploadView.as_view(), name='document-upload'),
     path('api/documents/', views.DocumentView.as_view(), name='document-view'),
+    path('api/documents/batch/', views.DocumentBatchUploadView.as_view(), name='document-batch-upload'),
+    path('api/documents/batch/<uuid:batch_id>/', views.DocumentBatchView.as_view(), name='document-batch'),
+    path('api/documents/<uuid:document_id>/replace/', views.DocumentReplaceView.as_view(), name='document-replace'),
     path('api/rag_query/', views.RagQueryView.as_view(), name='rag-query'),
     path('api/register/', views.RegisterView.as_view(), name='register'),
     path('api/login/', views.LoginView.as_view(), name='login'),
@@ -1,84 +1,359 @@
 import os
+import hashlib
+import math
+import re
+import shutil
+import tempfile
+import zipfile
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
+from xml.etree import ElementTree
 import logging
+from django.conf import settings
 from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth.models import User
 from django.db.models import Q
 
 logger = logging.getLogger(__name__)
 
-def extract_text_from_file(file_path):
+def extract_text_from_file(file, file_name=None):
     """
-    Extract text from various file formats
+    Extract text from various file formats.
+
+    ``file`` is a local path or a binary file object from any storage
+    backend (e.g. ``document.file.open('rb')``). The format is taken from
+    ``file_name``, falling back to the path or the file object's name.
     """
-    file_extension = Path(file_path).suffix.lower()
+    if file_name is None:
+        file_name = file if isinstance(file, (str, os.PathLike)) else getattr(file, 'name', '')
+    file_extension = Path(file_name).suffix.lower()
     
     try:
         if file_extension == '.pdf':
-            return extract_text_from_pdf(file_path)
+            return extract_text_from_pdf(file)
         elif file_extension == '.txt':
-            return extract_text_from_txt(file_path)
+            return extract_text_from_txt(file)
         elif file_extension in ['.doc', '.docx']:
-            return extract_text_from_docx(file_path)
+            return extract_text_from_docx(file)
         else:
             raise ValueError(f"Unsupported file format: {file_extension}")
     
     except Exception as e:
-        logger.error(f"Error extracting text from {file_path}: {str(e)}")
+        logger.error(f"Error extracting text from {file_name}: {str(e)}")
         raise
 
-def extract_text_from_pdf(file_path):
+@contextmanager
+def seekable_file(file):
+    """
+    A seekable version of a path or file object, for libraries that jump
+    around in their input (pdfminer, zipfile). Seekable files are used as
+    they are; streams such as remote storage responses are copied into a
+    spooled temporary file, which only goes to disk past
+    EXTRACTION_SPOOL_MAX_MEMORY bytes.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        yield file
+        return
+    seekable = getattr(file, 'seekable', None)
+    if seekable is not None and seekable():
+        file.seek(0)
+        yield file
+        return
+    with tempfile.SpooledTemporaryFile(max_size=settings.EXTRACTION_SPOOL_MAX_MEMORY) as spooled:
+        shutil.copyfileobj(file, spooled, settings.UPLOAD_CHUNK_SIZE)
+        spooled.seek(0)
+        yield spooled
+
+def hash_file(file):
     """
-    Extract text from PDF using pdfminer.six
+    SHA-256 hex digest of an uploaded or stored file, read in chunks
+    """
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return digest.hexdigest()
+
+def extract_text_from_pdf(file):
+    """
+    Extract text from a PDF path or file object using pdfminer.six
     """
     try:
         from pdfminer.high_level import extract_text
-        return extract_text(file_path)
+        with seekable_file(file) as pdf_file:
+            return extract_text(pdf_file)
     except ImportError:
         logger.error("pdfminer.six not installed. Install with: pip install pdfminer.six")
         raise
     except Exception as e:
-        logger.error(f"Error extracting text from PDF {file_path}: {str(e)}")
+        logger.error(f"Error extracting text from PDF {file}: {str(e)}")
         raise
 
-def extract_text_from_txt(file_path):
+def extract_text_from_txt(file):
     """
-    Extract text from TXT file
+    Extract text from a TXT path or binary file object
     """
+    if not isinstance(file, (str, os.PathLike)):
+        content = file.read()
+        try:
+            return content.decode('utf-8')
+        except UnicodeDecodeError:
+            return content.decode('latin-1')
+
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return file.read()
+        with open(file, 'r', encoding='utf-8') as text_file:
+            return text_file.read()
     except Exception as e:
         # Try with different encoding
         try:
-            with open(file_path, 'r', encoding='latin-1') as file:
-                return file.read()
+            with open(file, 'r', encoding='latin-1') as text_file:
+                return text_file.read()
         except Exception as e2:
-            logger.error(f"Error extracting text from TXT {file_path}: {str(e2)}")
+            logger.error(f"Error extracting text from TXT {file}: {str(e2)}")
             raise
 
-def extract_text_from_docx(file_path):
+# WordprocessingML elements read by iter_docx_text
+W_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY = W_NAMESPACE + 'body'
+W_PARAGRAPH = W_NAMESPACE + 'p'
+W_TEXT = W_NAMESPACE + 't'
+W_TAB = W_NAMESPACE + 'tab'
+W_BREAKS = {W_NAMESPACE + 'br', W_NAMESPACE + 'cr'}
+W_ROW = W_NAMESPACE + 'tr'
+W_CELL = W_NAMESPACE + 'tc'
+
+# Package relationship that points at the main document part
+PACKAGE_RELATIONSHIPS = '_rels/.rels'
+RELATIONSHIP_TAG = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+OFFICE_DOCUMENT_TYPE = '/officeDocument'
+DEFAULT_DOCUMENT_PART = 'word/document.xml'
+
+def _docx_document_part(archive):
     """
-    Extract text from DOCX using python-docx
+    Name of the main document part, from the package relationships. Word
+    usually writes word/document.xml, but other tools use names such as
+    word/document2.xml.
     """
     try:
-        from docx import Document
-        doc = Document(file_path)
-        return '\n'.join([paragraph.text for paragraph in doc.paragraphs])
-    except ImportError:
-        logger.error("python-docx not installed. Install with: pip install python-docx")
-        raise
+        with archive.open(PACKAGE_RELATIONSHIPS) as rels:
+            relationships = ElementTree.parse(rels).getroot()
+    except KeyError:
+        return DEFAULT_DOCUMENT_PART
+    for relationship in relationships.iter(RELATIONSHIP_TAG):
+        if relationship.get('Type', '').endswith(OFFICE_DOCUMENT_TYPE):
+            return relationship.get('Target', DEFAULT_DOCUMENT_PART).lstrip('/')
+    return DEFAULT_DOCUMENT_PART
+
+def _paragraph_text(paragraph):
+    parts = []
+    for node in paragraph.iter():
+        if node.tag == W_TEXT:
+            parts.append(node.text or '')
+        elif node.tag == W_TAB:
+            parts.append('\t')
+        elif node.tag in W_BREAKS:
+            parts.append('\n')
+    return ''.join(parts)
+
+def iter_docx_text(file):
+    """
+    Yield the text of a DOCX body in document order: one item per paragraph
+    and one per table row, with the row's cells joined by " | ".
+
+    The main document part (normally word/document.xml) is parsed
+    incrementally and every top-level block is discarded once read, so
+    memory stays bounded by the largest paragraph or table rather than the
+    size of the document.
+    """
+    with seekable_file(file) as docx_file, \
+            zipfile.ZipFile(docx_file) as archive, \
+            archive.open(_docx_document_part(archive)) as document_xml:
+        body = None
+        depth = 0
+        rows = []   # cells of each table row being read (nested tables stack)
+        cells = []  # paragraphs of each table cell being read
+        for event, element in ElementTree.iterparse(document_xml, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if element.tag == W_BODY:
+                    body = element
+                elif element.tag == W_ROW:
+                    rows.append([])
+                elif element.tag == W_CELL:
+                    cells.append([])
+                continue
+
+            depth -= 1
+            if element.tag == W_PARAGRAPH:
+                text = _paragraph_text(element)
+                element.clear()
+                if cells:
+                    cells[-1].append(text)
+                else:
+                    yield text
+            elif element.tag == W_CELL:
+                text = ' '.join(paragraph for paragraph in cells.pop() if paragraph)
+                element.clear()
+                if rows:
+                    rows[-1].append(text)
+            elif element.tag == W_ROW:
+                line = ' | '.join(cell for cell in rows.pop() if cell)
+                element.clear()
+                if cells:
+                    # A table nested in a cell reads as part of that cell
+                    cells[-1].append(line)
+                elif line:
+                    yield line
+
+            # A top-level block (document > body > block) has been read
+            if depth == 2 and body is not None:
+                body.clear()
+
+def extract_text_from_docx(file):
+    """
+    Extract text, including table cells, from a DOCX path or file object
+    """
+    try:
+        return '\n'.join(iter_docx_text(file))
     except Exception as e:
-        logger.error(f"Error extracting text from DOCX {file_path}: {str(e)}")
+        logger.error(f"Error extracting text from DOCX {file}: {str(e)}")
         raise
 
+# Lines at the top and bottom of each page that may be headers or footers
+PAGE_EDGE_LINES = 3
+PAGE_NUMBER_RE = re.compile(r'^(page\s*)?\d+(\s*(of|/)\s*\d+)?$', re.IGNORECASE)
+TRAILING_PAGE_NUMBER_RE = re.compile(r'[\s|\-]*(page\s*)?\d+(\s*(of|/)\s*\d+)?$', re.IGNORECASE)
+
+def _line_key(line):
+    """
+    Compare lines ignoring case, spacing and a trailing page number (so
+    "Jane Doe | Page 2" matches "Jane Doe | Page 3")
+    """
+    return TRAILING_PAGE_NUMBER_RE.sub('', ' '.join(line.split()).lower())
+
+def _edge_lines(lines, count=PAGE_EDGE_LINES):
+    """Indexes of the first and last ``count`` non-empty lines of a page"""
+    non_empty = [i for i, line in enumerate(lines) if line.strip()]
+    return set(non_empty[:count] + non_empty[-count:])
+
+def normalize_extracted_text(text, min_pages=3, repeat_ratio=0.5):
+    """
+    Clean extracted text before chunking.
+
+    On documents with at least ``min_pages`` pages (split on form feeds, as
+    pdfminer marks them), lines near the top or bottom of a page that repeat
+    on at least ``repeat_ratio`` of the pages are removed: running headers,
+    footers and contact blocks, as well as page numbers on the first or last
+    line of a page. Runs of spaces are then collapsed and blank lines
+    squeezed to one paragraph break.
+
+    Args:
+        text (str): Text returned by extract_text_from_file
+
+    Returns:
+        (normalized text, stats) where stats counts the characters, estimated
+        tokens and repeated lines removed
+    """
+    if not text:
+        return text, {'chars_removed': 0, 'tokens_removed': 0, 'repeated_lines_removed': 0}
+
+    pages = [page.split('\n') for page in text.split('\f')]
+    # pdfminer ends every page with a form feed, the last one included
+    if len(pages) > 1 and not ''.join(pages[-1]).strip():
+        pages.pop()
+    edges = [_edge_lines(lines) for lines in pages]
+    # A number alone on a line may be content (a year, a figure), so it only
+    # counts as a page number on the very first or last line of a page
+    outer_lines = [_edge_lines(lines, 1) for lines in pages]
+
+    repeated = set()
+    multi_page = len(pages) >= min_pages
+    if multi_page:
+        page_counts = Counter()
+        for lines, edge in zip(pages, edges):
+            page_counts.update({_line_key(lines[i]) for i in edge})
+        threshold = max(2, math.ceil(repeat_ratio * len(pages)))
+        # Lines that are only a number all have the empty key; whether they
+        # are page numbers is decided on their own below
+        repeated = {key for key, count in page_counts.items() if key and count >= threshold}
+
+    removed_lines = 0
+    kept_pages = []
+    for lines, edge, outer in zip(pages, edges, outer_lines):
+        kept = []
+        for i, line in enumerate(lines):
+            stripped = ' '.join(line.split())
+            is_page_number = multi_page and i in outer and PAGE_NUMBER_RE.match(stripped)
+            if i in edge and (_line_key(line) in repeated or is_page_number):
+                removed_lines += 1
+                continue
+            kept.append(stripped)
+        kept_pages.append('\n'.join(kept))
+
+    normalized = re.sub(r'\n{3,}', '\n\n', '\n\n'.join(kept_pages)).strip()
+    stats = {
+        'chars_removed': len(text) - len(normalized),
+        'tokens_removed': estimate_tokens(text) - estimate_tokens(normalized),
+        'repeated_lines_removed': removed_lines,
+    }
+    return normalized, stats
+
+# Chunk boundaries are content-defined: once a chunk has half its words, it
+# ends after a word whose hash (with the word before it) is divisible by the
+# odds of the break that follows the word. A cut then only depends on the
+# words around it, so an edit moves the boundaries up to the next cut after
+# it and every chunk past that comes out as before. Paragraph, line and
+# sentence ends are the likeliest cuts, so chunks tend to end on them.
+PARAGRAPH_CUT_ODDS = 2
+SENTENCE_CUT_ODDS = 4
+SENTENCE_END_RE = re.compile(r'[.!?;:]["\')\]]*$')
+WORD_RE = re.compile(r'\S+')
+
+
+def _words_and_cut_odds(text, word_odds):
+    """
+    Split text into words, with the odds of a chunk ending after each word
+    (see PARAGRAPH_CUT_ODDS)
+    """
+    words = []
+    odds = []
+    previous_end = 0
+    for match in WORD_RE.finditer(text):
+        if words:
+            breaks = text.count('\n', previous_end, match.start()) + text.count('\f', previous_end, match.start())
+            if breaks >= 2:
+                odds[-1] = PARAGRAPH_CUT_ODDS
+            elif breaks:
+                odds[-1] = min(odds[-1], SENTENCE_CUT_ODDS)
+        word = match.group()
+        words.append(word)
+        odds.append(SENTENCE_CUT_ODDS if SENTENCE_END_RE.search(word) else word_odds)
+        previous_end = match.end()
+    return words, odds
+
+
+def _is_cut(words, index, odds):
+    previous = words[index - 1] if index else ''
+    digest = hashlib.blake2b(f'{previous} {words[index]}'.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % odds == 0
+
+
 def chunk_text(text, chunk_size=300, overlap=50):
     """
     Split text into chunks with overlap
+
+    Chunks have between half of ``chunk_size`` and ``chunk_size`` words and
+    end at content-defined cut points, preferably paragraph and sentence
+    ends (see PARAGRAPH_CUT_ODDS), so editing a document only changes the
+    chunks around the edit. A chunk that reaches ``chunk_size`` words
+    without a cut ends at its last paragraph or sentence end, if it has one.
     
     Args:
         text (str): The text to chunk
-        chunk_size (int): Target number of words per chunk
+        chunk_size (int): Most words per chunk
         overlap (int): Number of words to overlap between chunks
     
     Returns:
@@ -87,7 +362,7 @@ def chunk_text(text, chunk_size=300, overlap=50):
     if not text or not text.strip():
         return []
     
-    words = text.split()
+    words, odds = _words_and_cut_odds(text, max(chunk_size, 1))
     chunks = []
     
     if len(words) <= chunk_size:
@@ -99,21 +374,39 @@ def chunk_text(text, chunk_size=300, overlap=50):
             'metadata': {'word_count': len(words)}
         }]
     
+    # Character offset of every word in the space-joined text, so a chunk's
+    # position is a lookup instead of re-joining every word before it
+    word_offsets = [0]
+    for word in words:
+        word_offsets.append(word_offsets[-1] + len(word) + 1)
+    
+    min_words = max(chunk_size // 2, 1)
     start_idx = 0
+    end_idx = 0
     chunk_index = 0
     
     while start_idx < len(words):
-        # Calculate end index for this chunk
-        end_idx = min(start_idx + chunk_size, len(words))
+        # Find where this chunk ends: past the end of the previous one, so a
+        # large overlap doesn't repeat it
+        first_idx = max(start_idx + min_words, end_idx + 1) - 1
+        last_idx = min(start_idx + chunk_size, len(words))
+        end_idx = None
+        last_break = None
+        for i in range(first_idx, last_idx):
+            if _is_cut(words, i, odds[i]):
+                end_idx = i + 1
+                break
+            if odds[i] < chunk_size:
+                last_break = i + 1
+        if end_idx is None:
+            end_idx = last_idx if last_idx == len(words) else (last_break or last_idx)
         
         # Extract chunk words
         chunk_words = words[start_idx:end_idx]
         chunk_content = ' '.join(chunk_words)
         
-        # Calculate character positions (approximate)
-        start_char = len(' '.join(words[:start_idx]))
-        if start_idx > 0:
-            start_char += 1  # Add space before chunk
+        # Character positions in the space-joined text
+        start_char = word_offsets[start_idx]
         end_char = start_char + len(chunk_content)
         
         # Create chunk data
@@ -133,12 +426,59 @@ def chunk_text(text, chunk_size=300, overlap=50):
         if end_idx >= len(words):
             break
         
-        start_idx = max(start_idx + chunk_size - overlap, start_idx + 1)
+        start_idx = max(end_idx - overlap, start_idx + 1)
         chunk_index += 1
     
     logger.info(f"Created {len(chunks)} chunks from {len(words)} words")
     return chunks
 
+def estimate_tokens(text):
+    """
+    Cheap token estimate for OpenAI models (roughly 4 characters per token)
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / 4)
+
+def unit_normalize(vector):
+    """
+    Scale a vector to unit length, so inner product, cosine similarity and
+    L2 distance all rank it the same way
+    """
+    norm = math.sqrt(sum(x * x for x in vector))
+    if not norm:
+        raise ValueError("Cannot normalize a zero vector")
+    return [x / norm for x in vector]
+
+def vector_to_list(vector):
+    """
+    A vector column value as a list of floats. Depending on the pgvector
+    version, vectors load as lists or numpy arrays and half vectors as
+    HalfVector objects, which aren't iterable.
+    """
+    if vector is None:
+        return None
+    if hasattr(vector, 'to_list'):
+        return vector.to_list()
+    if hasattr(vector, 'tolist'):
+        return vector.tolist()
+    return list(vector)
+
+@lru_cache(maxsize=None)
+def _redis_connection_for(url):
+    import redis
+    return redis.Redis.from_url(url)
+
+def get_redis_connection():
+    """
+    Shared Redis connection used to coordinate Celery workers.
+    Returns None when REDIS_URL is not configured (e.g. in tests).
+    """
+    url = getattr(settings, 'REDIS_URL', None)
+    if not url:
+        return None
+    return _redis_connection_for(url)
+
 class EmailBackend(BaseBackend):
     def authenticate(self, request, email=None, password=None, **kwargs):
         try:
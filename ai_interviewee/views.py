@@ -1,4 +1,4 @@
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
 from django.contrib import admin
 import os
 from . import views
@@ -11,10 +11,12 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.views import APIView
 from django.utils import timezone
-from .models import Document, UserProfile
-from .tasks import process_document_task
-from .serializers import DocumentUploadSerializer, DocumentSerializer, RegisterSerializer, LoginSerializer, UserSerializer, UserProfileSerializer
+from .models import Document, DocumentBatch, UserProfile
+from .services import BatchUpload, IngestionScheduler
+from .serializers import DocumentUploadSerializer, DocumentReplaceSerializer, DocumentSerializer, DocumentBatchUploadSerializer, DocumentBatchSerializer, file_metadata, RegisterSerializer, LoginSerializer, UserSerializer, UserProfileSerializer, RagQueryFiltersSerializer
 from .services.rag_service import RagService
+from .services.retrieval_strategies import RetrievalFilters
+from .upload_handlers import StreamingUploadHandler
 import logging
 from django.contrib.auth import login, logout
 
@@ -59,7 +61,25 @@ class CurrentUserView(APIView):
         serializer = UserSerializer(request.user)
         return Response(serializer.data)
 
-class DocumentUploadView(APIView):
+class StreamingUploadMixin:
+    """
+    Streams file uploads through StreamingUploadHandler, which rejects them
+    as soon as they are too large and hashes them on the way to disk. The
+    handler has to be installed before DRF parses the request body.
+    """
+    max_upload_files = 1
+
+    def get_max_upload_size(self):
+        """Largest file accepted; None uses DOCUMENT_MAX_UPLOAD_SIZE"""
+        return None
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [
+            StreamingUploadHandler(request, max_file_size=self.get_max_upload_size(), max_files=self.max_upload_files)
+        ]
+        return super().initialize_request(request, *args, **kwargs)
+
+class DocumentUploadView(StreamingUploadMixin, APIView):
     """
     API endpoint for uploading documents
     """
@@ -74,8 +94,8 @@ class DocumentUploadView(APIView):
                 # Save the document
                 document = serializer.save()
                 
-                # Trigger async processing
-                process_document_task.delay(document.id)
+                # Queue for processing, fairly across users
+                IngestionScheduler().submit(document)
                 
                 logger.info(f"Document {document.id} uploaded and queued for processing")
                 
@@ -102,6 +122,103 @@ class DocumentUploadView(APIView):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class DocumentReplaceView(StreamingUploadMixin, APIView):
+    """
+    API endpoint for uploading a new version of a document. Only chunks whose
+    text changed are embedded again.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def put(self, request, document_id, *args, **kwargs):
+        document = get_object_or_404(Document, id=document_id, owner=request.user)
+        serializer = DocumentReplaceSerializer(document, data=request.data, context={'request': request})
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            document = serializer.save()
+            IngestionScheduler().submit(document)
+            logger.info(f"Document {document.id} replaced and queued for processing")
+        except Exception as e:
+            logger.error(f"Error replacing document {document_id}: {str(e)}")
+            return Response(
+                {'error': 'Failed to replace document'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        return Response(
+            {
+                'message': 'Document replaced successfully and queued for processing',
+                'document': DocumentSerializer(document, context={'request': request}).data
+            },
+            status=status.HTTP_200_OK
+        )
+
+class DocumentBatchUploadView(StreamingUploadMixin, APIView):
+    """
+    API endpoint for uploading several documents at once, as separate files
+    and/or ZIP archives. The documents are created together, queued as one
+    processing workflow and tracked through DocumentBatchView.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def get_max_upload_size(self):
+        # Applies to each file and to all files of the request together (the
+        # handler counts the bytes streamed); each document is checked
+        # against DOCUMENT_MAX_UPLOAD_SIZE as it is stored
+        return settings.DOCUMENT_BATCH_MAX_UPLOAD_SIZE
+
+    def post(self, request, *args, **kwargs):
+        serializer = DocumentBatchUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        upload = BatchUpload(
+            request.user,
+            document_type=data['document_type'],
+            is_public=data['is_public'],
+            tags=data['tags'],
+        )
+        try:
+            for file in data['files']:
+                upload.add_file(file, file_metadata(file))
+            batch, documents = upload.create()
+        except ValueError as e:
+            upload.discard()
+            return Response({'error': str(e), 'skipped': upload.skipped}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            upload.discard()
+            logger.error(f"Error uploading document batch: {str(e)}")
+            return Response(
+                {'error': 'Failed to upload documents'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        IngestionScheduler().submit_batch(documents)
+        logger.info(f"Batch {batch.id} of {len(documents)} documents uploaded and queued for processing")
+
+        return Response(
+            {
+                'message': f'{len(documents)} documents uploaded successfully and queued for processing',
+                'batch': DocumentBatchSerializer(batch).data,
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+class DocumentBatchView(APIView):
+    """
+    API endpoint for the progress of a bulk upload
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, batch_id, *args, **kwargs):
+        batch = get_object_or_404(DocumentBatch, id=batch_id, owner=request.user)
+        return Response(DocumentBatchSerializer(batch).data, status=status.HTTP_200_OK)
+
 class DocumentView(APIView):
     """
         API endpoint for getting user documents
@@ -125,6 +242,10 @@ class DocumentView(APIView):
 class RagQueryView(APIView):
     """
     API endpoint for querying the RAG service.
+
+    Optional query parameters narrow the documents searched:
+    ``document_type`` (repeatable), ``tags`` (repeatable, all required) and
+    ``is_public``.
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -136,10 +257,23 @@ class RagQueryView(APIView):
                 {'error': 'A "question" query parameter is required.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+        filters_serializer = RagQueryFiltersSerializer(data=request.query_params)
+        if not filters_serializer.is_valid():
+            return Response(filters_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        filters = filters_serializer.validated_data
         
         try:
             rag_service = RagService()
-            response_text = rag_service.call(question, request.user.profile)
+            response_text = rag_service.call(
+                question,
+                request.user.profile,
+                filters=RetrievalFilters(
+                    document_types=filters.get('document_type', ()),
+                    tags=filters.get('tags', ()),
+                    is_public=filters.get('is_public'),
+                ),
+            )
             return Response(
                 {'response': response_text},
                 status=status.HTTP_200_OK
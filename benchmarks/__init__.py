@@ -0,0 +1,13 @@
+"""
+Performance benchmarks for ai_interviewee.
+
+Run them from the repository root as modules, e.g.::
+
+    python -m benchmarks.vector_storage --rows 20000
+
+Benchmarks that touch the database use the configured Django settings
+(``DJANGO_SETTINGS_MODULE``, default ``ai_interviewee.settings``) and only
+ever write to temporary tables, except ``end_to_end``, which ingests into a
+throwaway user that it deletes afterwards. Nothing calls the OpenAI API:
+``end_to_end`` talks to the local stand-in in ``ai_interviewee.fake_openai``.
+"""
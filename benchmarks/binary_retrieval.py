@@ -0,0 +1,139 @@
+"""
+Compare exact, HNSW and binary-quantized + re-rank retrieval.
+
+Loads vectors into a temporary ``vector(1536)`` table with two HNSW indexes,
+one on the vectors themselves and one on their binary quantization (the same
+expression index DocumentChunk uses), then for each query measures:
+
+* ``exact``          - sequential scan ordered by L2 distance (ground truth)
+* ``hnsw``           - HNSW index on the full vectors
+* ``binary_rerank@N`` - HNSW over Hamming distance on the bit vectors for N
+  candidates, re-ranked by exact L2 distance in the same statement
+
+reporting index sizes, p50/p95 latency and recall@5 for each.
+
+    python -m benchmarks.binary_retrieval --rows 50000 --candidates 50 100 200 400
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import (
+    setup_django, timer, latency_summary, recall_at_k, perturb,
+    load_vectors, copy_vectors, vector_literal, write_results, print_table,
+)
+
+K = 5
+TABLE = 'bench_binary'
+
+EXACT_SQL = f"SELECT id FROM {TABLE} ORDER BY embedding <-> %s::vector LIMIT {K}"
+RERANK_SQL = f"""
+    SELECT id FROM {TABLE}
+    WHERE id IN (
+        SELECT id FROM {TABLE}
+        ORDER BY binary_quantize(embedding)::bit(1536) <~> %s::bit(1536)
+        LIMIT %s
+    )
+    ORDER BY embedding <-> %s::vector
+    LIMIT {K}
+"""
+
+
+def query_bits(vector):
+    return ''.join('1' if x > 0 else '0' for x in vector)
+
+
+def run_queries(cursor, queries, ground_truth, sql, params):
+    latencies = []
+    recalls = []
+    for query, expected in zip(queries, ground_truth):
+        start = time.perf_counter()
+        cursor.execute(sql, params(query))
+        ids = [row[0] for row in cursor.fetchall()]
+        latencies.append(time.perf_counter() - start)
+        recalls.append(recall_at_k(expected, ids, K))
+    latency = latency_summary(latencies)
+    return {
+        'p50_ms': latency['p50_ms'],
+        'p95_ms': latency['p95_ms'],
+        f'recall@{K}': round(sum(recalls) / len(recalls), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--source', choices=['synthetic', 'chunks'], default='synthetic')
+    parser.add_argument('--candidates', type=int, nargs='+', default=[50, 100, 200, 400])
+    parser.add_argument('--ef-search', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    rng = random.Random(args.seed)
+    vectors = load_vectors(args.source, args.rows, args.seed)
+    queries = [perturb(rng.choice(vectors), rng=rng) for _ in range(args.queries)]
+    print(f"Loaded {len(vectors)} vectors and {len(queries)} queries ({args.source})")
+
+    connection.ensure_connection()
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cursor.execute(f"CREATE TEMP TABLE {TABLE} (id integer PRIMARY KEY, embedding vector(1536))")
+        copy_vectors(connection.connection, TABLE, vectors)
+        cursor.execute(f"ANALYZE {TABLE}")
+
+        results = []
+        cursor.execute("SET enable_indexscan = off")
+        ground_truth = []
+        for query in queries:
+            cursor.execute(EXACT_SQL, [vector_literal(query)])
+            ground_truth.append([row[0] for row in cursor.fetchall()])
+        results.append({
+            'strategy': 'exact',
+            'index_mb': 0,
+            **run_queries(cursor, queries, ground_truth, EXACT_SQL, lambda q: [vector_literal(q)]),
+        })
+        cursor.execute("RESET enable_indexscan")
+
+        with timer() as build:
+            cursor.execute(f"CREATE INDEX {TABLE}_hnsw ON {TABLE} USING hnsw (embedding vector_l2_ops)")
+        cursor.execute(
+            f"CREATE INDEX {TABLE}_bit_hnsw ON {TABLE} "
+            f"USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)"
+        )
+        cursor.execute("SELECT pg_relation_size(%s), pg_relation_size(%s)", [f'{TABLE}_hnsw', f'{TABLE}_bit_hnsw'])
+        full_index_bytes, bit_index_bytes = cursor.fetchone()
+        print(f"Built full HNSW index in {build['seconds']:.1f}s")
+
+        cursor.execute("SET hnsw.ef_search = %s", [args.ef_search])
+        results.append({
+            'strategy': 'hnsw',
+            'index_mb': round(full_index_bytes / 2 ** 20, 2),
+            **run_queries(cursor, queries, ground_truth, EXACT_SQL, lambda q: [vector_literal(q)]),
+        })
+
+        for candidates in args.candidates:
+            # The index scan can only return ef_search rows
+            cursor.execute("SET hnsw.ef_search = %s", [max(args.ef_search, candidates)])
+            results.append({
+                'strategy': f'binary_rerank@{candidates}',
+                'index_mb': round(bit_index_bytes / 2 ** 20, 2),
+                **run_queries(
+                    cursor, queries, ground_truth, RERANK_SQL,
+                    lambda q: [query_bits(q), candidates, vector_literal(q)],
+                ),
+            })
+        cursor.execute(f"DROP TABLE {TABLE}")
+
+    print_table(results, ['strategy', 'index_mb', 'p50_ms', 'p95_ms', f'recall@{K}'])
+    if args.output:
+        write_results(args.output, 'binary_retrieval', results, vars(args))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+import io
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Make the project importable when run from anywhere inside the repo
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def setup_django(settings_module='ai_interviewee.settings'):
+    """Initialise Django so benchmarks can use the ORM and database."""
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+@contextmanager
+def timer():
+    """Context manager yielding a dict whose 'seconds' is set on exit."""
+    result = {'seconds': 0.0}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['seconds'] = time.perf_counter() - start
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of ``values`` (pct in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_summary(seconds):
+    """Summarise a list of latencies (in seconds) in milliseconds."""
+    return {
+        'count': len(seconds),
+        'mean_ms': round(1000 * sum(seconds) / len(seconds), 3) if seconds else 0.0,
+        'p50_ms': round(1000 * percentile(seconds, 50), 3),
+        'p95_ms': round(1000 * percentile(seconds, 95), 3),
+        'p99_ms': round(1000 * percentile(seconds, 99), 3),
+    }
+
+
+def normalize(vector):
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def random_unit_vectors(count, dimensions, clusters=50, spread=0.3, seed=0):
+    """
+    Clustered random unit vectors, a rough stand-in for real embeddings
+    (which are far from uniformly spread over the sphere).
+    """
+    rng = random.Random(seed)
+    centers = [normalize([rng.gauss(0, 1) for _ in range(dimensions)]) for _ in range(clusters)]
+    sigma = spread / math.sqrt(dimensions)
+    vectors = []
+    for _ in range(count):
+        center = rng.choice(centers)
+        vectors.append(normalize([c + rng.gauss(0, sigma) for c in center]))
+    return vectors
+
+
+def perturb(vector, noise=0.1, rng=random):
+    """A unit vector close to ``vector``, used as a query that isn't in the table."""
+    sigma = noise / math.sqrt(len(vector))
+    return normalize([x + rng.gauss(0, sigma) for x in vector])
+
+
+def vector_literal(vector):
+    """pgvector text representation of a vector"""
+    return '[' + ','.join(f'{x:.7g}' for x in vector) + ']'
+
+
+def recall_at_k(expected, actual, k):
+    """Fraction of the true top-k ids found in the returned top-k ids."""
+    if not expected:
+        return 1.0
+    return len(set(expected[:k]) & set(actual[:k])) / min(k, len(expected))
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=PROJECT_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, benchmark, results, parameters=None):
+    """
+    Write benchmark results as JSON, tagged with the commit and environment so
+    runs from different commits can be compared.
+    """
+    payload = {
+        'benchmark': benchmark,
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': parameters or {},
+        'results': results,
+    }
+    Path(path).write_text(json.dumps(payload, indent=2, default=str))
+    return payload
+
+
+def print_table(rows, columns):
+    """Print a list of dicts as an aligned text table."""
+    widths = {
+        column: max(len(column), *(len(str(row.get(column, ''))) for row in rows))
+        for column in columns
+    }
+    print('  '.join(column.ljust(widths[column]) for column in columns))
+    print('  '.join('-' * widths[column] for column in columns))
+    for row in rows:
+        print('  '.join(str(row.get(column, '')).ljust(widths[column]) for column in columns))
+
+
+def shorten(vector, dimensions):
+    """First ``dimensions`` components re-normalized (OpenAI-style shortening)."""
+    return vector if not dimensions or dimensions == len(vector) else normalize(vector[:dimensions])
+
+
+def load_vectors(source, rows, seed=0):
+    """Vectors to benchmark with: stored chunk embeddings or synthetic ones."""
+    if source == 'chunks':
+        from ai_interviewee.models import DocumentChunk
+        vectors = [
+            list(embedding)
+            for embedding in DocumentChunk.objects.filter(embedding__isnull=False)
+            .values_list('embedding', flat=True)[:rows]
+        ]
+        if not vectors:
+            raise SystemExit("No embedded chunks found; use --source synthetic")
+        return vectors
+    return random_unit_vectors(rows, 1536, seed=seed)
+
+
+def copy_vectors(raw_connection, table, vectors, dimensions=None):
+    """Bulk load (id, embedding) rows into ``table`` with COPY."""
+    buffer = io.StringIO()
+    for i, vector in enumerate(vectors):
+        buffer.write(f"{i}\t{vector_literal(shorten(vector, dimensions))}\n")
+    buffer.seek(0)
+    with raw_connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} (id, embedding) FROM STDIN", buffer)
@@ -0,0 +1,133 @@
+"""
+Synthetic CV-style corpus for benchmarks that need documents, not vectors.
+
+Every document is a few dozen paragraphs of filler about work experience
+with a handful of planted facts, each a sentence about one project at one
+company that no other document mentions. Every fact comes with a question
+it answers, so the corpus doubles as labeled retrieval data.
+
+    python -m benchmarks.corpus /tmp/corpus --documents 200
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import List, NamedTuple
+
+COMPANY_PREFIXES = (
+    'North', 'Blue', 'Iron', 'Silver', 'Bright', 'Cedar', 'Lumen', 'Harbor', 'Quartz', 'Summit',
+    'Falcon', 'Maple', 'Orbit', 'Pioneer', 'Willow', 'Atlas', 'Cobalt', 'Ember', 'Granite', 'Juniper',
+)
+COMPANY_SUFFIXES = (
+    'wind', 'peak', 'stone', 'field', 'bridge', 'gate', 'works', 'labs', 'forge', 'line',
+)
+COMPANY_KINDS = ('Analytics', 'Health', 'Logistics', 'Payments', 'Media', 'Robotics', 'Energy', 'Retail')
+SKILLS = (
+    'Python', 'Django', 'PostgreSQL', 'pgvector', 'Celery', 'Redis', 'Kubernetes', 'Terraform', 'React',
+    'TypeScript', 'Go', 'Rust', 'Kafka', 'Airflow', 'Spark', 'dbt', 'GraphQL', 'AWS', 'GCP', 'Elasticsearch',
+)
+PROJECTS = (
+    'a billing platform', 'a recommendation engine', 'a fraud detection pipeline', 'an internal search tool',
+    'a data warehouse', 'a mobile checkout flow', 'a feature store', 'an observability stack',
+    'a document ingestion service', 'a pricing API', 'a scheduling system', 'a chat support bot',
+)
+VERBS = ('built', 'designed', 'led the rewrite of', 'migrated', 'scaled', 'launched', 'maintained')
+METRICS = ('latency', 'infrastructure cost', 'error rates', 'onboarding time', 'page load time', 'churn')
+FILLER = (
+    'I worked closely with product and design to agree on priorities every sprint.',
+    'Code review and pairing were a large part of how the team shared knowledge.',
+    'We kept deployments small and frequent, and rolled back quickly when needed.',
+    'I wrote design documents before larger changes and asked for feedback early.',
+    'Monitoring and alerting were set up before any new service went live.',
+    'I mentored junior engineers and ran the weekly architecture discussion.',
+    'Most of the work involved untangling legacy code without stopping delivery.',
+    'I enjoy turning vague requirements into something that can be shipped.',
+    'Testing was automated end to end, and flaky tests were fixed the same week.',
+    'On-call duty was shared across the team with clear runbooks for incidents.',
+    'We measured the impact of every release against the goals we had agreed.',
+    'I presented results to stakeholders and adjusted plans based on their input.',
+)
+
+
+class Fact(NamedTuple):
+    """A planted sentence and a question only it answers"""
+    question: str
+    passage: str
+    document: int
+
+
+class SyntheticDocument(NamedTuple):
+    title: str
+    text: str
+    facts: List[Fact]
+
+
+def _company_names(rng, count):
+    names = [
+        f'{prefix}{suffix} {kind}'
+        for prefix in COMPANY_PREFIXES for suffix in COMPANY_SUFFIXES for kind in COMPANY_KINDS
+    ]
+    if count > len(names):
+        raise ValueError(f"At most {len(names)} facts can be generated")
+    return rng.sample(names, count)
+
+
+def generate_corpus(documents, paragraphs=30, facts_per_document=3, seed=0) -> List[SyntheticDocument]:
+    """
+    ``documents`` synthetic documents of ``paragraphs`` paragraphs each, with
+    ``facts_per_document`` of the paragraphs containing a planted fact.
+    """
+    rng = random.Random(seed)
+    companies = iter(_company_names(rng, documents * facts_per_document))
+    corpus = []
+    for index in range(documents):
+        fact_slots = set(rng.sample(range(paragraphs), min(facts_per_document, paragraphs)))
+        parts, facts = [], []
+        for paragraph in range(paragraphs):
+            sentences = rng.sample(FILLER, rng.randint(3, 6))
+            if paragraph in fact_slots:
+                company = next(companies)
+                skill, other_skill = rng.sample(SKILLS, 2)
+                project = rng.choice(PROJECTS)
+                passage = (
+                    f"At {company}, I {rng.choice(VERBS)} {project} with {skill} and {other_skill}, "
+                    f"cutting {rng.choice(METRICS)} by {rng.randint(10, 80)}%."
+                )
+                facts.append(Fact(f"What did you work on at {company}?", passage, index))
+                sentences.insert(rng.randint(0, len(sentences)), passage)
+            parts.append(' '.join(sentences))
+        corpus.append(SyntheticDocument(f'Synthetic CV {index + 1}', '\n\n'.join(parts), facts))
+    return corpus
+
+
+def write_corpus(directory, corpus) -> List[Path]:
+    """Write every document as a .txt file, plus the facts as questions.jsonl"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    with open(directory / 'questions.jsonl', 'w') as questions:
+        for index, document in enumerate(corpus):
+            path = directory / f'document-{index + 1:05d}.txt'
+            path.write_text(document.text)
+            paths.append(path)
+            for fact in document.facts:
+                questions.write(json.dumps({'question': fact.question, 'passage': fact.passage,
+                                            'document': path.name}) + '\n')
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directory')
+    parser.add_argument('--documents', type=int, default=100)
+    parser.add_argument('--paragraphs', type=int, default=30)
+    parser.add_argument('--facts', type=int, default=3, help="Planted facts per document")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    paths = write_corpus(args.directory, generate_corpus(args.documents, args.paragraphs, args.facts, args.seed))
+    print(f"Wrote {len(paths)} documents to {args.directory}")
+
+
+if __name__ == '__main__':
+    main()
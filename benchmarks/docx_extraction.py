@@ -0,0 +1,180 @@
+"""
+Streaming DOCX extraction (iter_docx_text) versus python-docx.
+
+Writes synthetic DOCX files of increasing size, each a mix of paragraphs and
+skills-matrix style tables, and extracts them with:
+
+* ``python-docx``: ``Document(path).paragraphs``, the previous extractor,
+  which loads the whole XML tree and drops table text
+* ``python-docx+tables``: the same plus every table cell, for a like-for-like
+  amount of text (though not in document order)
+* ``streaming``: extract_text_from_docx, which iterparses word/document.xml
+
+Each run happens in a fresh process, and memory is the growth of that
+process's peak RSS during extraction, which includes lxml's C allocations
+that tracemalloc can't see.
+
+    python -m benchmarks.docx_extraction --paragraphs 2000 20000 100000
+"""
+import argparse
+import multiprocessing
+import random
+import tempfile
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from benchmarks.common import setup_django, timer, write_results, print_table
+
+WORDS = (
+    'python django postgres vector search retrieval embedding latency throughput team '
+    'led designed built shipped migrated scaled reduced improved mentored reviewed'
+).split()
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+</Types>"""
+
+RELATIONSHIPS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+DOCUMENT_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+)
+DOCUMENT_END = '</w:body></w:document>'
+
+
+def _paragraph(text):
+    return f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+
+def write_synthetic_docx(path, paragraphs, table_every=20, table_rows=10, seed=0):
+    """
+    A DOCX with ``paragraphs`` paragraphs and a 3-column table after every
+    ``table_every`` of them, streamed straight into the archive.
+    """
+    rng = random.Random(seed)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', RELATIONSHIPS)
+        with archive.open('word/document.xml', 'w') as document_xml:
+            document_xml.write(DOCUMENT_START.encode())
+            for index in range(paragraphs):
+                text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 40)))
+                document_xml.write(_paragraph(text).encode())
+                if table_every and (index + 1) % table_every == 0:
+                    rows = ''.join(
+                        '<w:tr>' + ''.join(
+                            f'<w:tc>{_paragraph(rng.choice(WORDS) + " " + str(rng.randint(1, 10)))}</w:tc>'
+                            for _ in range(3)
+                        ) + '</w:tr>'
+                        for _ in range(table_rows)
+                    )
+                    document_xml.write(f'<w:tbl>{rows}</w:tbl>'.encode())
+            document_xml.write(DOCUMENT_END.encode())
+
+
+def _read_python_docx(path, tables):
+    from docx import Document
+    document = Document(path)
+    parts = [paragraph.text for paragraph in document.paragraphs]
+    if tables:
+        for table in document.tables:
+            for row in table.rows:
+                parts.append(' | '.join(cell.text for cell in row.cells))
+    return '\n'.join(parts)
+
+
+def _read_streaming(path):
+    from ai_interviewee.utils import extract_text_from_docx
+    return extract_text_from_docx(path)
+
+
+def _measure(reader, path, queue):
+    import resource
+    try:
+        # Load everything outside the measurement
+        setup_django()
+        import ai_interviewee.utils  # noqa: F401
+        import docx  # noqa: F401
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        with timer() as elapsed:
+            if reader == 'streaming':
+                text = _read_streaming(path)
+            else:
+                text = _read_python_docx(path, tables=reader == 'python-docx+tables')
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception as e:
+        queue.put({'error': f'{reader}: {e!r}'})
+        raise
+    queue.put({
+        'seconds': elapsed['seconds'],
+        'peak_mib': (peak - baseline) / 1024,
+        'chars': len(text),
+        'lines': set(text.split('\n')),
+    })
+
+
+def measure(reader, path):
+    """Run one reader on one file in a fresh process"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(reader, str(path), queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    if 'error' in result:
+        raise SystemExit(result['error'])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paragraphs', type=int, nargs='+', default=[2000, 20000, 100000])
+    parser.add_argument('--table-every', type=int, default=20)
+    parser.add_argument('--table-rows', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per reader and size; the fastest is kept")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for paragraphs in args.paragraphs:
+            path = Path(directory) / f'synthetic-{paragraphs}.docx'
+            write_synthetic_docx(path, paragraphs, args.table_every, args.table_rows, args.seed)
+            size_mib = round(path.stat().st_size / 2 ** 20, 2)
+            runs = {}
+            for reader in ('python-docx', 'python-docx+tables', 'streaming'):
+                runs[reader] = [measure(reader, path) for _ in range(args.repeat)]
+
+            # The streaming reader must find every paragraph python-docx does
+            missing = runs['python-docx'][0]['lines'] - runs['streaming'][0]['lines']
+            if missing:
+                raise SystemExit(f"streaming reader lost {len(missing)} paragraphs on {path.name}")
+
+            for reader, reader_runs in runs.items():
+                results.append({
+                    'paragraphs': paragraphs,
+                    'file_mib': size_mib,
+                    'reader': reader,
+                    'seconds': round(min(run['seconds'] for run in reader_runs), 4),
+                    'peak_mib': round(min(run['peak_mib'] for run in reader_runs), 1),
+                    'chars': reader_runs[0]['chars'],
+                })
+            print(f"Measured {paragraphs} paragraphs ({size_mib} MiB)")
+
+    print_table(results, ['paragraphs', 'file_mib', 'reader', 'seconds', 'peak_mib', 'chars'])
+    if args.output:
+        write_results(args.output, 'docx_extraction', results, vars(args))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""
+End-to-end ingestion and RAG query benchmark that never calls OpenAI.
+
+Starts a FakeOpenAIServer (ai_interviewee.fake_openai) with the given
+latency and rate limit and points every OpenAI client at it. Then, as a
+throwaway user:
+
+* ``ingestion``: stores a synthetic corpus (benchmarks.corpus) as documents
+  and runs ``process_document_task`` for each one, with Celery in eager
+  mode so the embedding task runs inline, until every chunk is embedded.
+  Reports documents, chunks and tokens per second.
+* ``rag_query``: sends the corpus questions to ``RagQueryView`` through the
+  DRF test client and reports p50/p95/p99 latency, including embedding the
+  question, retrieval and the (fake) chat completion.
+
+Chunks are embedded by the ``fake_server`` provider (real HTTP requests to
+the fake server) or by the ``hashing`` provider (no requests at all, to
+measure the pipeline on its own). Redis is not used, so rate limiting is
+only what the fake server enforces. The user, its documents and their
+files are deleted afterwards unless --keep is given.
+
+    python -m benchmarks.end_to_end --documents 50 --embedding-latency-ms 80 \\
+        --chat-latency-ms 400 --rate-limit 100 --output results/end_to_end.json
+"""
+import argparse
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import setup_django, timer, latency_summary, write_results, print_table
+from benchmarks.corpus import generate_corpus
+
+
+def configure(args):
+    """Start the fake server and point the app at it; returns the server"""
+    from django.conf import settings
+    from ai_interviewee.celery import app
+    from ai_interviewee.fake_openai import FakeOpenAIServer
+
+    server = FakeOpenAIServer(
+        embedding_latency=args.embedding_latency_ms / 1000,
+        chat_latency=args.chat_latency_ms / 1000,
+        jitter=args.jitter,
+        rate_limit=args.rate_limit,
+        rate_limit_window=args.rate_limit_window,
+        seed=args.seed,
+    ).start()
+    settings.OPENAI_API_KEY = 'benchmark'
+    settings.OPENAI_BASE_URL = server.base_url
+    settings.FAKE_OPENAI_BASE_URL = server.base_url
+    settings.EMBEDDING_PROVIDER = args.provider
+    settings.REDIS_URL = None
+    app.conf.task_always_eager = True
+    app.conf.task_eager_propagates = True
+    return server
+
+
+def create_documents(user, corpus):
+    from django.core.files.base import ContentFile
+    from ai_interviewee.models import Document
+    from ai_interviewee.utils import hash_file
+
+    documents = []
+    for index, synthetic in enumerate(corpus):
+        content = ContentFile(synthetic.text.encode('utf-8'))
+        # As uploads do, hash before storing so the task doesn't re-read the file
+        document = Document(
+            owner=user,
+            title=synthetic.title,
+            file_size=content.size,
+            mime_type='text/plain',
+            content_hash=hash_file(content),
+        )
+        document.file.save(f'benchmark-{index + 1:05d}.txt', content, save=False)
+        document.save()
+        documents.append(document)
+    return documents
+
+
+def _in_thread(function):
+    """Run ``function`` and close this thread's database connection afterwards"""
+    def run(*args):
+        from django.db import connection
+        try:
+            return function(*args)
+        finally:
+            connection.close()
+    return run
+
+
+def ingest(documents, workers):
+    from ai_interviewee.tasks import process_document_task
+
+    def process(document_id):
+        with timer() as elapsed:
+            process_document_task.apply(args=(document_id,), throw=True)
+        return elapsed['seconds']
+
+    with timer() as elapsed:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            latencies = list(pool.map(_in_thread(process), [document.id for document in documents]))
+    return elapsed['seconds'], latencies
+
+
+def query(user, questions, concurrency):
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    url = reverse('rag-query')
+    local = threading.local()
+
+    def ask(question):
+        if not hasattr(local, 'client'):
+            local.client = APIClient()
+            local.client.force_authenticate(user)
+        with timer() as elapsed:
+            response = local.client.get(url, {'question': question})
+        failed = response.status_code != 200 or str(response.data.get('response', '')).startswith('Error:')
+        return elapsed['seconds'], failed
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(_in_thread(ask), questions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=50)
+    parser.add_argument('--paragraphs', type=int, default=30, help="Paragraphs per document")
+    parser.add_argument('--provider', choices=['fake_server', 'hashing'], default='fake_server',
+                        help="Embedding provider used for chunks and questions")
+    parser.add_argument('--workers', type=int, default=4, help="Documents processed at once")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--query-concurrency', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=5, help="Queries sent before measuring")
+    parser.add_argument('--embedding-latency-ms', type=float, default=50)
+    parser.add_argument('--chat-latency-ms', type=float, default=300)
+    parser.add_argument('--jitter', type=float, default=0.2, help="Random extra latency, as a fraction")
+    parser.add_argument('--rate-limit', type=int, help="Model requests allowed per window before 429s")
+    parser.add_argument('--rate-limit-window', type=float, default=1.0, help="Rate-limit window in seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep', action='store_true', help="Keep the benchmark user and documents")
+    parser.add_argument('--output', help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    setup_django()
+    server = configure(args)
+    from django.contrib.auth.models import User
+    from ai_interviewee.models import DocumentChunk, ExtractedText, UserProfile
+    from ai_interviewee.utils import estimate_tokens
+
+    corpus = generate_corpus(args.documents, args.paragraphs, seed=args.seed)
+    user = User.objects.create_user(username=f'benchmark-{uuid.uuid4().hex[:12]}')
+    UserProfile.objects.create(user=user)
+    documents = []
+    try:
+        documents = create_documents(user, corpus)
+        # Start cold: no text cached from an earlier run of the same corpus
+        ExtractedText.objects.filter(content_hash__in=[document.content_hash for document in documents]).delete()
+        print(f"Created {len(documents)} documents; ingesting with {args.workers} workers ({args.provider})")
+
+        seconds, latencies = ingest(documents, args.workers)
+        field, _ = DocumentChunk.embedding_storage()
+        chunks = DocumentChunk.objects.filter(document__owner=user)
+        missing = chunks.filter(**{f'{field}__isnull': True}).count()
+        if missing:
+            raise SystemExit(f"{missing} chunks were left without an embedding")
+        contents = list(chunks.values_list('content', flat=True))
+        tokens = sum(estimate_tokens(content) for content in contents)
+        ingestion_requests = server.requests.count('POST /v1/embeddings')
+        ingestion = {
+            'stage': 'ingestion',
+            'count': len(documents),
+            'seconds': round(seconds, 3),
+            'documents_per_s': round(len(documents) / seconds, 2),
+            'chunks_per_s': round(len(contents) / seconds, 1),
+            'tokens_per_s': round(tokens / seconds),
+            **{key: value for key, value in latency_summary(latencies).items() if key != 'count'},
+            'chunks': len(contents),
+            'model_requests': ingestion_requests,
+            'rate_limited': server.rate_limited,
+        }
+        print(f"Ingested {len(contents)} chunks in {seconds:.1f}s")
+
+        questions = [fact.question for document in corpus for fact in document.facts]
+        questions = [questions[i % len(questions)] for i in range(args.warmup + args.queries)]
+        query(user, questions[:args.warmup], args.query_concurrency)
+        rate_limited = server.rate_limited
+        with timer() as elapsed:
+            results = query(user, questions[args.warmup:], args.query_concurrency)
+        rag = {
+            'stage': 'rag_query',
+            'count': len(results),
+            'seconds': round(elapsed['seconds'], 3),
+            **{key: value for key, value in latency_summary([latency for latency, _ in results]).items()
+               if key != 'count'},
+            'queries_per_s': round(len(results) / elapsed['seconds'], 2),
+            'errors': sum(failed for _, failed in results),
+            'rate_limited': server.rate_limited - rate_limited,
+        }
+    finally:
+        if not args.keep:
+            for document in documents:
+                document.file.delete(save=False)
+            ExtractedText.objects.filter(content_hash__in=[document.content_hash for document in documents]).delete()
+            user.delete()
+        server.stop()
+
+    results = [ingestion, rag]
+    print_table(results, [
+        'stage', 'count', 'seconds', 'documents_per_s', 'chunks_per_s', 'tokens_per_s',
+        'queries_per_s', 'p50_ms', 'p95_ms', 'p99_ms', 'errors', 'rate_limited',
+    ])
+    if args.output:
+        write_results(args.output, 'end_to_end', results, vars(args))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Per-query cost of L2 distance versus inner product on unit-length vectors.
+
+Stored embeddings are unit length, so ``<#>`` (negative inner product) ranks
+chunks exactly like ``<->`` (L2 distance), which RagService used to order by,
+while doing less arithmetic per comparison. This loads the same vectors into
+a temporary table and, for each operator, measures:
+
+* ``exact``: a sequential scan over every row, where distance arithmetic
+  dominates the server's CPU time
+* ``hnsw``: an index scan with the operator's HNSW opclass
+
+Times are the server-side execution times reported by EXPLAIN ANALYZE, so
+network and client overhead don't hide the difference. Recall is measured
+against the exact L2 ranking.
+
+    python -m benchmarks.inner_product --rows 50000 --queries 100
+"""
+import argparse
+import json
+import random
+
+from benchmarks.common import (
+    setup_django, latency_summary, recall_at_k, perturb,
+    load_vectors, copy_vectors, vector_literal, write_results, print_table,
+)
+
+K = 5
+TABLE = 'bench_inner_product'
+OPERATORS = [
+    # name, operator, HNSW opclass
+    ('l2', '<->', 'vector_l2_ops'),
+    ('inner_product', '<#>', 'vector_ip_ops'),
+]
+
+
+def explain(cursor, operator, query):
+    """Execution time in seconds and the ids returned for one query"""
+    sql = f"SELECT id FROM {TABLE} ORDER BY embedding {operator} %s::vector LIMIT {K}"
+    literal = vector_literal(query)
+    cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", [literal])
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    cursor.execute(sql, [literal])
+    return plan[0]['Execution Time'] / 1000, [row[0] for row in cursor.fetchall()]
+
+
+def measure(cursor, operator, queries, ground_truth):
+    times = []
+    recalls = []
+    for query, expected in zip(queries, ground_truth):
+        seconds, ids = explain(cursor, operator, query)
+        times.append(seconds)
+        recalls.append(recall_at_k(expected, ids, K))
+    return latency_summary(times), round(sum(recalls) / len(recalls), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--source', choices=['synthetic', 'chunks'], default='synthetic')
+    parser.add_argument('--ef-search', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    rng = random.Random(args.seed)
+    vectors = load_vectors(args.source, args.rows, args.seed)
+    queries = [perturb(rng.choice(vectors), rng=rng) for _ in range(args.queries)]
+    print(f"Loaded {len(vectors)} vectors and {len(queries)} queries ({args.source})")
+
+    connection.ensure_connection()
+    results = []
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cursor.execute(f"CREATE TEMP TABLE {TABLE} (id integer PRIMARY KEY, embedding vector(1536))")
+        copy_vectors(connection.connection, TABLE, vectors)
+        cursor.execute(f"ANALYZE {TABLE}")
+        cursor.execute("SET max_parallel_workers_per_gather = 0")
+
+        cursor.execute("SET enable_indexscan = off")
+        ground_truth = [explain(cursor, '<->', query)[1] for query in queries]
+        for name, operator, _ in OPERATORS:
+            latency, recall = measure(cursor, operator, queries, ground_truth)
+            results.append({'search': 'exact', 'operator': name, **latency, f'recall@{K}': recall})
+        cursor.execute("RESET enable_indexscan")
+
+        cursor.execute("SET hnsw.ef_search = %s", [args.ef_search])
+        for name, operator, opclass in OPERATORS:
+            cursor.execute(f"CREATE INDEX {TABLE}_{name}_hnsw ON {TABLE} USING hnsw (embedding {opclass})")
+            latency, recall = measure(cursor, operator, queries, ground_truth)
+            results.append({'search': 'hnsw', 'operator': name, **latency, f'recall@{K}': recall})
+            cursor.execute(f"DROP INDEX {TABLE}_{name}_hnsw")
+        cursor.execute(f"DROP TABLE {TABLE}")
+
+    for search in ('exact', 'hnsw'):
+        l2, ip = (row for row in results if row['search'] == search)
+        ip['saved_ms'] = round(l2['mean_ms'] - ip['mean_ms'], 3)
+        ip['saved_pct'] = round(100 * (1 - ip['mean_ms'] / l2['mean_ms']), 1) if l2['mean_ms'] else 0.0
+
+    print_table(results, ['search', 'operator', 'mean_ms', 'p50_ms', 'p95_ms', f'recall@{K}', 'saved_ms', 'saved_pct'])
+    if args.output:
+        write_results(args.output, 'inner_product', results, vars(args))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
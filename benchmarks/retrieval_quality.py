@@ -0,0 +1,421 @@
+"""
+Retrieval quality versus cost: recall, MRR, prompt tokens and latency for a
+sweep of retrieval configurations over a labeled question set.
+
+The labeled set is a directory of documents per persona and the questions
+asked of each persona, with the passages that answer them:
+
+    dataset/questions.jsonl   {"persona": "alice", "question": "...", "passages": ["...", ...]}
+    dataset/alice/cv.pdf      any .txt, .pdf or .docx files
+    dataset/bob/...
+
+Without --dataset a synthetic set is generated from benchmarks.corpus, with
+--documents documents per persona and one question per planted fact.
+
+For every combination of:
+
+* chunking: ``chunk_text`` with each --chunk-sizes and --overlaps
+* index: ``exact`` (sequential scan), ``hnsw`` for each --ef-search, and
+  ``ivfflat`` for each --probes
+* mode: ``vector`` (nearest chunks by L2 distance, as RagService ranks them),
+  ``hybrid`` (the vector and full-text rankings fused by reciprocal rank)
+  or ``mmr`` (--mmr-candidates nearest chunks re-ranked by maximal marginal
+  relevance, trading similarity for diversity with --mmr-lambda)
+* k: each --k
+
+it reports, averaged over questions:
+
+* ``recall``: share of a question's passages found in the top k chunks. A
+  chunk finds a passage when it covers at least half of the passage, or
+  half of the chunk is the passage.
+* ``mrr``: reciprocal rank of the first chunk that finds any passage
+* ``prompt_tokens``: estimated tokens of the k chunks, before context
+  expansion
+* ``p50_ms`` / ``p95_ms``: query latency, including the MMR re-ranking but
+  not embedding the question
+
+Search is restricted to the asking persona's chunks, like RagService.
+Chunks go into a temporary table, so nothing in the app's tables changes;
+hybrid and MMR are evaluated there as candidates, since RagService doesn't
+offer them yet. Embeddings come from --provider; the default ``hashing``
+provider needs no network, while ``openai`` measures the quality real
+embeddings give. With --min-recall the cheapest configuration that reaches
+it (fewest prompt tokens, then lowest p95) is printed at the end.
+
+    python -m benchmarks.retrieval_quality --personas 5 --chunk-sizes 100 300 \\
+        --indexes exact hnsw ivfflat --modes vector hybrid mmr --k 3 5 10 \\
+        --min-recall 0.9 --output results/retrieval_quality.json
+"""
+import argparse
+import io
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from benchmarks.common import setup_django, timer, latency_summary, vector_literal, write_results, print_table
+from benchmarks.corpus import generate_corpus
+
+TABLE = 'bench_retrieval_quality'
+# Reciprocal rank fusion constant, as in the original RRF paper
+RRF_K = 60
+
+
+class LabeledQuestion(NamedTuple):
+    persona: str
+    question: str
+    passages: List[str]
+
+
+class Chunk(NamedTuple):
+    persona: str
+    document: str
+    start_char: int
+    end_char: int
+    content: str
+
+
+def synthetic_dataset(personas, documents, paragraphs, seed=0):
+    """Documents per persona and labeled questions from benchmarks.corpus"""
+    corpus = generate_corpus(personas * documents, paragraphs, seed=seed)
+    texts, questions = defaultdict(list), []
+    for index, document in enumerate(corpus):
+        persona = f'persona-{index // documents + 1}'
+        texts[persona].append((f'document-{index + 1:05d}.txt', document.text))
+        questions.extend(LabeledQuestion(persona, fact.question, [fact.passage]) for fact in document.facts)
+    return dict(texts), questions
+
+
+def load_dataset(directory):
+    """Documents per persona and labeled questions from a dataset directory"""
+    from ai_interviewee.utils import extract_text_from_file
+
+    directory = Path(directory)
+    questions = []
+    with open(directory / 'questions.jsonl') as lines:
+        for line in lines:
+            if line.strip():
+                record = json.loads(line)
+                questions.append(LabeledQuestion(record['persona'], record['question'], record['passages']))
+    texts = {}
+    for persona in sorted({question.persona for question in questions}):
+        paths = sorted(
+            path for path in (directory / persona).iterdir()
+            if path.suffix.lower() in ('.txt', '.pdf', '.docx')
+        )
+        texts[persona] = [(path.name, extract_text_from_file(path)) for path in paths]
+    return texts, questions
+
+
+def _normalized(text):
+    # chunk_text positions are offsets in the text with whitespace collapsed
+    return ' '.join(text.split())
+
+
+def locate_passages(texts, questions):
+    """
+    Where each question's passages are, as (document, start, end) spans in
+    the normalized text. Questions with a passage that can't be found are
+    left out.
+    """
+    located = []
+    for question in questions:
+        spans = []
+        for passage in question.passages:
+            passage = _normalized(passage)
+            for name, text in texts.get(question.persona, ()):
+                start = _normalized(text).find(passage)
+                if start >= 0:
+                    spans.append((name, start, start + len(passage)))
+                    break
+            else:
+                break
+        else:
+            located.append((question, spans))
+    return located
+
+
+def chunk_corpus(texts, chunk_size, overlap) -> List[Chunk]:
+    from ai_interviewee.utils import chunk_text
+
+    return [
+        Chunk(persona, name, chunk['start_char'], chunk['end_char'], chunk['content'])
+        for persona, documents in texts.items()
+        for name, text in documents
+        for chunk in chunk_text(_normalized(text), chunk_size=chunk_size, overlap=overlap)
+    ]
+
+
+def finds(chunk, span):
+    """Whether a chunk covers enough of a passage span to count as finding it"""
+    name, start, end = span
+    if chunk.document != name:
+        return False
+    covered = min(chunk.end_char, end) - max(chunk.start_char, start)
+    return covered > 0 and 2 * covered >= min(end - start, chunk.end_char - chunk.start_char)
+
+
+def embed_all(provider, texts, batch_size=256):
+    embeddings = []
+    for start in range(0, len(texts), batch_size):
+        embeddings.extend(provider.embed(texts[start:start + batch_size]))
+    return embeddings
+
+
+def _copy_field(value):
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def load_table(cursor, raw_connection, chunks, embeddings):
+    dimensions = len(embeddings[0])
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cursor.execute(f"""
+        CREATE TEMP TABLE {TABLE} (
+            id integer PRIMARY KEY,
+            persona text NOT NULL,
+            content text NOT NULL,
+            content_tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
+            embedding vector({dimensions}) NOT NULL
+        )
+    """)
+    buffer = io.StringIO()
+    for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+        buffer.write(f"{i}\t{_copy_field(chunk.persona)}\t{_copy_field(chunk.content)}\t{vector_literal(embedding)}\n")
+    buffer.seek(0)
+    with raw_connection.cursor() as raw_cursor:
+        raw_cursor.copy_expert(f"COPY {TABLE} (id, persona, content, embedding) FROM STDIN", buffer)
+    cursor.execute(f"CREATE INDEX {TABLE}_persona ON {TABLE} (persona)")
+    cursor.execute(f"CREATE INDEX {TABLE}_tsv ON {TABLE} USING gin (content_tsv)")
+    cursor.execute(f"ANALYZE {TABLE}")
+
+
+VECTOR_SQL = f"""
+    SELECT id FROM {TABLE} WHERE persona = %(persona)s
+    ORDER BY embedding <-> %(embedding)s::vector LIMIT %(limit)s
+"""
+
+# Full-text terms are OR-ed, since questions rarely share every word with
+# the passage that answers them
+HYBRID_SQL = f"""
+    WITH semantic AS (
+        SELECT id, row_number() OVER (ORDER BY distance) AS rank FROM (
+            SELECT id, embedding <-> %(embedding)s::vector AS distance FROM {TABLE}
+            WHERE persona = %(persona)s ORDER BY distance LIMIT %(candidates)s
+        ) nearest
+    ),
+    keyword AS (
+        SELECT id, row_number() OVER (ORDER BY score DESC) AS rank FROM (
+            SELECT id, ts_rank_cd(content_tsv, query) AS score
+            FROM {TABLE}, replace(plainto_tsquery('english', %(question)s)::text, '&', '|')::tsquery AS query
+            WHERE persona = %(persona)s AND content_tsv @@ query ORDER BY score DESC LIMIT %(candidates)s
+        ) matches
+    )
+    SELECT id FROM semantic FULL OUTER JOIN keyword USING (id)
+    ORDER BY coalesce(1.0 / ({RRF_K} + semantic.rank), 0) + coalesce(1.0 / ({RRF_K} + keyword.rank), 0) DESC
+    LIMIT %(limit)s
+"""
+
+
+def mmr(query, candidates, vectors, k, weight):
+    """
+    Greedy maximal marginal relevance: repeatedly take the candidate with the
+    best ``weight * similarity to the query - (1 - weight) * similarity to
+    the closest chunk already taken``. Vectors are unit length, so dot
+    products are cosine similarities.
+    """
+    import numpy as np
+
+    if not candidates:
+        return []
+    matrix = vectors[candidates]
+    relevance = matrix @ query
+    redundancy = np.full(len(candidates), -np.inf)
+    remaining = np.ones(len(candidates), dtype=bool)
+    chosen = []
+    for _ in range(min(k, len(candidates))):
+        score = weight * relevance - (1 - weight) * np.where(np.isfinite(redundancy), redundancy, 0)
+        score[~remaining] = -np.inf
+        best = int(np.argmax(score))
+        chosen.append(candidates[best])
+        remaining[best] = False
+        redundancy = np.maximum(redundancy, matrix @ matrix[best])
+    return chosen
+
+
+def search(cursor, mode, question, persona, literal, query_vector, vectors, k, args):
+    params = {'persona': persona, 'embedding': literal, 'limit': k}
+    if mode == 'vector':
+        cursor.execute(VECTOR_SQL, params)
+        return [row[0] for row in cursor.fetchall()]
+    candidates = max(args.mmr_candidates if mode == 'mmr' else args.hybrid_candidates, k)
+    if mode == 'hybrid':
+        cursor.execute(HYBRID_SQL, {**params, 'question': question, 'candidates': candidates})
+        return [row[0] for row in cursor.fetchall()]
+    cursor.execute(VECTOR_SQL, {**params, 'limit': candidates})
+    return mmr(query_vector, [row[0] for row in cursor.fetchall()], vectors, k, args.mmr_lambda)
+
+
+def index_configurations(args, rows) -> List[Tuple[str, str, Dict[str, object]]]:
+    """(index, CREATE INDEX options, search settings) for every index to try"""
+    configurations = []
+    iterative = {}
+    if args.iterative_scan != 'off':
+        # IVFFlat only scans in relaxed order
+        iterative = {'hnsw.iterative_scan': args.iterative_scan, 'ivfflat.iterative_scan': 'relaxed_order'}
+    for index in args.indexes:
+        if index == 'exact':
+            configurations.append(('exact', None, {}))
+        elif index == 'hnsw':
+            options = f"hnsw (embedding vector_l2_ops) WITH (m = {args.m}, ef_construction = {args.ef_construction})"
+            for ef_search in args.ef_search:
+                configurations.append(('hnsw', options, {'hnsw.ef_search': ef_search, **iterative}))
+        elif index == 'ivfflat':
+            # pgvector's suggested list count: rows / 1000, at least 1
+            lists = args.lists or max(1, rows // 1000)
+            options = f"ivfflat (embedding vector_l2_ops) WITH (lists = {lists})"
+            for probes in args.probes:
+                configurations.append(('ivfflat', options, {'ivfflat.probes': min(probes, lists), **iterative}))
+    return configurations
+
+
+def evaluate(cursor, located, query_vectors, chunks, vectors, mode, k, args):
+    from ai_interviewee.utils import estimate_tokens
+
+    recalls, reciprocal_ranks, tokens, latencies = [], [], [], []
+    for (question, spans), query_vector in zip(located, query_vectors):
+        literal = vector_literal(query_vector.tolist())
+        start = time.perf_counter()
+        ids = search(cursor, mode, question.question, question.persona, literal, query_vector, vectors, k, args)
+        latencies.append(time.perf_counter() - start)
+
+        hits = [chunks[i] for i in ids]
+        found = [any(finds(chunk, span) for chunk in hits) for span in spans]
+        recalls.append(sum(found) / len(spans))
+        rank = next((rank for rank, chunk in enumerate(hits, 1) if any(finds(chunk, span) for span in spans)), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        tokens.append(sum(estimate_tokens(chunk.content) for chunk in hits))
+    latency = latency_summary(latencies)
+    return {
+        'recall': round(sum(recalls) / len(recalls), 4),
+        'mrr': round(sum(reciprocal_ranks) / len(reciprocal_ranks), 4),
+        'prompt_tokens': round(sum(tokens) / len(tokens)),
+        'p50_ms': latency['p50_ms'],
+        'p95_ms': latency['p95_ms'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', help="Labeled dataset directory; a synthetic one is generated if omitted")
+    parser.add_argument('--personas', type=int, default=5, help="Synthetic personas")
+    parser.add_argument('--documents', type=int, default=10, help="Synthetic documents per persona")
+    parser.add_argument('--paragraphs', type=int, default=30, help="Paragraphs per synthetic document")
+    parser.add_argument('--provider', default='hashing', help="Embedding provider (see EMBEDDING_PROVIDERS)")
+    parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[150, 300], help="chunk_text chunk_size values")
+    parser.add_argument('--overlaps', type=int, nargs='+', default=[50], help="chunk_text overlap values")
+    parser.add_argument('--indexes', nargs='+', default=['exact', 'hnsw', 'ivfflat'],
+                        choices=['exact', 'hnsw', 'ivfflat'])
+    parser.add_argument('--m', type=int, default=16, help="HNSW m")
+    parser.add_argument('--ef-construction', type=int, default=64)
+    parser.add_argument('--ef-search', type=int, nargs='+', default=[40, 200])
+    parser.add_argument('--lists', type=int, help="IVFFlat lists (default: chunks / 1000)")
+    parser.add_argument('--probes', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--iterative-scan', choices=['off', 'relaxed_order', 'strict_order'], default='off',
+                        help="Keep scanning the index until k chunks of the persona are found (pgvector 0.8+)")
+    parser.add_argument('--modes', nargs='+', default=['vector', 'hybrid', 'mmr'], choices=['vector', 'hybrid', 'mmr'])
+    parser.add_argument('--k', type=int, nargs='+', default=[3, 5, 10], help="Chunks retrieved per question")
+    parser.add_argument('--hybrid-candidates', type=int, default=50, help="Candidates per ranking fused by hybrid")
+    parser.add_argument('--mmr-candidates', type=int, default=30, help="Nearest chunks re-ranked by MMR")
+    parser.add_argument('--mmr-lambda', type=float, default=0.7, help="MMR weight of relevance over diversity")
+    parser.add_argument('--min-recall', type=float, help="Report the cheapest configuration reaching this recall")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    setup_django()
+    import numpy as np
+    from django.db import connection
+    from ai_interviewee.services import get_embedding_provider
+
+    if args.dataset:
+        texts, questions = load_dataset(args.dataset)
+    else:
+        texts, questions = synthetic_dataset(args.personas, args.documents, args.paragraphs, args.seed)
+    located = locate_passages(texts, questions)
+    if not located:
+        raise SystemExit("None of the labeled passages were found in the documents")
+    print(f"Loaded {sum(len(documents) for documents in texts.values())} documents and {len(located)} questions "
+          f"for {len(texts)} personas ({len(questions) - len(located)} questions without a matching passage)")
+
+    provider = get_embedding_provider(args.provider, max_wait=None)
+    query_vectors = np.array(embed_all(provider, [question.question for question, _ in located]), dtype=np.float32)
+
+    connection.ensure_connection()
+    raw = connection.connection
+    results = []
+    with connection.cursor() as cursor:
+        for chunk_size in args.chunk_sizes:
+            for overlap in args.overlaps:
+                if overlap >= chunk_size:
+                    continue
+                chunks = chunk_corpus(texts, chunk_size, overlap)
+                with timer() as embedding:
+                    embeddings = embed_all(provider, [chunk.content for chunk in chunks])
+                vectors = np.array(embeddings, dtype=np.float32)
+                load_table(cursor, raw, chunks, embeddings)
+                print(f"chunk_size={chunk_size} overlap={overlap}: {len(chunks)} chunks, "
+                      f"embedded in {embedding['seconds']:.1f}s")
+
+                for index, options, search_settings in index_configurations(args, len(chunks)):
+                    build_seconds = 0.0
+                    if options:
+                        with timer() as build:
+                            cursor.execute(f"CREATE INDEX {TABLE}_{index} ON {TABLE} USING {options}")
+                        build_seconds = build['seconds']
+                    for name, value in search_settings.items():
+                        cursor.execute(f"SET {name} = %s", [value])
+                    setting = ', '.join(
+                        f"{name.split('.')[1]}={value}" for name, value in search_settings.items()
+                        if name.startswith(index)
+                    )
+
+                    for mode in args.modes:
+                        for k in args.k:
+                            row = {
+                                'chunk_size': chunk_size,
+                                'overlap': overlap,
+                                'chunks': len(chunks),
+                                'index': index,
+                                'search': setting,
+                                'build_s': round(build_seconds, 2),
+                                'mode': mode,
+                                'k': k,
+                            }
+                            row.update(evaluate(cursor, located, query_vectors, chunks, vectors, mode, k, args))
+                            results.append(row)
+                    if options:
+                        cursor.execute(f"DROP INDEX IF EXISTS {TABLE}_{index}")
+                cursor.execute(f"DROP TABLE {TABLE}")
+
+    print_table(results, [
+        'chunk_size', 'overlap', 'chunks', 'index', 'search', 'build_s', 'mode', 'k',
+        'recall', 'mrr', 'prompt_tokens', 'p50_ms', 'p95_ms',
+    ])
+    if args.min_recall is not None:
+        passing = [row for row in results if row['recall'] >= args.min_recall]
+        if passing:
+            best = min(passing, key=lambda row: (row['prompt_tokens'], row['p95_ms']))
+            print(f"\nCheapest configuration with recall >= {args.min_recall}: " + ', '.join(
+                f"{key}={best[key]}" for key in ('chunk_size', 'overlap', 'index', 'search', 'mode', 'k',
+                                                 'recall', 'mrr', 'prompt_tokens', 'p95_ms')
+            ))
+        else:
+            print(f"\nNo configuration reached recall {args.min_recall}")
+    if args.output:
+        write_results(args.output, 'retrieval_quality', results, vars(args))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Time and peak memory of text extraction and chunking, with a scaling check.
+
+Generates the same synthetic CV text (benchmarks.corpus) at several sizes,
+writes it as TXT, DOCX and PDF fixtures, and measures:
+
+* ``extract_text_from_txt``, ``extract_text_from_docx`` and
+  ``extract_text_from_pdf`` on the fixture files
+* ``chunk_text`` on the extracted text, with the default chunk size and
+  overlap
+
+Time is the fastest of --repeat runs; peak memory is measured with
+tracemalloc in a separate run, so its overhead doesn't count towards the
+time. tracemalloc only sees Python allocations, which is what the
+extractors and chunker make, bar lxml's parser buffers.
+
+For every target the growth exponent of time and peak memory is fitted
+over the sizes (the slope of log(value) against log(words)). Linear code
+comes out close to 1; the benchmark exits with status 1 if any exponent is
+above --max-exponent, so it can guard against quadratic regressions like
+the one chunk_text used to have. Use sizes at least a few times apart and
+large enough that fixed costs don't dominate.
+
+    python -m benchmarks.text_processing --words 10000 40000 160000 --output results/text.json
+"""
+import argparse
+import math
+import tempfile
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+from benchmarks.common import setup_django, timer, write_results, print_table
+from benchmarks.corpus import generate_corpus
+from benchmarks.docx_extraction import CONTENT_TYPES, RELATIONSHIPS, DOCUMENT_START, DOCUMENT_END, _paragraph
+
+# Filler paragraphs in benchmarks.corpus average about this many words
+WORDS_PER_PARAGRAPH = 55
+
+PDF_LINE_CHARS = 90
+PDF_LINES_PER_PAGE = 60
+
+
+def synthetic_text(words, seed=0):
+    """Synthetic CV text of roughly ``words`` words"""
+    paragraphs = max(1, round(words / WORDS_PER_PARAGRAPH))
+    return generate_corpus(1, paragraphs, seed=seed)[0].text
+
+
+def write_docx(path, text):
+    """A DOCX with one paragraph per paragraph of ``text``"""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', RELATIONSHIPS)
+        with archive.open('word/document.xml', 'w') as document_xml:
+            document_xml.write(DOCUMENT_START.encode())
+            for paragraph in text.split('\n\n'):
+                document_xml.write(_paragraph(paragraph).encode())
+            document_xml.write(DOCUMENT_END.encode())
+
+
+def _pdf_lines(text):
+    """``text`` wrapped to PDF_LINE_CHARS, with a blank line between paragraphs"""
+    for paragraph in text.split('\n\n'):
+        line = ''
+        for word in paragraph.split():
+            if line and len(line) + 1 + len(word) > PDF_LINE_CHARS:
+                yield line
+                line = word
+            else:
+                line = f'{line} {word}' if line else word
+        yield line
+        yield ''
+
+
+def _pdf_string(line):
+    return '(' + line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ')'
+
+
+def write_pdf(path, text):
+    """
+    A minimal uncompressed PDF (Helvetica, one text object per page) written
+    by hand, so no PDF library is needed to make fixtures.
+    """
+    lines = list(_pdf_lines(text))
+    pages = [lines[i:i + PDF_LINES_PER_PAGE] for i in range(0, len(lines), PDF_LINES_PER_PAGE)]
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page and its content
+    # stream for every page (4 + 2i and 5 + 2i)
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        (f'<< /Type /Pages /Count {len(pages)} /Kids ['
+         + ' '.join(f'{4 + 2 * i} 0 R' for i in range(len(pages))) + '] >>').encode(),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    for i, page in enumerate(pages):
+        objects.append((
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>'
+        ).encode())
+        stream = ('BT /F1 9 Tf 11 TL 40 760 Td\n'
+                  + '\n'.join(f'{_pdf_string(line)} Tj T*' for line in page)
+                  + '\nET').encode('latin-1', 'replace')
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+
+    with open(path, 'wb') as pdf:
+        pdf.write(b'%PDF-1.4\n')
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(pdf.tell())
+            pdf.write(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+        xref = pdf.tell()
+        pdf.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+        for offset in offsets:
+            pdf.write(b'%010d 00000 n \n' % offset)
+        pdf.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+
+
+def write_fixtures(directory, words, seed=0):
+    """The text and its TXT, DOCX and PDF fixtures for one size"""
+    text = synthetic_text(words, seed)
+    paths = {}
+    for extension, write in (('txt', None), ('docx', write_docx), ('pdf', write_pdf)):
+        path = Path(directory) / f'synthetic-{words}.{extension}'
+        if write is None:
+            path.write_text(text, encoding='utf-8')
+        else:
+            write(path, text)
+        paths[extension] = path
+    return text, paths
+
+
+def measure(function, argument, repeat):
+    """Fastest of ``repeat`` calls, then peak traced memory of one more call"""
+    seconds = []
+    for _ in range(repeat):
+        with timer() as elapsed:
+            result = function(argument)
+        seconds.append(elapsed['seconds'])
+        del result
+    tracemalloc.start()
+    try:
+        result = function(argument)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(seconds), peak, result
+
+
+def growth_exponent(sizes, values):
+    """Least-squares slope of log(value) against log(size)"""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(value, 1e-9)) for value in values]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--words', type=int, nargs='+', default=[10000, 40000, 160000],
+                        help="Fixture sizes, in words")
+    parser.add_argument('--targets', nargs='+', default=['txt', 'docx', 'pdf', 'chunk_text'],
+                        choices=['txt', 'docx', 'pdf', 'chunk_text'])
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per target and size; the fastest is kept")
+    parser.add_argument('--max-exponent', type=float, default=1.3,
+                        help="Fail if time or memory grows faster than words ** this")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results as JSON to this path")
+    args = parser.parse_args()
+    if len(set(args.words)) < 2:
+        parser.error("--words needs at least two different sizes for the scaling check")
+
+    setup_django()
+    from ai_interviewee.utils import (
+        chunk_text, extract_text_from_docx, extract_text_from_pdf, extract_text_from_txt,
+    )
+    functions = {
+        'txt': extract_text_from_txt,
+        'docx': extract_text_from_docx,
+        'pdf': extract_text_from_pdf,
+        'chunk_text': chunk_text,
+    }
+
+    results = []
+    # Unrounded measurements per target, for fitting the growth exponents
+    measurements = {target: [] for target in args.targets}
+    with tempfile.TemporaryDirectory() as directory:
+        for words in sorted(set(args.words)):
+            text, paths = write_fixtures(directory, words, args.seed)
+            for target in args.targets:
+                argument = text if target == 'chunk_text' else paths[target]
+                seconds, peak, output = measure(functions[target], argument, args.repeat)
+                measurements[target].append((words, seconds, peak))
+                results.append({
+                    'target': target,
+                    'words': words,
+                    'input_kib': round((len(text.encode()) if target == 'chunk_text'
+                                        else argument.stat().st_size) / 1024, 1),
+                    'seconds': round(seconds, 5),
+                    'words_per_s': round(words / seconds),
+                    'peak_mib': round(peak / 2 ** 20, 2),
+                    'output': len(output),
+                })
+            print(f"Measured {words} words")
+
+    failures = []
+    scaling = []
+    for target, runs in measurements.items():
+        sizes = [words for words, _, _ in runs]
+        row = {
+            'target': target,
+            'time_exponent': round(growth_exponent(sizes, [seconds for _, seconds, _ in runs]), 2),
+            'memory_exponent': round(growth_exponent(sizes, [peak for _, _, peak in runs]), 2),
+        }
+        scaling.append(row)
+        for metric in ('time_exponent', 'memory_exponent'):
+            if row[metric] > args.max_exponent:
+                failures.append(f"{target} {metric.replace('_', ' ')} {row[metric]} > {args.max_exponent}")
+
+    print_table(results, ['target', 'words', 'input_kib', 'seconds', 'words_per_s', 'peak_mib', 'output'])
+    print()
+    print_table(scaling, ['target', 'time_exponent', 'memory_exponent'])
+    if args.output:
+        write_results(args.output, 'text_processing', {'runs': results, 'scaling': scaling}, vars(args))
+        print(f"Results written to {args.output}")
+    if failures:
+        raise SystemExit("Scaling check failed: " + '; '.join(failures))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Compare vector storage layouts for chunk embeddings.
+
+Loads the same vectors into temporary tables stored as:
+
+* ``vector(1536)``  - the current full-precision schema
+* ``halfvec(1536)`` - half precision at full size
+* ``halfvec(512)``  - shortened and half precision (EMBEDDING_STORAGE='compact')
+
+and reports, for each, the table and HNSW index size, index build time, query
+latency percentiles and recall@5 against exact full-precision search.
+
+Shortened vectors are the first 512 dimensions re-normalized, which matches
+what the API returns for ``dimensions=512`` with text-embedding-3 models. Use
+``--source chunks`` to benchmark real stored embeddings; synthetic vectors are
+not trained for shortening, so their 512-dimension recall is pessimistic.
+
+    python -m benchmarks.vector_storage --rows 20000 --queries 200 --output storage.json
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import (
+    setup_django, timer, latency_summary, recall_at_k, perturb, shorten,
+    load_vectors, copy_vectors, vector_literal, write_results, print_table,
+)
+
+VARIANTS = [
+    # name, type, dimensions, operator class
+    ('vector_1536', 'vector', 1536, 'vector_l2_ops'),
+    ('halfvec_1536', 'halfvec', 1536, 'halfvec_l2_ops'),
+    ('halfvec_512', 'halfvec', 512, 'halfvec_l2_ops'),
+]
+K = 5
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--source', choices=['synthetic', 'chunks'], default='synthetic')
+    parser.add_argument('--m', type=int, default=16, help="HNSW m")
+    parser.add_argument('--ef-construction', type=int, default=64)
+    parser.add_argument('--ef-search', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    rng = random.Random(args.seed)
+    vectors = load_vectors(args.source, args.rows, args.seed)
+    queries = [perturb(rng.choice(vectors), rng=rng) for _ in range(args.queries)]
+    print(f"Loaded {len(vectors)} vectors and {len(queries)} queries ({args.source})")
+
+    connection.ensure_connection()
+    raw = connection.connection
+    results = []
+    with connection.cursor() as cursor:
+        for name, column_type, dimensions, opclass in VARIANTS:
+            table = f"bench_{name}"
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(f"CREATE TEMP TABLE {table} (id integer PRIMARY KEY, embedding {column_type}({dimensions}))")
+            copy_vectors(raw, table, vectors, dimensions)
+            cursor.execute(f"ANALYZE {table}")
+
+        # Exact ground truth on the full-precision table
+        cursor.execute("SET enable_indexscan = off")
+        ground_truth = []
+        for query in queries:
+            cursor.execute(
+                f"SELECT id FROM bench_vector_1536 ORDER BY embedding <-> %s::vector LIMIT {K}",
+                [vector_literal(query)],
+            )
+            ground_truth.append([row[0] for row in cursor.fetchall()])
+        cursor.execute("RESET enable_indexscan")
+
+        cursor.execute("SET hnsw.ef_search = %s", [args.ef_search])
+        for name, column_type, dimensions, opclass in VARIANTS:
+            table = f"bench_{name}"
+            with timer() as build:
+                cursor.execute(
+                    f"CREATE INDEX {table}_hnsw ON {table} USING hnsw (embedding {opclass}) "
+                    f"WITH (m = {args.m}, ef_construction = {args.ef_construction})"
+                )
+            cursor.execute(
+                "SELECT pg_relation_size(%s), pg_relation_size(%s)",
+                [table, f"{table}_hnsw"],
+            )
+            table_bytes, index_bytes = cursor.fetchone()
+
+            latencies = []
+            recalls = []
+            for query, expected in zip(queries, ground_truth):
+                literal = vector_literal(shorten(query, dimensions))
+                start = time.perf_counter()
+                cursor.execute(
+                    f"SELECT id FROM {table} ORDER BY embedding <-> %s::{column_type}({dimensions}) LIMIT {K}",
+                    [literal],
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                latencies.append(time.perf_counter() - start)
+                recalls.append(recall_at_k(expected, ids, K))
+
+            latency = latency_summary(latencies)
+            results.append({
+                'variant': name,
+                'table_mb': round(table_bytes / 2 ** 20, 2),
+                'index_mb': round(index_bytes / 2 ** 20, 2),
+                'build_s': round(build['seconds'], 2),
+                'p50_ms': latency['p50_ms'],
+                'p95_ms': latency['p95_ms'],
+                f'recall@{K}': round(sum(recalls) / len(recalls), 4),
+            })
+            cursor.execute(f"DROP TABLE {table}")
+
+    print_table(results, list(results[0].keys()))
+    if args.output:
+        write_results(args.output, 'vector_storage', results, vars(args))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+import openai
+from ai_interviewee.services import AsyncEmbeddingExecutor, EmbeddingDeferred, EmbeddingFailed
+
+
+def _response(embeddings):
+    return MagicMock(data=[MagicMock(index=i, embedding=e) for i, e in enumerate(embeddings)])
+
+@pytest.fixture
+def rate_limiter():
+    limiter = MagicMock()
+    limiter.acquire_batch.side_effect = lambda texts: (min(2, len(texts)), 0.0)
+    limiter.acquire.return_value = 0.0
+    return limiter
+
+@pytest.fixture
+def mock_async_client():
+    """Patch the async OpenAI client used by the executor."""
+    with patch('openai.AsyncOpenAI') as mock_client_class:
+        client = mock_client_class.return_value
+        client.__aenter__.return_value = client
+        client.embeddings.create = AsyncMock()
+        yield client
+
+def test_embed_sends_batches_and_keeps_input_order(rate_limiter, mock_async_client):
+    mock_async_client.embeddings.create.side_effect = lambda input, model: _response(
+        [[float(text[-1])] for text in input]
+    )
+    executor = AsyncEmbeddingExecutor(api_key='test-key', max_concurrency=2, rate_limiter=rate_limiter)
+
+    embeddings = executor.embed(["text 1", "text 2", "text 3"])
+
+    assert embeddings == [[1.0], [2.0], [3.0]]
+    assert mock_async_client.embeddings.create.await_count == 2
+
+def test_embed_defers_batches_that_would_wait_too_long(rate_limiter, mock_async_client):
+    rate_limiter.acquire_batch.side_effect = [(1, 0.0), (0, 60.0)]
+    mock_async_client.embeddings.create.return_value = _response([[0.5]])
+    executor = AsyncEmbeddingExecutor(api_key='test-key', max_wait=10, rate_limiter=rate_limiter)
+
+    with pytest.raises(EmbeddingDeferred) as excinfo:
+        executor.embed(["short", "a much longer text"])
+
+    assert excinfo.value.wait == 60.0
+    assert excinfo.value.embeddings == [[0.5], None]
+
+def test_batches_are_sized_as_budget_is_taken(rate_limiter, mock_async_client):
+    # Budget is short at first and recovers, so later batches grow again
+    rate_limiter.acquire_batch.side_effect = [(1, 0.0), (0, 0.01), (3, 0.0)]
+    mock_async_client.embeddings.create.side_effect = lambda input, model: _response(
+        [[float(text[-1])] for text in input]
+    )
+    executor = AsyncEmbeddingExecutor(api_key='test-key', max_concurrency=1, rate_limiter=rate_limiter)
+
+    embeddings = executor.embed(["text 1", "text 2", "text 3", "text 4"])
+
+    assert embeddings == [[1.0], [2.0], [3.0], [4.0]]
+    assert [call.kwargs['input'] for call in mock_async_client.embeddings.create.call_args_list] == [
+        ["text 1"], ["text 2", "text 3", "text 4"],
+    ]
+    rate_limiter.acquire.assert_not_called()
+
+def test_failed_request_keeps_the_batches_that_finished(rate_limiter, mock_async_client):
+    error = openai.APIConnectionError(request=MagicMock())
+    mock_async_client.embeddings.create.side_effect = [_response([[1.0], [2.0]]), error]
+    executor = AsyncEmbeddingExecutor(api_key='test-key', max_concurrency=1, rate_limiter=rate_limiter)
+
+    with pytest.raises(EmbeddingFailed) as excinfo:
+        executor.embed(["text 1", "text 2", "text 3"])
+
+    assert excinfo.value.error is error
+    assert excinfo.value.embeddings == [[1.0], [2.0], None]
+
+def test_rate_limit_error_blocks_all_workers(rate_limiter, mock_async_client):
+    error = openai.RateLimitError(
+        "Rate limited", response=MagicMock(status_code=429, headers={'retry-after': '30'}), body=None
+    )
+    mock_async_client.embeddings.create.side_effect = error
+    executor = AsyncEmbeddingExecutor(api_key='test-key', max_wait=10, rate_limiter=rate_limiter)
+
+    with pytest.raises(EmbeddingDeferred) as excinfo:
+        executor.embed(["text"])
+
+    rate_limiter.block_for.assert_called_once_with(30.0)
+    assert excinfo.value.wait == 30.0
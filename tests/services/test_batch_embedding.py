@@ -0,0 +1,105 @@
+import json
+from unittest.mock import patch
+import pytest
+from ai_interviewee.fake_openai import FakeOpenAIServer, fake_embedding
+from ai_interviewee.models import Document, DocumentChunk, EmbeddingSpace
+from ai_interviewee.services.batch_embedding import (
+    BatchEmbeddingJob, OpenAIBatchClient, iter_result_embeddings, write_request_files,
+)
+
+
+@pytest.fixture
+def server():
+    with FakeOpenAIServer(dimensions=8) as fake_server:
+        yield fake_server
+
+
+def test_write_request_files_splits_requests_and_files(tmp_path):
+    chunks = [('c1', 'alpha'), ('c2', 'beta'), ('c3', 'alpha'), ('c4', 'gamma'), ('c5', 'delta')]
+
+    parts = write_request_files(chunks, tmp_path, 'text-embedding-3-small', dimensions=512,
+                                inputs_per_request=2, max_inputs=3)
+
+    assert parts == [
+        {'name': 'part-0001', 'requests': 2, 'inputs': 3, 'chunks': 4},
+        {'name': 'part-0002', 'requests': 1, 'inputs': 1, 'chunks': 1},
+    ]
+    requests = [json.loads(line) for line in (tmp_path / 'part-0001.jsonl').read_text().splitlines()]
+    assert [request['body']['input'] for request in requests] == [['alpha', 'beta'], ['gamma']]
+    assert requests[0]['url'] == '/v1/embeddings'
+    assert requests[0]['body']['dimensions'] == 512
+    assert json.loads((tmp_path / 'part-0001.ids.json').read_text()) == {
+        'part-0001-00000': [['c1', 'c3'], ['c2']],
+        'part-0001-00001': [['c4']],
+    }
+
+
+def test_iter_result_embeddings_pairs_inputs_and_failures():
+    ids_map = {'ok': [['c1'], ['c2', 'c3']], 'bad': [['c4']]}
+    records = [
+        {'custom_id': 'ok', 'error': None, 'response': {'status_code': 200, 'body': {'data': [
+            {'index': 1, 'embedding': [0.0, 1.0]},
+            {'index': 0, 'embedding': [1.0, 0.0]},
+        ]}}},
+        {'custom_id': 'bad', 'error': None, 'response': {'status_code': 400, 'body': {}}},
+        {'custom_id': 'unknown', 'error': None, 'response': {'status_code': 200}},
+    ]
+
+    assert list(iter_result_embeddings(records, ids_map)) == [
+        (['c1'], [1.0, 0.0]),
+        (['c2', 'c3'], [0.0, 1.0]),
+        (['c4'], None),
+    ]
+
+
+def test_batch_client_round_trip(server, tmp_path):
+    write_request_files([('c1', 'alpha'), ('c2', 'beta')], tmp_path, 'text-embedding-3-small')
+    client = OpenAIBatchClient(api_key='test-key', base_url=server.base_url)
+
+    batch_id = client.submit(tmp_path / 'part-0001.jsonl')
+    assert client.status(batch_id).status == 'in_progress'
+    status = client.status(batch_id)
+    assert status.status == 'completed' and status.error_file_id is None
+
+    records = list(client.results(status.output_file_id))
+    assert [record['custom_id'] for record in records] == ['part-0001-00000']
+    assert records[0]['response']['body']['data'][1]['embedding'] == fake_embedding('beta', 8)
+
+
+@pytest.mark.django_db
+def test_job_backfills_missing_embeddings(tmp_path, settings):
+    from django.contrib.auth import get_user_model
+    user = get_user_model().objects.create_user(username='batch', password='testpass')
+    document = Document.objects.create(owner=user, title='CV')
+    for index, content in enumerate(['alpha', 'beta', 'alpha', 'gamma']):
+        DocumentChunk.objects.create(document=document, content=content, chunk_index=index)
+    settings.OPENAI_EMBEDDING_BATCH_SIZE = 2
+
+    with FakeOpenAIServer(dimensions=1536, failing_requests={'part-0001-00001'}) as server:
+        job = BatchEmbeddingJob(tmp_path, client=OpenAIBatchClient('test-key', server.base_url))
+        parts = job.prepare()
+        assert parts[0]['inputs'] == 3 and parts[0]['chunks'] == 4
+        job.submit()
+
+        job.poll()
+        assert job.apply() == {'embedded': 0, 'failed': 0}
+        job.poll()
+        assert job.apply() == {'embedded': 3, 'failed': 1}
+
+    assert job.finished
+    resumed = BatchEmbeddingJob(tmp_path, client=object())
+    assert resumed.finished and resumed.parts[0]['embedded'] == 3
+    chunks = {chunk.content: chunk for chunk in DocumentChunk.objects.filter(document=document)}
+    assert chunks['alpha'].embedding[0] == pytest.approx(fake_embedding('alpha', 1536)[0], abs=1e-6)
+    assert chunks['alpha'].embedding_model == 'text-embedding-3-small'
+    assert chunks['gamma'].embedding is None
+
+
+@patch('ai_interviewee.services.batch_embedding.EmbeddingMigration.active_space',
+       return_value=EmbeddingSpace('feature-hashing', 1, 'hashing'))
+def test_job_refuses_spaces_of_other_providers(mock_active_space, tmp_path):
+    job = BatchEmbeddingJob(tmp_path, client=OpenAIBatchClient('test-key'))
+
+    with pytest.raises(ValueError, match='needs the openai provider'):
+        job.prepare()
+    assert not (tmp_path / BatchEmbeddingJob.STATE_FILE).exists()
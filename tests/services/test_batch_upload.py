@@ -0,0 +1,100 @@
+import hashlib
+import io
+import zipfile
+import pytest
+from unittest.mock import MagicMock
+from django.core.files.storage import InMemoryStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ai_interviewee.services import BatchUpload
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+def _archive(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for name, content in entries.items():
+            zip_file.writestr(name, content)
+    return SimpleUploadedFile('onboarding.zip', buffer.getvalue(), content_type='application/zip')
+
+
+def test_archive_entries_are_streamed_to_storage(media_root):
+    cv = b'%PDF-1.7 curriculum vitae'
+    upload = BatchUpload(MagicMock())
+    upload.add_file(_archive({
+        'candidate/cv.pdf': cv,
+        'candidate/projects/search.txt': b'Built a search engine.',
+        'candidate/photo.png': b'\x89PNG',
+        '__MACOSX/candidate/._cv.pdf': b'resource fork',
+    }), {})
+
+    assert [fields['title'] for fields in upload.staged] == ['cv', 'search']
+    cv_fields = upload.staged[0]
+    assert cv_fields['mime_type'] == 'application/pdf'
+    assert cv_fields['file_size'] == len(cv)
+    assert cv_fields['content_hash'] == hashlib.sha256(cv).hexdigest()
+    assert cv_fields['file'].startswith('documents/')
+    assert (media_root / cv_fields['file']).read_bytes() == cv
+    assert upload.skipped == [{'file': 'candidate/photo.png', 'reason': 'unsupported file type'}]
+
+
+def test_oversize_entries_are_skipped(media_root):
+    upload = BatchUpload(MagicMock(), max_file_size=10)
+    upload.add_file(_archive({'small.txt': b'short', 'large.txt': b'x' * 11}), {})
+
+    assert [fields['title'] for fields in upload.staged] == ['small']
+    assert upload.skipped[0]['file'] == 'large.txt'
+
+
+def test_plain_files_keep_their_upload_metadata(media_root):
+    upload = BatchUpload(MagicMock())
+    metadata = {'file_size': 5, 'mime_type': 'text/plain', 'content_hash': 'a' * 64}
+    upload.add_file(SimpleUploadedFile('notes.txt', b'notes'), metadata)
+
+    assert upload.staged[0]['content_hash'] == 'a' * 64
+    assert upload.staged[0]['title'] == 'notes'
+
+
+def test_too_many_files_rejects_the_batch(media_root):
+    upload = BatchUpload(MagicMock(), max_files=1)
+    with pytest.raises(ValueError, match='at most 1'):
+        upload.add_file(_archive({'a.txt': b'a', 'b.txt': b'b'}), {})
+
+    upload.discard()
+    assert not list(media_root.rglob('*.txt'))
+
+
+def test_invalid_archive(media_root):
+    with pytest.raises(ValueError, match='not a valid ZIP'):
+        BatchUpload(MagicMock()).add_file(SimpleUploadedFile('broken.zip', b'not a zip'), {})
+
+
+def test_create_requires_a_document():
+    with pytest.raises(ValueError, match='no supported documents'):
+        BatchUpload(MagicMock()).create()
+
+
+class SeekingStorage(InMemoryStorage):
+    """In-memory storage that, like S3Storage, rewinds seekable content before uploading"""
+
+    def _save(self, name, content):
+        if content.seekable():
+            content.seek(0)
+        return super()._save(name, content)
+
+
+def test_archive_entries_stream_to_non_filesystem_storage(monkeypatch):
+    from ai_interviewee.models import Document
+    storage = SeekingStorage()
+    monkeypatch.setattr(Document._meta.get_field('file'), 'storage', storage)
+    upload = BatchUpload(MagicMock())
+    upload.add_file(_archive({'cv.txt': b'Built a search engine.'}), {})
+
+    staged = upload.staged[0]
+    assert staged['file_size'] == 22
+    with storage.open(staged['file']) as stored:
+        assert stored.read() == b'Built a search engine.'
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import pytest
+from unittest.mock import MagicMock
+from ai_interviewee.models import Document, DocumentChunk
+from ai_interviewee.services.bulk_ingestion import (
+    BulkIngestor, IngestionCheckpoint, IngestionEntry,
+    entries_from_directory, entries_from_manifest, prepare_file,
+)
+
+
+def test_entries_from_directory_finds_supported_files(tmp_path):
+    (tmp_path / 'projects').mkdir()
+    (tmp_path / 'cv.pdf').write_bytes(b'%PDF')
+    (tmp_path / 'projects' / 'search.txt').write_text('search')
+    (tmp_path / 'photo.png').write_bytes(b'png')
+    (tmp_path / '.notes.txt').write_text('hidden')
+
+    entries = list(entries_from_directory(tmp_path, 'jane', document_type='cv'))
+
+    assert [entry.path for entry in entries] == [str(tmp_path / 'cv.pdf'), str(tmp_path / 'projects' / 'search.txt')]
+    assert {entry.document_type for entry in entries} == {'cv'}
+
+
+def test_entries_from_csv_and_jsonl_manifests(tmp_path):
+    (tmp_path / 'manifest.csv').write_text(
+        'path,owner,document_type,tags,is_public\n'
+        'files/cv.pdf,jane@example.com,cv,python;django,false\n'
+    )
+    (tmp_path / 'manifest.jsonl').write_text(
+        json.dumps({'path': '/data/cv.pdf', 'owner': 7, 'tags': ['python']}) + '\n\n'
+    )
+
+    assert list(entries_from_manifest(tmp_path / 'manifest.csv')) == [IngestionEntry(
+        path=str(tmp_path / 'files' / 'cv.pdf'), owner='jane@example.com',
+        document_type='cv', tags=('python', 'django'), is_public=False,
+    )]
+    assert list(entries_from_manifest(tmp_path / 'manifest.jsonl')) == [
+        IngestionEntry(path='/data/cv.pdf', owner='7', tags=('python',)),
+    ]
+
+
+def test_manifest_is_public_defaults_when_empty_and_rejects_unknown_values(tmp_path):
+    (tmp_path / 'manifest.csv').write_text(
+        'path,owner,is_public\n'
+        'a.pdf,jane,\n'
+        'b.pdf,jane,No\n'
+        'c.pdf,jane,1\n'
+    )
+    assert [entry.is_public for entry in entries_from_manifest(tmp_path / 'manifest.csv')] == [True, False, True]
+
+    (tmp_path / 'manifest.csv').write_text('path,owner,is_public\na.pdf,jane,private\n')
+    with pytest.raises(ValueError, match="row 1 has an unknown is_public value 'private'"):
+        list(entries_from_manifest(tmp_path / 'manifest.csv'))
+
+
+def test_manifest_rows_need_path_and_owner(tmp_path):
+    (tmp_path / 'manifest.jsonl').write_text(json.dumps({'path': 'cv.pdf'}))
+    with pytest.raises(ValueError, match='row 1'):
+        list(entries_from_manifest(tmp_path / 'manifest.jsonl'))
+
+
+def test_prepare_file_chunks_and_fingerprints(tmp_path):
+    path = tmp_path / 'cv.txt'
+    path.write_bytes(b'Ten years of Python and Django.')
+
+    prepared = prepare_file(str(path))
+
+    assert prepared['content_hash'] == hashlib.sha256(path.read_bytes()).hexdigest()
+    assert prepared['mime_type'] == 'text/plain'
+    assert [chunk['content'] for chunk in prepared['chunks']] == ['Ten years of Python and Django.']
+    assert len(prepared['chunks'][0]['lsh_bands']) == 16
+
+
+def test_prepare_file_reports_errors(tmp_path):
+    path = tmp_path / 'empty.txt'
+    path.write_bytes(b'   ')
+    assert prepare_file(str(path)) == {'path': str(path), 'error': 'ValueError: No text content could be extracted'}
+
+
+def test_checkpoint_resumes_and_guards_its_source(tmp_path):
+    path = tmp_path / 'run.json'
+    checkpoint = IngestionCheckpoint(path, '/data')
+    checkpoint.record(failed={'/data/b.pdf': 'broken'})
+    checkpoint.record(done=['/data/a.pdf', '/data/b.pdf'])
+
+    resumed = IngestionCheckpoint(path, '/data')
+    assert resumed.done == {'/data/a.pdf', '/data/b.pdf'}
+    assert resumed.failed == {}
+    with pytest.raises(ValueError, match='belongs to /data'):
+        IngestionCheckpoint(path, '/other')
+
+
+@pytest.mark.django_db
+def test_write_batch_bulk_inserts_embedded_documents(tmp_path, settings):
+    from django.contrib.auth import get_user_model
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    user = get_user_model().objects.create_user(username='bulk', password='testpass')
+    path = tmp_path / 'cv.txt'
+    path.write_bytes(b'Ten years of Python and Django.')
+    entry = IngestionEntry(path=str(path), owner='bulk', tags=('python',))
+    executor = MagicMock()
+    executor.embed.side_effect = lambda texts: [[1.0] + [0.0] * 1535 for _ in texts]
+
+    ingestor = BulkIngestor(embedding_provider=executor)
+    stats = ingestor.write_batch([(entry, user.id, prepare_file(str(path)))])
+    again = ingestor.write_batch([(entry, user.id, prepare_file(str(path)))])
+
+    assert stats['documents'] == 1 and stats['chunks'] == 1
+    assert again == {'documents': 0, 'chunks': 0, 'tokens': 0, 'skipped': 1}
+    document = Document.objects.get(owner=user)
+    assert document.processing_status == 'completed'
+    assert document.tags == ['python']
+    assert DocumentChunk.objects.get(document=document).embedding is not None
+    executor.embed.assert_called_once_with(['Ten years of Python and Django.'])
@@ -0,0 +1,115 @@
+import struct
+import uuid
+from datetime import datetime, timezone
+import pytest
+from ai_interviewee.models import Document, DocumentChunk, EmbeddingSpace
+from ai_interviewee.services.chunk_transfer import BinaryCopyStream, ChunkExporter, ChunkImporter
+from ai_interviewee.utils import vector_to_list
+
+
+def _fields(*names):
+    return [DocumentChunk._meta.get_field(name) for name in names]
+
+
+def test_binary_copy_stream_encodes_rows():
+    chunk_id = uuid.uuid4()
+    stream = BinaryCopyStream(
+        _fields('id', 'chunk_index', 'page_number', 'minhash', 'metadata', 'created_at', 'embedding'),
+        [(chunk_id, 3, None, [1, -2], {'a': 1}, '2000-01-01T00:00:01+00:00', [1.0, 0.0])],
+    )
+    data = stream.read()
+
+    assert data.startswith(b'PGCOPY\n\xff\r\n\x00' + b'\x00' * 8)
+    assert data.endswith(b'\xff\xff')
+    row = data[19:-2]
+    assert row[:2] == struct.pack('>h', 7)
+    assert row[2:22] == struct.pack('>i', 16) + chunk_id.bytes
+    assert row[22:30] == struct.pack('>ii', 4, 3)
+    assert row[30:34] == struct.pack('>i', -1)
+    array = struct.pack('>iiiii', 1, 0, 20, 2, 1) + struct.pack('>iqiq', 8, 1, 8, -2)
+    assert row[34:38 + len(array)] == struct.pack('>i', len(array)) + array
+    rest = row[38 + len(array):]
+    assert rest[:13] == struct.pack('>i', 9) + b'\x01{"a": 1}'
+    assert rest[13:25] == struct.pack('>iq', 8, 1_000_000)
+    assert rest[25:] == struct.pack('>iHHff', 12, 2, 0, 1.0, 0.0)
+    assert stream.count == 1
+
+
+def test_binary_copy_stream_small_reads_match_one_read():
+    rows = [(uuid.UUID(int=i), i, None, [i], {}, datetime(2024, 1, 1, tzinfo=timezone.utc), [0.5] * 4) for i in range(50)]
+    fields = _fields('id', 'chunk_index', 'page_number', 'minhash', 'metadata', 'created_at', 'embedding')
+    progress = []
+    whole = BinaryCopyStream(fields, rows).read()
+
+    stream = BinaryCopyStream(fields, rows, progress=progress.append, progress_every=20)
+    pieces = []
+    while piece := stream.read(64):
+        pieces.append(piece)
+
+    assert b''.join(pieces) == whole
+    assert progress == [20, 40]
+
+
+@pytest.mark.django_db
+def test_export_then_import_into_another_owner(tmp_path):
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+    source = User.objects.create_user(username='source', password='testpass')
+    target = User.objects.create_user(username='target', password='testpass')
+    document = Document.objects.create(owner=source, title='CV', tags=['python'])
+    first = DocumentChunk.objects.create(document=document, content='first', content_hash='a' * 64, chunk_index=0,
+                                         minhash=[1, 2], lsh_bands=[3])
+    first.set_embedding([1.0] + [0.0] * 1535, EmbeddingSpace('text-embedding-3-small', 1))
+    first.save()
+    DocumentChunk.objects.create(document=document, content='second', content_hash='b' * 64, chunk_index=1,
+                                 duplicate_of=first)
+
+    manifest = ChunkExporter(tmp_path).export(Document.objects.filter(owner=source))
+    assert manifest['chunks'] == 2 and manifest['embedded_chunks'] == 1
+
+    counts = ChunkImporter(tmp_path, owner_id=target.id, replace=True).run()
+
+    assert counts == {'documents': 1, 'chunks': 2}
+    imported = Document.objects.get(id=document.id)
+    assert imported.owner_id == target.id
+    assert imported.uploaded_at == document.uploaded_at
+    chunks = list(DocumentChunk.objects.filter(document=imported).order_by('chunk_index'))
+    assert chunks[0].embedding[0] == pytest.approx(1.0)
+    assert chunks[1].embedding is None
+    assert chunks[1].duplicate_of_id == first.id
+
+
+@pytest.mark.django_db
+def test_export_then_import_compact_embeddings(tmp_path, settings):
+    from django.contrib.auth import get_user_model
+    settings.EMBEDDING_STORAGE = 'compact'
+    owner = get_user_model().objects.create_user(username='owner', password='testpass')
+    document = Document.objects.create(owner=owner, title='CV')
+    chunk = DocumentChunk.objects.create(document=document, content='first', content_hash='a' * 64, chunk_index=0)
+    chunk.set_embedding([0.6, 0.8] + [0.0] * 510, EmbeddingSpace('text-embedding-3-small', 1))
+    chunk.save()
+
+    manifest = ChunkExporter(tmp_path).export(Document.objects.all())
+    assert manifest['vector_field'] == 'compact_embedding' and manifest['embedded_chunks'] == 1
+
+    # Verification compares the stored half vectors with the export
+    counts = ChunkImporter(tmp_path, replace=True).run()
+
+    assert counts == {'documents': 1, 'chunks': 1}
+    imported = DocumentChunk.objects.get(id=chunk.id)
+    assert vector_to_list(imported.compact_embedding)[:2] == pytest.approx([0.6, 0.8], abs=1e-3)
+
+
+def test_import_rejects_corrupt_exports(tmp_path):
+    import json
+    (tmp_path / 'manifest.json').write_text(json.dumps({
+        'format_version': 1, 'vector_field': 'embedding', 'dimensions': 1536,
+        'chunk_columns': [field.attname for field in DocumentChunk._meta.concrete_fields
+                          if field.name not in {'embedding', 'compact_embedding', 'next_embedding',
+                                                'next_embedding_model', 'next_embedding_version'}],
+        'sha256': {'chunks.jsonl': '0' * 64},
+    }))
+    (tmp_path / 'chunks.jsonl').write_text('{}\n')
+
+    with pytest.raises(ValueError, match='chunks.jsonl is corrupt'):
+        ChunkImporter(tmp_path).load_manifest()
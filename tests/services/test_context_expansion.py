@@ -0,0 +1,83 @@
+import uuid
+from unittest.mock import patch
+from ai_interviewee.models import DocumentChunk
+from ai_interviewee.services.context_expansion import ContextExpander, merge_chunks
+
+DOCUMENT = uuid.uuid4()
+OTHER_DOCUMENT = uuid.uuid4()
+WORDS = "one two three four five six seven eight nine ten eleven twelve".split()
+
+
+def _chunk(index, document_id=DOCUMENT, size=4, step=3):
+    """Chunk ``index`` of WORDS in windows of 4 words that overlap by 1"""
+    words = WORDS[index * step:index * step + size]
+    start_char = len(' '.join(WORDS[:index * step])) + (1 if index else 0)
+    content = ' '.join(words)
+    return DocumentChunk(
+        document_id=document_id,
+        chunk_index=index,
+        content=content,
+        start_char=start_char,
+        end_char=start_char + len(content),
+    )
+
+
+def test_merge_chunks_writes_the_overlap_once():
+    assert merge_chunks([_chunk(0), _chunk(1), _chunk(2)]) == [
+        "one two three four five six seven eight nine ten"
+    ]
+
+
+def test_merge_chunks_splits_on_gaps():
+    assert merge_chunks([_chunk(0), _chunk(2)]) == ["one two three four", "seven eight nine ten"]
+
+
+def test_spans_merge_windows_and_keep_rank_order():
+    hits = [_chunk(3), _chunk(0, OTHER_DOCUMENT), _chunk(1)]
+
+    spans = ContextExpander(neighbors=1, token_budget=1000).spans(hits)
+
+    assert [(document_id, start, end) for document_id, start, end, _ in spans] == [
+        (DOCUMENT, 0, 4),
+        (OTHER_DOCUMENT, 0, 1),
+    ]
+    assert [hit.chunk_index for hit in spans[0][3]] == [1, 3]
+
+
+@patch('ai_interviewee.services.context_expansion.DocumentChunk.objects')
+def test_expand_fetches_neighbors_in_one_query(mock_objects):
+    mock_objects.filter.return_value.only.return_value.order_by.return_value = [
+        _chunk(0), _chunk(1), _chunk(2),
+    ]
+
+    context = ContextExpander(neighbors=1, token_budget=1000).expand([_chunk(1)])
+
+    mock_objects.filter.assert_called_once()
+    assert context == ["one two three four five six seven eight nine ten"]
+
+
+@patch('ai_interviewee.services.context_expansion.DocumentChunk.objects')
+def test_expand_falls_back_to_hits_when_over_budget(mock_objects):
+    mock_objects.filter.return_value.only.return_value.order_by.return_value = [
+        _chunk(0), _chunk(1), _chunk(2),
+    ]
+
+    # Room for the hit (5 tokens) but not for its neighbours
+    context = ContextExpander(neighbors=1, token_budget=6).expand([_chunk(1)])
+
+    assert context == ["four five six seven"]
+
+
+def test_expand_without_neighbors_does_not_query():
+    with patch('ai_interviewee.services.context_expansion.DocumentChunk.objects') as mock_objects:
+        context = ContextExpander(neighbors=0, token_budget=1).expand([_chunk(2), _chunk(1), _chunk(0)])
+
+    mock_objects.filter.assert_not_called()
+    # Not merged, trimmed, re-ordered or cut to the budget
+    assert context == ["seven eight nine ten", "four five six seven", "one two three four"]
+
+
+def test_spans_without_neighbors_keep_adjacent_hits_apart():
+    spans = ContextExpander(neighbors=0).spans([_chunk(1), _chunk(2)])
+
+    assert [(start, end) for _, start, end, _ in spans] == [(1, 1), (2, 2)]
@@ -0,0 +1,80 @@
+import math
+import pytest
+from ai_interviewee.fake_openai import FakeOpenAIServer, fake_embedding
+from ai_interviewee.models import EmbeddingMigration, EmbeddingSpace
+from ai_interviewee.services import HashingEmbeddingProvider, get_embedding_provider, get_space_embedding_provider
+from ai_interviewee.services.embedding_providers import FakeServerEmbeddingProvider, OpenAIEmbeddingProvider
+
+
+def _dot(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_hashing_provider_is_deterministic_and_unit_length():
+    provider = HashingEmbeddingProvider(dimensions=256)
+
+    first, again = provider.embed(["Built search with Postgres", "Built search with Postgres"])
+
+    assert len(first) == 256
+    assert first == again
+    assert math.sqrt(sum(x * x for x in first)) == pytest.approx(1.0)
+    assert provider.embed_query("!!!") is not None
+    assert provider.embed_query("   ") is None
+
+
+def test_hashing_provider_scores_shared_vocabulary_higher():
+    provider = HashingEmbeddingProvider()
+    query, related, unrelated = provider.embed([
+        "vector search in postgres",
+        "I built vector search on Postgres with pgvector",
+        "Managed a team of five designers",
+    ])
+
+    assert len(query) == 1536
+    assert _dot(query, related) > _dot(query, unrelated)
+
+
+def test_hashing_provider_rejects_empty_text():
+    with pytest.raises(ValueError):
+        HashingEmbeddingProvider().embed(["text", " "])
+
+
+def test_get_embedding_provider_uses_settings(settings):
+    settings.EMBEDDING_PROVIDER = 'hashing'
+    assert isinstance(get_embedding_provider(dimensions=8), HashingEmbeddingProvider)
+    assert isinstance(get_embedding_provider('openai', api_key='test-key'), OpenAIEmbeddingProvider)
+
+    with pytest.raises(ValueError, match="Unknown embedding provider 'missing'"):
+        get_embedding_provider('missing')
+
+
+def test_fake_server_provider_goes_through_the_http_client(settings):
+    with FakeOpenAIServer() as server:
+        settings.FAKE_OPENAI_BASE_URL = server.base_url
+        provider = FakeServerEmbeddingProvider(dimensions=16)
+
+        embeddings = provider.embed(["alpha", "beta"])
+        query = provider.embed_query("alpha")
+
+    assert provider.model == 'fake-embedding'
+    assert embeddings == [fake_embedding("alpha", 16), fake_embedding("beta", 16)]
+    assert query == embeddings[0]
+    assert server.requests.count('POST /v1/embeddings') == 2
+
+
+@pytest.mark.django_db
+def test_active_space_follows_the_configured_provider(settings):
+    settings.EMBEDDING_PROVIDER = 'hashing'
+    assert EmbeddingMigration.active_space() == EmbeddingSpace('feature-hashing', 1, 'hashing')
+
+
+def test_space_provider_comes_from_the_space(settings):
+    settings.EMBEDDING_PROVIDER = 'openai'
+    provider = get_space_embedding_provider(EmbeddingSpace('feature-hashing', 1, 'hashing'), dimensions=8)
+    assert isinstance(provider, HashingEmbeddingProvider)
+    assert (provider.model, provider.dimensions) == ('feature-hashing', 8)
+
+    # Spaces recorded without a provider use the configured one
+    settings.EMBEDDING_PROVIDER = 'hashing'
+    provider = get_space_embedding_provider(EmbeddingSpace('feature-hashing', 1))
+    assert isinstance(provider, HashingEmbeddingProvider)
@@ -0,0 +1,200 @@
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from ai_interviewee.services import IngestionScheduler
+
+
+@pytest.fixture
+def scheduler():
+    """A scheduler with a mocked Redis connection and scripts."""
+    scheduler = IngestionScheduler(redis_client=MagicMock())
+    scheduler._submit = MagicMock()
+    scheduler._dispatch = MagicMock()
+    scheduler._release = MagicMock()
+    return scheduler
+
+def test_submit_without_redis_dispatches_immediately():
+    """Without Redis, uploads go straight to the extraction queue."""
+    document = MagicMock(id='doc-1', owner_id=1)
+    with patch('ai_interviewee.services.ingestion_scheduler.get_redis_connection', return_value=None), \
+            patch('ai_interviewee.tasks.process_document_task.delay') as mock_delay:
+        IngestionScheduler().submit(document)
+    mock_delay.assert_called_once_with('doc-1')
+
+@patch('ai_interviewee.tasks.process_document_task.delay')
+def test_submit_queues_by_owner_and_size(mock_delay, scheduler):
+    document = MagicMock(id='doc-1', owner_id=7, file_size=2048)
+    scheduler._dispatch.return_value = None
+
+    scheduler.submit(document)
+
+    scheduler._submit.assert_called_once_with(args=['ingestion', 7, 'doc-1', 2048])
+    mock_delay.assert_not_called()
+
+@patch('ai_interviewee.tasks.dispatch_documents_task.apply_async')
+@patch('ai_interviewee.tasks.process_document_task.delay')
+def test_dispatch_sends_documents_until_caps_are_reached(mock_delay, mock_redispatch, settings):
+    settings.INGESTION_LEASE_SECONDS = 600
+    scheduler = IngestionScheduler(redis_client=MagicMock())
+    scheduler._dispatch = MagicMock(side_effect=[[b'doc-1', b'7'], [b'doc-2', b'8'], None])
+
+    assert scheduler.dispatch() == 2
+
+    assert [call.args for call in mock_delay.call_args_list] == [('doc-1',), ('doc-2',)]
+    # Another dispatch runs once the new leases could have expired
+    mock_redispatch.assert_called_once_with(countdown=601)
+
+@patch('ai_interviewee.tasks.dispatch_documents_task.apply_async')
+def test_dispatch_with_nothing_to_send_schedules_nothing(mock_redispatch, scheduler):
+    scheduler._dispatch.return_value = None
+    scheduler.redis.zcard.return_value = 0
+
+    assert scheduler.dispatch() == 0
+
+    mock_redispatch.assert_not_called()
+
+@patch('ai_interviewee.tasks.dispatch_documents_task.apply_async')
+@patch('ai_interviewee.tasks.process_document_task.delay')
+def test_release_frees_slot_and_dispatches_next(mock_delay, mock_redispatch, scheduler):
+    scheduler._dispatch.side_effect = [[b'doc-2', b'7'], None]
+
+    scheduler.release(7, 'doc-1')
+
+    scheduler._release.assert_called_once_with(args=['ingestion', 7, 'doc-1'])
+    mock_delay.assert_called_once_with('doc-2')
+
+def test_release_without_owner_lets_redis_look_it_up(scheduler):
+    scheduler._dispatch.return_value = None
+
+    scheduler.release(None, 'doc-1')
+
+    scheduler._release.assert_called_once_with(args=['ingestion', '', 'doc-1'])
+
+def test_submit_batch_without_redis_enqueues_one_group():
+    documents = [MagicMock(id='doc-1', owner_id=1), MagicMock(id='doc-2', owner_id=1)]
+    with patch('ai_interviewee.services.ingestion_scheduler.get_redis_connection', return_value=None), \
+            patch('ai_interviewee.services.ingestion_scheduler.group') as mock_group:
+        IngestionScheduler().submit_batch(documents)
+
+    signatures = list(mock_group.call_args.args[0])
+    assert [signature.args for signature in signatures] == [('doc-1',), ('doc-2',)]
+    mock_group.return_value.apply_async.assert_called_once_with()
+
+@patch('ai_interviewee.tasks.process_document_task.delay')
+def test_submit_batch_queues_in_one_round_trip(mock_delay, scheduler):
+    documents = [MagicMock(id='doc-1', owner_id=7, file_size=10), MagicMock(id='doc-2', owner_id=7, file_size=20)]
+    scheduler._dispatch.return_value = None
+    pipeline = scheduler.redis.pipeline.return_value
+
+    scheduler.submit_batch(documents)
+
+    assert [call.kwargs for call in scheduler._submit.call_args_list] == [
+        {'args': ['ingestion', 7, 'doc-1', 10], 'client': pipeline},
+        {'args': ['ingestion', 7, 'doc-2', 20], 'client': pipeline},
+    ]
+    pipeline.execute.assert_called_once_with()
+    scheduler._dispatch.assert_called_once()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Control the clock fakeredis reads for TIME."""
+    clock = {'now': 1_700_000_000.0}
+    monkeypatch.setattr(time, 'time', lambda: clock['now'])
+    return clock
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    return fakeredis.FakeRedis()
+
+@pytest.fixture
+def dispatched():
+    """Document ids handed to the extraction queue, in order."""
+    sent = []
+    with patch('ai_interviewee.tasks.process_document_task.delay', side_effect=sent.append), \
+            patch('ai_interviewee.tasks.dispatch_documents_task.apply_async'):
+        yield sent
+
+def submit(scheduler, owner_id, document_id):
+    scheduler.submit(MagicMock(id=document_id, owner_id=owner_id, file_size=100))
+
+def test_scripts_round_robin_owners_under_their_cap(fake_redis, clock, dispatched, settings):
+    settings.INGESTION_MAX_IN_FLIGHT_PER_USER = 2
+    settings.INGESTION_MAX_IN_FLIGHT = 10
+    scheduler = IngestionScheduler(redis_client=fake_redis)
+
+    for document_id in ['a0', 'a1', 'a2', 'a3']:
+        submit(scheduler, 1, document_id)
+    submit(scheduler, 2, 'b0')
+    submit(scheduler, 2, 'b1')
+    assert dispatched == ['a0', 'a1', 'b0', 'b1']
+
+    scheduler.release(1, 'a0')
+    scheduler.release(2, 'b0')
+    scheduler.release(None, 'a1')
+    assert dispatched == ['a0', 'a1', 'b0', 'b1', 'a2', 'a3']
+
+def test_scripts_alternate_owners_with_work_waiting(fake_redis, clock, dispatched, settings):
+    settings.INGESTION_MAX_IN_FLIGHT_PER_USER = 2
+    settings.INGESTION_MAX_IN_FLIGHT = 10
+    scheduler = IngestionScheduler(redis_client=fake_redis)
+
+    for document_id in ['a0', 'a1', 'a2']:
+        submit(scheduler, 1, document_id)
+    submit(scheduler, 2, 'b0')
+    scheduler.release(1, 'a0')
+
+    assert dispatched == ['a0', 'a1', 'b0', 'a2']
+
+def test_scripts_respect_the_global_cap(fake_redis, clock, dispatched, settings):
+    settings.INGESTION_MAX_IN_FLIGHT_PER_USER = 2
+    settings.INGESTION_MAX_IN_FLIGHT = 3
+    scheduler = IngestionScheduler(redis_client=fake_redis)
+
+    submit(scheduler, 1, 'a0')
+    submit(scheduler, 1, 'a1')
+    submit(scheduler, 2, 'b0')
+    submit(scheduler, 3, 'c0')
+    assert dispatched == ['a0', 'a1', 'b0']
+
+    scheduler.release(2, 'b0')
+    assert dispatched == ['a0', 'a1', 'b0', 'c0']
+
+def test_scripts_free_the_slot_of_an_expired_lease(fake_redis, clock, dispatched, settings):
+    settings.INGESTION_MAX_IN_FLIGHT_PER_USER = 1
+    settings.INGESTION_MAX_IN_FLIGHT = 10
+    settings.INGESTION_LEASE_SECONDS = 60
+    scheduler = IngestionScheduler(redis_client=fake_redis)
+
+    submit(scheduler, 1, 'a0')
+    submit(scheduler, 1, 'a1')
+    clock['now'] += 59
+    assert scheduler.dispatch() == 0
+
+    # a0's task was lost: its lease runs out and a1 takes the slot
+    clock['now'] += 2
+    assert scheduler.dispatch() == 1
+    assert dispatched == ['a0', 'a1']
+    assert fake_redis.hget('ingestion:owner-of', 'a0') is None
+
+@patch('ai_interviewee.tasks.dispatch_documents_task.apply_async')
+@patch('ai_interviewee.tasks.process_document_task.delay')
+def test_dispatch_schedules_one_sweep_per_lease_period(mock_delay, mock_redispatch, fake_redis, clock, settings):
+    settings.INGESTION_MAX_IN_FLIGHT_PER_USER = 10
+    settings.INGESTION_LEASE_SECONDS = 60
+    scheduler = IngestionScheduler(redis_client=fake_redis)
+
+    submit(scheduler, 1, 'a0')
+    clock['now'] += 30
+    submit(scheduler, 1, 'a1')
+    mock_redispatch.assert_called_once_with(countdown=61)
+
+    # The sweep reaps a0 and has nothing to send, but a1 is still in flight,
+    # so it schedules the next one
+    clock['now'] += 31
+    assert scheduler.dispatch() == 0
+    assert mock_redispatch.call_count == 2
+    assert scheduler.dispatch() == 0
+    assert mock_redispatch.call_count == 2
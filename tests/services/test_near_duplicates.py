@@ -0,0 +1,68 @@
+import uuid
+from unittest.mock import patch
+from ai_interviewee.models import DocumentChunk
+from ai_interviewee.services.near_duplicates import (
+    MinHasher,
+    NearDuplicateDetector,
+    collapse_near_duplicates,
+)
+
+CV_PARAGRAPH = (
+    "Led the migration of the payments platform from a monolith to services, "
+    "cutting deployment time from two hours to ten minutes and owning the "
+    "on-call rotation for a team of eight engineers across three time zones."
+)
+
+
+def test_signature_is_deterministic():
+    assert MinHasher().signature(CV_PARAGRAPH) == MinHasher().signature(CV_PARAGRAPH)
+
+
+def test_similarity_tracks_text_overlap():
+    hasher = MinHasher()
+    original = hasher.signature(CV_PARAGRAPH)
+    edited = hasher.signature(CV_PARAGRAPH.replace("eight engineers", "nine engineers"))
+    unrelated = hasher.signature("Enjoys hiking, chess and baking sourdough bread at the weekend.")
+
+    assert hasher.similarity(original, original) == 1.0
+    assert hasher.similarity(original, edited) > 0.6
+    assert hasher.similarity(original, unrelated) < 0.1
+
+
+def test_near_duplicates_share_a_band_key():
+    hasher = MinHasher()
+    original = hasher.band_keys(hasher.signature(CV_PARAGRAPH))
+    edited = hasher.band_keys(hasher.signature(CV_PARAGRAPH + " Mentored two juniors."))
+
+    assert len(original) == 16
+    assert set(original) & set(edited)
+
+
+def _chunk(text, detector, **fields):
+    minhash, lsh_bands = detector.fingerprint(text)
+    return DocumentChunk(id=uuid.uuid4(), content=text, minhash=minhash, lsh_bands=lsh_bands, **fields)
+
+
+@patch('ai_interviewee.services.near_duplicates.DocumentChunk.objects')
+def test_link_duplicates_points_at_the_canonical_chunk(mock_objects):
+    detector = NearDuplicateDetector(threshold=0.8)
+    canonical = _chunk(CV_PARAGRAPH, detector)
+    older_copy = _chunk(CV_PARAGRAPH, detector, duplicate_of_id=canonical.id)
+    mock_objects.filter.return_value.exclude.return_value.only.return_value = [older_copy]
+
+    new_copy = _chunk(CV_PARAGRAPH + " Mentored two juniors.", detector)
+    unrelated = _chunk("Enjoys hiking, chess and baking sourdough bread at the weekend.", detector)
+
+    assert detector.link_duplicates(1, uuid.uuid4(), [new_copy, unrelated]) == 1
+    assert new_copy.duplicate_of_id == canonical.id
+    assert unrelated.duplicate_of_id is None
+    mock_objects.bulk_update.assert_called_once_with([new_copy], ['duplicate_of'])
+
+
+def test_collapse_near_duplicates_keeps_the_best_ranked_copy():
+    first = DocumentChunk(id=uuid.uuid4())
+    copy_of_first = DocumentChunk(id=uuid.uuid4(), duplicate_of_id=first.id)
+    other = DocumentChunk(id=uuid.uuid4())
+    copy_of_other = DocumentChunk(id=uuid.uuid4(), duplicate_of_id=other.id)
+
+    assert collapse_near_duplicates([copy_of_first, other, first, copy_of_other]) == [copy_of_first, other]
@@ -0,0 +1,133 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from ai_interviewee.services import OpenAIRateLimiter, retry_after_seconds
+
+
+def _rate_limit_error(headers):
+    error = Exception("Rate limit reached")
+    error.response = MagicMock(headers=headers)
+    return error
+
+@pytest.fixture
+def limiter():
+    """A limiter with a mocked Redis connection and bucket script."""
+    redis_client = MagicMock()
+    limiter = OpenAIRateLimiter(requests_per_minute=60, tokens_per_minute=1000, redis_client=redis_client)
+    limiter._token_bucket = MagicMock()
+    limiter._batch_budget = MagicMock()
+    return limiter
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fixed time for fakeredis (TIME and key expiry); advance with clock['now'] += seconds"""
+    import time
+    clock = {'now': 1_700_000_000.0}
+    monkeypatch.setattr(time, 'time', lambda: clock['now'])
+    return clock
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    return fakeredis.FakeRedis()
+
+def _fake_limiter(redis_client):
+    return OpenAIRateLimiter(requests_per_minute=60, tokens_per_minute=1000, redis_client=redis_client)
+
+def test_disabled_limiter_grants_everything():
+    """Without a Redis connection the limiter never makes callers wait."""
+    with patch('ai_interviewee.services.openai_rate_limiter.get_redis_connection', return_value=None):
+        limiter = OpenAIRateLimiter(requests_per_minute=60, tokens_per_minute=1000)
+    assert not limiter.enabled
+    assert limiter.acquire(tokens=10**9) == 0.0
+    assert limiter.remaining() == (60, 1000)
+
+def test_acquire_returns_wait_when_budget_exhausted(limiter):
+    limiter._token_bucket.return_value = [0, 1500, 0, 10]
+    assert limiter.acquire(tokens=500) == 1.5
+
+def test_acquire_caps_tokens_at_bucket_capacity(limiter):
+    limiter._token_bucket.return_value = [1, 0, 59, 0]
+    assert limiter.acquire(tokens=5000) == 0.0
+    assert limiter._token_bucket.call_args.kwargs['args'] == [60, 1000, 1, 1000]
+
+def test_fit_batch_sends_every_token_cost_in_one_call(limiter):
+    limiter._batch_budget.return_value = [2, 0, 60, 250]
+    texts = ["x" * 400] * 10  # ~100 tokens each
+    assert limiter.fit_batch(texts, max_batch_size=8) == 2
+    limiter._batch_budget.assert_called_once()
+    assert limiter._batch_budget.call_args.kwargs['args'] == [60, 1000, 0] + [100] * 8
+    limiter._token_bucket.assert_not_called()
+
+def test_fit_batch_always_returns_at_least_one(limiter):
+    limiter._batch_budget.return_value = [0, 5000, 0, 0]
+    assert limiter.fit_batch(["x" * 4000]) == 1
+
+def test_remaining_does_not_touch_the_buckets(limiter):
+    limiter._batch_budget.return_value = [0, 0, 42, 900]
+    assert limiter.remaining() == (42, 900)
+    limiter._token_bucket.assert_not_called()
+
+def test_acquire_batch_takes_the_budget_it_sizes(limiter):
+    limiter._batch_budget.return_value = [3, 0, 59, 100]
+    assert limiter.acquire_batch(["x" * 400] * 5) == (3, 0.0)
+    assert limiter._batch_budget.call_args.kwargs['args'] == [60, 1000, 1] + [100] * 5
+
+def test_acquire_batch_returns_wait_when_nothing_fits(limiter):
+    limiter._batch_budget.return_value = [0, 2500, 0, 0]
+    assert limiter.acquire_batch(["x" * 400]) == (0, 2.5)
+
+def test_retry_after_ms_header_takes_precedence():
+    error = _rate_limit_error({'retry-after-ms': '1500', 'retry-after': '20'})
+    assert retry_after_seconds(error) == 1.5
+
+def test_retry_after_header_in_seconds():
+    assert retry_after_seconds(_rate_limit_error({'retry-after': '7'})) == 7.0
+
+def test_ratelimit_reset_headers():
+    error = _rate_limit_error({'x-ratelimit-reset-requests': '20ms', 'x-ratelimit-reset-tokens': '1m6s'})
+    assert retry_after_seconds(error) == 66.0
+
+def test_exponential_backoff_without_headers():
+    delay = retry_after_seconds(Exception("boom"), attempt=3)
+    assert 8 <= delay <= 9
+
+# The Lua scripts themselves, on fakeredis
+
+def test_buckets_refill_over_time(fake_redis, clock):
+    limiter = _fake_limiter(fake_redis)
+    assert limiter.acquire(tokens=1000) == 0.0
+    # 500 tokens at 1000 per minute take 30s to come back
+    assert limiter.acquire(tokens=500) == 30.0
+
+    clock['now'] += 15
+    assert limiter.remaining() == (60, 250)  # one request per second is back too
+    assert limiter.acquire(tokens=500) == 15.0
+
+    clock['now'] += 15
+    assert limiter.acquire(tokens=500) == 0.0
+    assert limiter.remaining() == (59, 0)
+
+def test_batches_fit_the_partial_budget_left(fake_redis, clock):
+    limiter = _fake_limiter(fake_redis)
+    assert limiter.acquire(tokens=750) == 0.0
+    texts = ["x" * 400] * 10  # ~100 tokens each
+
+    assert limiter.fit_batch(texts, max_batch_size=8) == 2
+    assert limiter.remaining() == (59, 250)  # sizing takes nothing
+
+    assert limiter.acquire_batch(texts, max_batch_size=8) == (2, 0.0)
+    assert limiter.remaining() == (58, 50)
+    # Not even one text fits now: wait for 50 more tokens
+    assert limiter.acquire_batch(texts, max_batch_size=8) == (0, 3.0)
+
+def test_rate_limit_block_is_shared_between_limiters(fake_redis, clock):
+    worker, other_worker = _fake_limiter(fake_redis), _fake_limiter(fake_redis)
+
+    worker.block_for(5)
+    worker.block_for(1)  # never shortens the cool-down
+
+    assert other_worker.acquire(tokens=10) == 5.0
+    assert other_worker.acquire_batch(["x" * 400]) == (0, 5.0)
+    clock['now'] += 5
+    assert other_worker.acquire(tokens=10) == 0.0
@@ -0,0 +1,180 @@
+from contextlib import nullcontext
+from io import StringIO
+from unittest.mock import call, patch
+import pytest
+from django.core.management import call_command
+from django.db.models.query import QuerySet
+from ai_interviewee.models import DocumentChunk, EmbeddingSpace
+from ai_interviewee.services import retrieval_strategies
+from ai_interviewee.services.retrieval_strategies import (
+    BinaryRerankRetrieval,
+    ExactRetrieval,
+    InnerProductRetrieval,
+    RetrievalFilters,
+    get_retrieval_strategy,
+)
+
+
+@pytest.fixture
+def hnsw_options(monkeypatch):
+    """Record the options of every hnsw_search() instead of applying them"""
+    options_used = []
+
+    def record(**options):
+        options_used.append(options)
+        return nullcontext()
+
+    monkeypatch.setattr(retrieval_strategies, 'hnsw_search', record)
+    return options_used
+
+
+@pytest.fixture
+def captured_sql(monkeypatch, hnsw_options):
+    """Record the SQL of evaluated querysets instead of running it"""
+    queries = []
+
+    def capture(queryset):
+        if queryset._result_cache is None:
+            queries.append(str(queryset.query))
+            queryset._result_cache = []
+
+    monkeypatch.setattr(QuerySet, '_fetch_all', capture)
+    return queries
+
+
+def test_get_retrieval_strategy_defaults_to_setting(settings):
+    settings.RAG_RETRIEVAL_STRATEGY = 'binary_rerank'
+    settings.RAG_BINARY_CANDIDATES = 50
+
+    strategy = get_retrieval_strategy(field='compact_embedding', dimensions=512)
+
+    assert isinstance(strategy, BinaryRerankRetrieval)
+    assert strategy.candidates == 50
+    assert strategy.field == 'compact_embedding'
+
+
+def test_get_retrieval_strategy_unknown_name():
+    with pytest.raises(ValueError, match="Unknown retrieval strategy"):
+        get_retrieval_strategy('nope')
+
+
+def test_exact_retrieval_orders_by_l2_distance(captured_sql):
+    ExactRetrieval().retrieve(DocumentChunk.objects.all(), [0.5, -0.5, 0.0], k=5)
+
+    assert '<->' in captured_sql[0]
+    assert 'LIMIT 5' in captured_sql[0]
+
+
+def test_inner_product_retrieval_orders_by_negative_inner_product(captured_sql):
+    InnerProductRetrieval(field='compact_embedding').retrieve(DocumentChunk.objects.all(), [0.6, 0.8], k=3)
+
+    assert '<#>' in captured_sql[0]
+    assert 'ASC LIMIT 3' in captured_sql[0]
+
+
+def test_set_embedding_stores_unit_length_vectors():
+    chunk = DocumentChunk()
+
+    chunk.set_embedding([3.0, 4.0], EmbeddingSpace('text-embedding-3-small', 1), field='embedding')
+    chunk.set_next_embedding([0.0, 2.0], EmbeddingSpace('text-embedding-3-large', 2))
+
+    assert chunk.embedding == pytest.approx([0.6, 0.8])
+    assert (chunk.embedding_model, chunk.embedding_version) == ('text-embedding-3-small', 1)
+    assert chunk.next_embedding == pytest.approx([0.0, 1.0])
+    assert chunk.next_embedding_version == 2
+
+
+def test_binary_rerank_is_a_single_statement(captured_sql):
+    strategy = BinaryRerankRetrieval(field='embedding', dimensions=3, candidates=40)
+    strategy.retrieve(DocumentChunk.objects.filter(embedding_model='m'), [0.5, -0.5, 0.0], k=5)
+
+    assert len(captured_sql) == 1
+    sql = captured_sql[0]
+    # Hamming first pass as a subquery, exact re-rank outside it
+    assert 'binary_quantize' in sql
+    assert '<~>' in sql
+    assert '<~> (100)::bit(3)' in sql  # bits of the quantized query
+    assert 'LIMIT 40' in sql
+    assert sql.rstrip().endswith('LIMIT 5')
+
+
+@pytest.mark.parametrize('candidates, ef_search', [(10, 40), (400, 400), (5000, 1000)])
+def test_binary_rerank_ef_search_covers_candidates_within_pgvector_limit(
+        captured_sql, hnsw_options, candidates, ef_search):
+    strategy = BinaryRerankRetrieval(dimensions=3, candidates=candidates)
+    strategy.retrieve(DocumentChunk.objects.all(), [0.5, -0.5, 0.0], k=5)
+
+    assert hnsw_options == [{'ef_search': ef_search, 'iterative_scan': 'relaxed_order'}]
+
+
+@patch('ai_interviewee.services.retrieval_strategies.transaction.atomic', return_value=nullcontext())
+@patch('ai_interviewee.services.retrieval_strategies.connection')
+def test_hnsw_search_sets_options_for_the_transaction(mock_connection, mock_atomic):
+    cursor = mock_connection.cursor.return_value.__enter__.return_value
+
+    with retrieval_strategies.hnsw_search(ef_search=1000, iterative_scan='relaxed_order'):
+        pass
+
+    assert cursor.execute.call_args_list == [
+        call("SET LOCAL hnsw.ef_search = %s", [1000]),
+        call("SET LOCAL hnsw.iterative_scan = %s", ['relaxed_order']),
+    ]
+
+
+def test_retrieval_strategy_requires_retrieve():
+    class Incomplete(retrieval_strategies.RetrievalStrategy):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_retrieval_filters_are_part_of_the_search_query(captured_sql):
+    filters = RetrievalFilters(document_types=['cv'], tags=['python'], is_public=True)
+
+    InnerProductRetrieval().retrieve(filters.apply(DocumentChunk.objects.all()), [0.6, 0.8], k=5)
+
+    sql = captured_sql[0]
+    assert '"document_type" IN (cv)' in sql
+    assert '"tags" @>' in sql
+    assert '"is_public"' in sql
+    assert '<#>' in sql
+
+
+def test_empty_retrieval_filters_do_nothing():
+    chunks = DocumentChunk.objects.all()
+    assert str(RetrievalFilters().apply(chunks).query) == str(chunks.query)
+
+
+@pytest.mark.parametrize('strategy, storage, index_name', [
+    ('exact', 'full', None),
+    ('inner_product', 'compact', 'chunk_compact_embedding_ip_hnsw'),
+    ('binary_rerank', 'full', 'chunk_embedding_binary_hnsw'),
+])
+def test_vector_index_follows_strategy_and_storage(settings, strategy, storage, index_name):
+    settings.RAG_RETRIEVAL_STRATEGY = strategy
+    settings.EMBEDDING_STORAGE = storage
+
+    index = DocumentChunk.vector_index()
+
+    assert (index.name if index else None) == index_name
+
+
+@patch('ai_interviewee.management.commands.vector_indexes.connection')
+def test_vector_indexes_command_builds_wanted_and_drops_unused(mock_connection, settings):
+    settings.RAG_RETRIEVAL_STRATEGY = 'binary_rerank'
+    settings.EMBEDDING_STORAGE = 'compact'
+    mock_connection.introspection.get_constraints.return_value = {
+        'chunk_embedding_ip_hnsw': {}, 'chunk_document_idx': {},
+    }
+    mock_connection.cursor.return_value.__enter__.return_value.fetchall.return_value = []
+    schema_editor = mock_connection.schema_editor.return_value.__enter__.return_value
+
+    call_command('vector_indexes', '--drop-unused', stdout=StringIO())
+
+    mock_connection.schema_editor.assert_called_once_with(atomic=False)
+    added, = schema_editor.add_index.call_args_list
+    assert added.args[1].name == 'chunk_compact_binary_hnsw'
+    assert added.kwargs == {'concurrently': True}
+    removed, = schema_editor.remove_index.call_args_list
+    assert removed.args[1].name == 'chunk_embedding_ip_hnsw'
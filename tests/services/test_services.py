@@ -74,3 +74,35 @@ def test_generate_embedding_unexpected_error(openai_embedding_service, mock_open
 
     with pytest.raises(Exception, match="Unexpected error"):
         openai_embedding_service.generate_embedding("Unexpected text")
+
+def test_generate_embeddings_batch(openai_embedding_service, mock_openai_client):
+    """Test that several texts are embedded in one request, in input order."""
+    mock_openai_client.embeddings.create.return_value = MagicMock(
+        data=[MagicMock(index=1, embedding=[0.2]), MagicMock(index=0, embedding=[0.1])]
+    )
+
+    embeddings = openai_embedding_service.generate_embeddings(["first", "second"])
+
+    mock_openai_client.embeddings.create.assert_called_once_with(
+        input=["first", "second"],
+        model="text-embedding-3-small"
+    )
+    assert embeddings == [[0.1], [0.2]]
+
+def test_generate_embeddings_rejects_empty_text(openai_embedding_service):
+    """Test that batch embedding refuses empty inputs."""
+    with pytest.raises(ValueError):
+        openai_embedding_service.generate_embeddings(["text", "  "])
+
+def test_generate_embedding_requests_shortened_vectors(mock_openai_client):
+    """Test that the dimensions option is passed through for compact storage."""
+    service = OpenAIEmbeddingService(api_key='test_arg_key', dimensions=512)
+    mock_openai_client.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=[0.1] * 512)])
+
+    service.generate_embedding("Compact please")
+
+    mock_openai_client.embeddings.create.assert_called_once_with(
+        input="Compact please",
+        model="text-embedding-3-small",
+        dimensions=512
+    )
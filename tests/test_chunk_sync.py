@@ -0,0 +1,87 @@
+import pytest
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from ai_interviewee.models import Document, DocumentChunk
+from ai_interviewee.services.chunk_sync import content_hash, sync_document_chunks
+from ai_interviewee.utils import chunk_text
+
+UNIT_VECTOR = [1.0] + [0.0] * 1535
+
+CV_TEXT = """Jane Doe
+Senior Backend Engineer, Berlin
+
+Summary
+Backend engineer with nine years of experience building data-heavy web services in Python. I have led small teams through rewrites, migrations and on-call rotations, and I care about systems that are boring to operate. Most of my recent work has been on search and ingestion pipelines for document-heavy products.
+
+Experience
+Lead Engineer, Northwind Analytics (2020 to present). I led the team that replaced a nightly batch import with a streaming ingestion pipeline. Documents now reach search within a minute of upload instead of the next morning. I designed the queueing scheme that keeps one large customer from starving everyone else, and I introduced per-tenant rate limits on the embedding API. Along the way we cut the monthly infrastructure bill by a third, mostly by moving cold data out of the primary database. I also mentored four engineers, two of whom now lead teams of their own.
+
+Backend Engineer, Contoso Health (2016 to 2020). I built the appointment and referral services used by clinics in three countries. The services handled patient records, so most of the work was about access control, audit trails and careful schema migrations. I wrote the migration tooling that let us change large tables without downtime. I also ran the weekly incident review and turned its findings into a shared runbook that new hires still use.
+
+Junior Developer, Fabrikam (2014 to 2016). I maintained a Django storefront and its payment integrations. I added automated tests to a codebase that had almost none, which made it possible to upgrade the framework two major versions. I learned how much a good code review culture matters.
+
+Skills
+Python, Django and Celery for most backend work. PostgreSQL, including partitioning, logical replication and pgvector. Redis for queues, caches and rate limiting. Docker and Kubernetes for deployment, with Terraform for the surrounding infrastructure. Observability with Prometheus, Grafana and structured logging.
+
+Education
+MSc in Computer Science, Technical University of Munich. My thesis compared approximate nearest neighbour indexes for high-dimensional text embeddings. BSc in Mathematics, University of Vienna.
+
+Interests
+I run a small meetup for backend engineers and occasionally give talks about data pipelines. Outside of work I climb, bake bread and am slowly learning Japanese.
+"""
+
+
+@pytest.fixture
+def document():
+    user = User.objects.create_user(username='sync_user', password='testpass')
+    return Document.objects.create(owner=user, title='CV', document_type='cv')
+
+def _chunks(*contents):
+    return [{'content': content, 'start_char': 0, 'end_char': len(content)} for content in contents]
+
+def _reembedded(old_text, new_text, chunk_size=40, overlap=8):
+    """Chunks of new_text whose content hash no chunk of old_text has"""
+    old_hashes = {content_hash(chunk['content']) for chunk in chunk_text(old_text, chunk_size, overlap)}
+    return [
+        chunk for chunk in chunk_text(new_text, chunk_size, overlap)
+        if content_hash(chunk['content']) not in old_hashes
+    ]
+
+def test_content_hash_is_sha256_hex():
+    assert content_hash("abc") == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
+
+@pytest.mark.django_db
+@patch('ai_interviewee.services.chunk_sync.NearDuplicateDetector.link_duplicates')
+def test_sync_keeps_unchanged_chunks_and_their_embeddings(mock_link_duplicates, document):
+    stats = sync_document_chunks(document, _chunks("intro", "old job", "skills"))
+    assert stats == {'kept': 0, 'created': 3, 'deleted': 0}
+    DocumentChunk.objects.filter(document=document).update(
+        embedding=UNIT_VECTOR, embedding_model='text-embedding-3-small', embedding_version=1
+    )
+    skills = DocumentChunk.objects.get(document=document, content="skills")
+
+    stats = sync_document_chunks(document, _chunks("intro", "new job", "more", "skills"))
+
+    assert stats == {'kept': 2, 'created': 2, 'deleted': 1}
+    chunks = list(DocumentChunk.objects.filter(document=document).order_by('chunk_index'))
+    assert [chunk.content for chunk in chunks] == ["intro", "new job", "more", "skills"]
+    # The unchanged chunk moved but kept its row and embedding
+    assert chunks[3].id == skills.id
+    assert chunks[3].embedding is not None
+    assert chunks[1].embedding is None
+
+@pytest.mark.parametrize('old, new, changed', [
+    # A sentence inserted mid-document
+    ("I also ran the weekly incident review",
+     "I was on call one week in four. I also ran the weekly incident review", 2),
+    # A word changed
+    ("nine years", "ten years", 1),
+    # A sentence deleted
+    ("I learned how much a good code review culture matters.\n", "", 2),
+])
+def test_editing_a_document_reembeds_only_the_chunks_around_the_edit(old, new, changed):
+    edited = CV_TEXT.replace(old, new)
+    assert edited != CV_TEXT
+    assert len(chunk_text(CV_TEXT, 40, 8)) > 15
+
+    assert len(_reembedded(CV_TEXT, edited)) == changed
@@ -0,0 +1,82 @@
+from io import StringIO
+from unittest.mock import patch
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from ai_interviewee.models import Document, DocumentChunk, EmbeddingMigration, EmbeddingSpace
+
+# Stored vectors must be unit length
+OLD_VECTOR = [1.0] + [0.0] * 1535
+NEW_VECTOR = [0.0, 1.0] + [0.0] * 1534
+
+
+@pytest.fixture
+def document():
+    user = User.objects.create_user(username='migration_user', password='testpass')
+    return Document.objects.create(owner=user, title='CV', document_type='cv')
+
+def _chunk(document, index, **fields):
+    return DocumentChunk.objects.create(
+        document=document,
+        content=f"chunk {index}",
+        chunk_index=index,
+        embedding=OLD_VECTOR,
+        embedding_model='text-embedding-3-small',
+        embedding_version=1,
+        **fields
+    )
+
+@pytest.mark.django_db
+def test_active_space_defaults_to_embedding_service_model():
+    assert EmbeddingMigration.active_space() == EmbeddingSpace('text-embedding-3-small', 1, 'openai')
+
+@pytest.mark.django_db
+def test_cut_over_refuses_partial_coverage(document):
+    migration = EmbeddingMigration.objects.create(target_model='new-model', target_version=1)
+    _chunk(document, 0, next_embedding=NEW_VECTOR, next_embedding_model='new-model', next_embedding_version=1)
+    _chunk(document, 1)
+
+    assert migration.coverage() == 0.5
+    with pytest.raises(ValueError):
+        migration.cut_over()
+    assert EmbeddingMigration.active_space() == EmbeddingSpace('text-embedding-3-small', 1, 'openai')
+
+@pytest.mark.django_db
+def test_cut_over_swaps_every_chunk_to_target_space(document, settings):
+    migration = EmbeddingMigration.objects.create(target_model='new-model', target_version=2, target_provider='hashing')
+    for index in range(2):
+        _chunk(document, index, next_embedding=NEW_VECTOR, next_embedding_model='new-model', next_embedding_version=2)
+
+    assert migration.cut_over() == []
+
+    assert migration.status == 'cut_over'
+    # The space keeps its provider whatever EMBEDDING_PROVIDER says
+    settings.EMBEDDING_PROVIDER = 'openai'
+    assert EmbeddingMigration.active_space() == EmbeddingSpace('new-model', 2, 'hashing')
+    for chunk in DocumentChunk.objects.all():
+        assert (chunk.embedding_model, chunk.embedding_version) == ('new-model', 2)
+        assert list(chunk.embedding) == pytest.approx(NEW_VECTOR)
+        assert chunk.next_embedding is None
+
+@patch('ai_interviewee.management.commands.reembed_chunks.reembed_chunks_task')
+@patch('ai_interviewee.management.commands.reembed_chunks.EmbeddingMigration.objects')
+def test_reembed_command_starts_a_migration(mock_objects, mock_task):
+    mock_objects.filter.return_value.exists.return_value = False
+    mock_objects.create.return_value.target_model = 'text-embedding-3-large'
+
+    call_command('reembed_chunks', 'start', '--model', 'text-embedding-3-large', '--target-version', '2',
+                 '--provider', 'openai', '--no-auto-cut-over', stdout=StringIO())
+
+    mock_objects.create.assert_called_once_with(
+        target_model='text-embedding-3-large', target_version=2, target_provider='openai', auto_cut_over=False,
+    )
+    mock_task.delay.assert_called_once_with(mock_objects.create.return_value.id)
+
+@patch('ai_interviewee.management.commands.reembed_chunks.EmbeddingMigration.objects')
+def test_reembed_command_rejects_unknown_providers(mock_objects):
+    mock_objects.filter.return_value.exists.return_value = False
+
+    with pytest.raises(CommandError, match="Unknown embedding provider 'missing'"):
+        call_command('reembed_chunks', 'start', '--model', 'm', '--provider', 'missing', stdout=StringIO())
+    mock_objects.create.assert_not_called()
@@ -0,0 +1,40 @@
+from datetime import timedelta
+import pytest
+from django.utils import timezone
+from ai_interviewee.models import ExtractedText
+
+HASH = 'f' * 64
+
+
+@pytest.mark.django_db
+def test_store_and_lookup_round_trip():
+    text = "Senior engineer. " * 200
+    ExtractedText.store(HASH, text, {'chars_removed': 12})
+
+    entry = ExtractedText.lookup(HASH)
+
+    assert entry.text == text
+    assert entry.normalization_stats == {'chars_removed': 12}
+    assert len(bytes(entry.compressed_text)) < len(text) / 10
+
+@pytest.mark.django_db
+def test_lookup_ignores_entries_from_other_versions():
+    ExtractedText.objects.create(
+        content_hash=HASH, version=ExtractedText.VERSION - 1, compressed_text=b'', text_length=0
+    )
+    assert ExtractedText.lookup(HASH) is None
+
+def test_lookup_without_hash():
+    assert ExtractedText.lookup('') is None
+
+@pytest.mark.django_db
+def test_prune_deletes_unused_and_outdated_entries():
+    ExtractedText.store(HASH, "recent", {})
+    ExtractedText.store('a' * 64, "unused", {})
+    ExtractedText.objects.filter(content_hash='a' * 64).update(last_used_at=timezone.now() - timedelta(days=100))
+    ExtractedText.objects.create(
+        content_hash='b' * 64, version=ExtractedText.VERSION - 1, compressed_text=b'', text_length=0
+    )
+
+    assert ExtractedText.prune(timedelta(days=90)) == 2
+    assert list(ExtractedText.objects.values_list('content_hash', flat=True)) == [HASH]
@@ -0,0 +1,30 @@
+import openai
+import pytest
+from ai_interviewee.fake_openai import FakeOpenAIServer, fake_embedding
+
+
+def test_embeddings_and_chat_completions():
+    with FakeOpenAIServer(dimensions=4) as server:
+        client = openai.OpenAI(api_key='test-key', base_url=server.base_url)
+
+        embeddings = client.embeddings.create(input=['alpha', 'beta'], model='text-embedding-3-small')
+        completion = client.chat.completions.create(
+            model='gpt-4.1-mini',
+            messages=[{'role': 'system', 'content': 'Context'}, {'role': 'user', 'content': 'Why Django?'}],
+        )
+
+    assert [item.embedding for item in embeddings.data] == [fake_embedding('alpha', 4), fake_embedding('beta', 4)]
+    assert completion.choices[0].message.content == 'Synthetic answer to: Why Django?'
+
+
+def test_rate_limit_answers_429_with_retry_after():
+    with FakeOpenAIServer(dimensions=4, rate_limit=2, rate_limit_window=30) as server:
+        client = openai.OpenAI(api_key='test-key', base_url=server.base_url, max_retries=0)
+        client.embeddings.create(input='one', model='text-embedding-3-small')
+        client.embeddings.create(input='two', model='text-embedding-3-small')
+
+        with pytest.raises(openai.RateLimitError) as excinfo:
+            client.embeddings.create(input='three', model='text-embedding-3-small')
+
+    assert 0 < float(excinfo.value.response.headers['retry-after']) <= 30
+    assert server.rate_limited == 1
@@ -1,15 +1,18 @@
 import pytest
 from unittest.mock import patch, MagicMock
 from django.utils import timezone
-from ai_interviewee.models import Document, DocumentChunk
-from ai_interviewee.tasks import process_document_task, generate_embedding_task
+from pgvector import HalfVector
+from ai_interviewee.models import Document, DocumentChunk, EmbeddingSpace
+from ai_interviewee.services import EmbeddingDeferred, EmbeddingFailed
+from ai_interviewee.tasks import process_document_task, generate_embedding_task, generate_document_embeddings_task
 
 @pytest.fixture
 def mock_document():
     """Fixture for a mock Document object."""
     doc = MagicMock(spec=Document)
     doc.id = 1
-    doc.file.path = '/path/to/mock_document.txt'
+    doc.file.name = 'documents/mock_document.txt'
+    doc.content_hash = 'a' * 64
     doc.processing_status = 'pending'
     doc.save = MagicMock()
     return doc
@@ -26,14 +29,18 @@ def mock_chunk():
 @pytest.mark.django_db
 class TestProcessDocumentTask:
 
+    @patch('ai_interviewee.tasks.ExtractedText.store')
+    @patch('ai_interviewee.tasks.ExtractedText.lookup', return_value=None)
+    @patch('ai_interviewee.services.chunk_sync.NearDuplicateDetector.link_duplicates')
     @patch('ai_interviewee.tasks.extract_text_from_file')
     @patch('ai_interviewee.tasks.chunk_text')
     @patch('ai_interviewee.tasks.DocumentChunk.objects.create')
-    @patch('ai_interviewee.tasks.generate_embedding_task.delay')
+    @patch('ai_interviewee.tasks.generate_document_embeddings_task.delay')
     @patch('ai_interviewee.tasks.Document.objects.get')
-    def test_successful_processing(self, mock_get_document, mock_generate_embedding_task_delay,
+    def test_successful_processing(self, mock_get_document, mock_generate_embeddings_task_delay,
                                    mock_create_document_chunk, mock_chunk_text,
-                                   mock_extract_text_from_file, mock_document):
+                                   mock_extract_text_from_file, mock_link_duplicates,
+                                   mock_lookup, mock_store, mock_document):
         
         mock_get_document.return_value = mock_document
         mock_extract_text_from_file.return_value = "This is some test content."
@@ -54,11 +61,16 @@ class TestProcessDocumentTask:
         assert mock_document.processed_at is not None
         assert mock_document.save.call_count == 2
 
-        mock_extract_text_from_file.assert_called_once_with(mock_document.file.path)
+        # Read through the storage API, not from a local path
+        stored_file = mock_document.file.open.return_value.__enter__.return_value
+        mock_extract_text_from_file.assert_called_once_with(stored_file, 'documents/mock_document.txt')
         mock_chunk_text.assert_called_once_with("This is some test content.")
+        mock_store.assert_called_once()
         
         assert mock_create_document_chunk.call_count == 2
-        assert mock_generate_embedding_task_delay.call_count == 2
+        assert len(mock_create_document_chunk.call_args.kwargs['lsh_bands']) == 16
+        mock_link_duplicates.assert_called_once()
+        mock_generate_embeddings_task_delay.assert_called_once_with(mock_document.id)
 
     # @patch('ai_interviewee.tasks.Document.objects.get')
     # def test_document_does_not_exist(self, mock_get_document):
@@ -172,3 +184,177 @@ class TestProcessDocumentTask:
     #     assert mock_document.processing_status == 'failed'
     #     assert "Celery error on delay" in mock_document.processing_error
     #     mock_self.retry.assert_called_once()
+
+
+@patch('ai_interviewee.tasks.IngestionScheduler')
+@patch('ai_interviewee.tasks.generate_document_embeddings_task.delay')
+@patch('ai_interviewee.tasks.sync_document_chunks', return_value={'kept': 1, 'created': 0, 'deleted': 0})
+@patch('ai_interviewee.tasks.chunk_text', return_value=[{'content': 'cached text'}])
+@patch('ai_interviewee.tasks.extract_text_from_file')
+@patch('ai_interviewee.tasks.ExtractedText.lookup')
+@patch('ai_interviewee.tasks.Document.objects.get')
+def test_process_document_uses_cached_extracted_text(mock_get_document, mock_lookup, mock_extract_text_from_file,
+                                                     mock_chunk_text, mock_sync, mock_delay,
+                                                     mock_scheduler, mock_document):
+    mock_get_document.return_value = mock_document
+    mock_lookup.return_value = MagicMock(text="cached text", normalization_stats={'chars_removed': 3})
+
+    process_document_task(mock_document.id)
+
+    mock_lookup.assert_called_once_with('a' * 64)
+    mock_extract_text_from_file.assert_not_called()
+    mock_chunk_text.assert_called_once_with("cached text")
+    assert mock_document.processing_stats['extraction_cached'] is True
+    assert mock_document.processing_status == 'completed'
+
+
+@patch('ai_interviewee.tasks.IngestionScheduler')
+@patch('ai_interviewee.tasks.generate_document_embeddings_task.delay')
+@patch('ai_interviewee.tasks.sync_document_chunks', return_value={'kept': 1, 'created': 0, 'deleted': 0})
+@patch('ai_interviewee.tasks.chunk_text', return_value=[{'content': 'cached text'}])
+@patch('ai_interviewee.tasks.ExtractedText.lookup')
+@patch('ai_interviewee.tasks.Document.objects.get')
+def test_slot_release_failure_does_not_fail_the_document(mock_get_document, mock_lookup, mock_chunk_text,
+                                                         mock_sync, mock_delay, mock_scheduler, mock_document):
+    mock_get_document.return_value = mock_document
+    mock_lookup.return_value = MagicMock(text="cached text", normalization_stats={})
+    mock_scheduler.return_value.release.side_effect = ConnectionError("Redis is down")
+
+    process_document_task(mock_document.id)
+
+    mock_scheduler.return_value.release.assert_called_once_with(mock_document.owner_id, mock_document.id)
+    assert mock_document.processing_status == 'completed'
+
+
+@patch('ai_interviewee.tasks.IngestionScheduler')
+@patch('ai_interviewee.tasks.Document.objects.get', side_effect=Document.DoesNotExist)
+def test_missing_document_releases_its_slot(mock_get_document, mock_scheduler):
+    with pytest.raises(Document.DoesNotExist):
+        process_document_task('doc-1')
+
+    mock_scheduler.return_value.release.assert_called_once_with(None, 'doc-1')
+
+
+@patch('ai_interviewee.tasks.EmbeddingMigration.active_space',
+       return_value=EmbeddingSpace('text-embedding-3-small', 1))
+class TestGenerateDocumentEmbeddingsTask:
+
+    def _chunks(self, count):
+        return [
+            MagicMock(spec=DocumentChunk, id=i, content=f"chunk {i}", embedding=None, duplicate_of_id=None)
+            for i in range(count)
+        ]
+
+    @patch('ai_interviewee.tasks.DocumentChunk.objects')
+    @patch('ai_interviewee.tasks.get_space_embedding_provider')
+    def test_embeds_all_pending_chunks(self, mock_executor_class, mock_chunk_objects, mock_active_space):
+        chunks = self._chunks(3)
+        mock_chunk_objects.filter.return_value.order_by.return_value = chunks
+        mock_executor_class.return_value.embed.return_value = [[0.1], [0.2], [0.3]]
+
+        generate_document_embeddings_task(1)
+
+        mock_executor_class.assert_called_once_with(EmbeddingSpace('text-embedding-3-small', 1), dimensions=None)
+        mock_executor_class.return_value.embed.assert_called_once_with(["chunk 0", "chunk 1", "chunk 2"])
+        for chunk, embedding in zip(chunks, [[0.1], [0.2], [0.3]]):
+            chunk.set_embedding.assert_called_once_with(
+                embedding, EmbeddingSpace('text-embedding-3-small', 1), 'embedding'
+            )
+        mock_chunk_objects.bulk_update.assert_called_once_with(
+            chunks, ['embedding', 'embedding_model', 'embedding_version']
+        )
+
+    @patch('ai_interviewee.tasks.DocumentChunk.objects')
+    @patch('ai_interviewee.tasks.get_space_embedding_provider')
+    def test_near_duplicates_reuse_compact_embeddings(self, mock_executor_class, mock_chunk_objects,
+                                                      mock_active_space, settings):
+        settings.EMBEDDING_STORAGE = 'compact'
+        chunks = self._chunks(1)
+        chunks[0].duplicate_of_id = 'canonical'
+        mock_chunk_objects.filter.return_value.order_by.return_value = chunks
+        # halfvec columns load as HalfVector, which isn't iterable
+        mock_chunk_objects.filter.return_value.values_list.return_value = [('canonical', HalfVector([0.6, 0.8]))]
+        mock_executor_class.return_value.embed.return_value = []
+
+        generate_document_embeddings_task(1)
+
+        chunks[0].set_embedding.assert_called_once_with(
+            [pytest.approx(0.6, abs=1e-3), pytest.approx(0.8, abs=1e-3)],
+            EmbeddingSpace('text-embedding-3-small', 1), 'compact_embedding',
+        )
+        mock_chunk_objects.bulk_update.assert_called_once_with(
+            chunks, ['compact_embedding', 'embedding_model', 'embedding_version']
+        )
+
+    @patch('ai_interviewee.tasks.generate_document_embeddings_task.apply_async')
+    @patch('ai_interviewee.tasks.DocumentChunk.objects')
+    @patch('ai_interviewee.tasks.get_space_embedding_provider')
+    def test_saves_partial_results_and_requeues_when_deferred(self, mock_executor_class,
+                                                              mock_chunk_objects, mock_apply_async,
+                                                              mock_active_space):
+        chunks = self._chunks(2)
+        mock_chunk_objects.filter.return_value.order_by.return_value = chunks
+        mock_executor_class.return_value.embed.side_effect = EmbeddingDeferred(12.5, [[0.1], None])
+
+        generate_document_embeddings_task(1)
+
+        mock_chunk_objects.bulk_update.assert_called_once_with(
+            [chunks[0]], ['embedding', 'embedding_model', 'embedding_version']
+        )
+        chunks[1].set_embedding.assert_not_called()
+        mock_apply_async.assert_called_once_with((1,), {'deferrals': 1}, countdown=12.5)
+
+    @patch('ai_interviewee.tasks.DocumentChunk.objects')
+    @patch('ai_interviewee.tasks.get_space_embedding_provider')
+    def test_saves_finished_batches_before_retrying_a_failure(self, mock_executor_class, mock_chunk_objects,
+                                                              mock_active_space):
+        chunks = self._chunks(2)
+        mock_chunk_objects.filter.return_value.order_by.return_value = chunks
+        error = ConnectionError("connection reset")
+        mock_executor_class.return_value.embed.side_effect = EmbeddingFailed(error, [[0.1], None])
+
+        with patch.object(generate_document_embeddings_task, 'retry', side_effect=RuntimeError("retry")) as retry:
+            with pytest.raises(RuntimeError):
+                generate_document_embeddings_task(1)
+
+        mock_chunk_objects.bulk_update.assert_called_once_with(
+            [chunks[0]], ['embedding', 'embedding_model', 'embedding_version']
+        )
+        assert retry.call_args.kwargs['exc'] is error
+
+    @patch('ai_interviewee.tasks.generate_document_embeddings_task.apply_async')
+    @patch('ai_interviewee.tasks.DocumentChunk.objects')
+    @patch('ai_interviewee.tasks.get_space_embedding_provider')
+    def test_gives_up_after_too_many_deferrals_without_progress(self, mock_executor_class, mock_chunk_objects,
+                                                                 mock_apply_async, mock_active_space, settings):
+        settings.EMBEDDING_MAX_DEFERRALS = 3
+        mock_chunk_objects.filter.return_value.order_by.return_value = self._chunks(2)
+        mock_executor_class.return_value.embed.side_effect = EmbeddingDeferred(30.0, [None, None])
+
+        generate_document_embeddings_task(1, deferrals=2)
+        mock_apply_async.assert_called_once_with((1,), {'deferrals': 3}, countdown=30.0)
+
+        mock_apply_async.reset_mock()
+        result = generate_document_embeddings_task(1, deferrals=3)
+        mock_apply_async.assert_not_called()
+        assert "gave up" in result
+
+    @patch('ai_interviewee.tasks.DocumentChunk.objects')
+    @patch('ai_interviewee.tasks.get_space_embedding_provider')
+    def test_near_duplicates_reuse_the_canonical_embedding(self, mock_executor_class, mock_chunk_objects,
+                                                           mock_active_space):
+        chunks = self._chunks(2)
+        chunks[0].duplicate_of_id = 'canonical'
+        mock_chunk_objects.filter.return_value.order_by.return_value = chunks
+        mock_chunk_objects.filter.return_value.values_list.return_value = [('canonical', [0.6, 0.8])]
+        mock_executor_class.return_value.embed.return_value = [[0.2]]
+
+        generate_document_embeddings_task(1)
+
+        space = EmbeddingSpace('text-embedding-3-small', 1)
+        chunks[0].set_embedding.assert_called_once_with([0.6, 0.8], space, 'embedding')
+        mock_executor_class.return_value.embed.assert_called_once_with(["chunk 1"])
+        chunks[1].set_embedding.assert_called_once_with([0.2], space, 'embedding')
+        mock_chunk_objects.bulk_update.assert_called_once_with(
+            chunks, ['embedding', 'embedding_model', 'embedding_version']
+        )
@@ -0,0 +1,72 @@
+import hashlib
+import pytest
+from django.test import RequestFactory
+from ai_interviewee.upload_handlers import DOCX_MIME_TYPE, StreamingUploadHandler, UploadTooLarge, sniff_mime_type
+
+
+@pytest.fixture
+def handler(settings):
+    settings.DOCUMENT_MAX_UPLOAD_SIZE = 1000
+    return StreamingUploadHandler(RequestFactory().post('/api/upload/'))
+
+def _stream(handler, chunks, file_name='cv.pdf'):
+    handler.new_file('file', file_name, 'application/octet-stream', None)
+    start = 0
+    for chunk in chunks:
+        handler.receive_data_chunk(chunk, start)
+        start += len(chunk)
+    return handler.file_complete(start)
+
+def test_hashes_and_sniffs_while_streaming(handler):
+    data = b'%PDF-1.7 ' + b'x' * 500
+    uploaded = _stream(handler, [data[:100], data[100:]])
+
+    assert uploaded.content_hash == hashlib.sha256(data).hexdigest()
+    assert uploaded.sniffed_content_type == 'application/pdf'
+    assert uploaded.read() == data
+
+def test_rejects_oversize_content_length_before_reading(handler):
+    with pytest.raises(UploadTooLarge):
+        handler.handle_raw_input(None, {}, 1000 + StreamingUploadHandler.FORM_OVERHEAD + 1, b'boundary')
+
+def test_rejects_streamed_bytes_past_the_limit(handler):
+    # Content-Length can be missing or wrong, so the bytes are counted too
+    with pytest.raises(UploadTooLarge):
+        _stream(handler, [b'a' * 600, b'a' * 600], file_name='cv.txt')
+
+def test_rejects_files_that_together_pass_the_request_limit(settings):
+    settings.DOCUMENT_MAX_UPLOAD_SIZE = 1000
+    handler = StreamingUploadHandler(RequestFactory().post('/api/upload/'), max_files=2)
+    _stream(handler, [b'a' * 900], file_name='first.txt')
+    _stream(handler, [b'a' * 900], file_name='second.txt')
+
+    # Every file is under the per-file limit, but not all three together
+    with pytest.raises(UploadTooLarge):
+        _stream(handler, [b'a' * 300], file_name='third.txt')
+
+@pytest.mark.parametrize('head, file_name, expected', [
+    (b'PK\x03\x04rest', 'cv.docx', DOCX_MIME_TYPE),
+    (b'PK\x03\x04rest', 'bundle.zip', 'application/zip'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'cv.doc', 'application/msword'),
+    ('Café owner'.encode('latin-1'), 'cv.txt', 'text/plain'),
+    (b'\x7fELF\x02\x01\x00', 'cv.txt', 'application/octet-stream'),
+])
+def test_sniff_mime_type(head, file_name, expected):
+    assert sniff_mime_type(head, file_name) == expected
+
+def test_upload_view_returns_413_for_oversize_files(settings):
+    from django.contrib.auth.models import User
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from rest_framework.test import APIRequestFactory, force_authenticate
+    from ai_interviewee.views import DocumentUploadView
+
+    settings.DOCUMENT_MAX_UPLOAD_SIZE = 1000
+    request = APIRequestFactory().post(
+        '/api/upload/', {'file': SimpleUploadedFile('cv.txt', b'a' * 5000)}, format='multipart'
+    )
+    force_authenticate(request, user=User(id=1, username='uploader'))
+
+    response = DocumentUploadView.as_view()(request)
+
+    assert response.status_code == 413
+    assert response.data['detail'].code == 'upload_too_large'
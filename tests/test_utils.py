@@ -1,3 +1,4 @@
+import io
 import pytest
 import os
 from unittest.mock import patch, mock_open
@@ -7,7 +8,13 @@ from ai_interviewee.utils import (
     extract_text_from_pdf,
     extract_text_from_txt,
     extract_text_from_docx,
-    chunk_text
+    chunk_text,
+    hash_file,
+    iter_docx_text,
+    normalize_extracted_text,
+    seekable_file,
+    unit_normalize,
+    vector_to_list,
 )
 
 # --- Fixtures for dummy files ---
@@ -72,25 +79,52 @@ def test_extract_text_from_txt_general_error(mock_file, dummy_txt_file):
 
 # --- Tests for extract_text_from_docx ---
 
-@patch('docx.Document')
-def test_extract_text_from_docx_success(mock_document, dummy_docx_file):
-    mock_doc_instance = mock_document.return_value
-    mock_doc_instance.paragraphs = [
-        type('obj', (object,), {'text': 'Paragraph 1'})(),
-        type('obj', (object,), {'text': 'Paragraph 2'})()
-    ]
-    result = extract_text_from_docx(dummy_docx_file)
-    assert result == "Paragraph 1\nParagraph 2"
-    mock_document.assert_called_once_with(dummy_docx_file)
-
-@patch('docx.Document', side_effect=ImportError)
-def test_extract_text_from_docx_import_error(mock_document, dummy_docx_file):
-    with pytest.raises(ImportError):
-        extract_text_from_docx(dummy_docx_file)
-
-@patch('docx.Document', side_effect=Exception("DOCX error"))
-def test_extract_text_from_docx_general_error(mock_document, dummy_docx_file):
-    with pytest.raises(Exception, match="DOCX error"):
+def test_extract_text_from_docx_success(tmp_path):
+    from docx import Document
+    document = Document()
+    document.add_paragraph('Paragraph 1')
+    document.add_paragraph('Paragraph 2')
+    path = tmp_path / "cv.docx"
+    document.save(path)
+    assert extract_text_from_docx(path) == "Paragraph 1\nParagraph 2"
+
+def test_extract_text_from_docx_includes_tables_in_document_order(tmp_path):
+    from docx import Document
+    document = Document()
+    document.add_paragraph('Skills')
+    table = document.add_table(rows=2, cols=2)
+    for row, cells in enumerate([('Python', '8 years'), ('SQL', '')]):
+        for column, text in enumerate(cells):
+            table.cell(row, column).text = text
+    paragraph = document.add_paragraph('Name:')
+    paragraph.add_run('\tJane')
+    path = tmp_path / "cv.docx"
+    document.save(path)
+
+    assert list(iter_docx_text(path)) == ['Skills', 'Python | 8 years', 'SQL', 'Name:\tJane']
+
+def test_extract_text_from_docx_finds_the_main_part_from_relationships(tmp_path):
+    import zipfile
+    from docx import Document
+    document = Document()
+    document.add_paragraph('Renamed part')
+    saved = tmp_path / "saved.docx"
+    document.save(saved)
+
+    # Rewrite the package with the main part at word/document2.xml
+    path = tmp_path / "cv.docx"
+    with zipfile.ZipFile(saved) as source, zipfile.ZipFile(path, 'w') as target:
+        for info in source.infolist():
+            data = source.read(info)
+            if info.filename == '_rels/.rels':
+                data = data.replace(b'word/document.xml', b'word/document2.xml')
+            name = 'word/document2.xml' if info.filename == 'word/document.xml' else info.filename
+            target.writestr(name, data)
+
+    assert extract_text_from_docx(path) == "Renamed part"
+
+def test_extract_text_from_docx_general_error(dummy_docx_file):
+    with pytest.raises(Exception, match="not a zip file"):
         extract_text_from_docx(dummy_docx_file)
 
 # --- Tests for extract_text_from_file ---
@@ -135,6 +169,76 @@ def test_extract_text_from_file_error_handling(mock_extract_pdf, tmp_path):
     with pytest.raises(Exception, match="Extraction failed"):
         extract_text_from_file(pdf_file)
 
+# --- Tests for extraction from storage ---
+
+class _Stream(io.RawIOBase):
+    """A forward-only stream, like a remote storage response body"""
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._data.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def _docx_bytes(*paragraphs):
+    from docx import Document
+    document = Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+def test_extract_text_from_storage_without_a_local_path():
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import InMemoryStorage
+    storage = InMemoryStorage()
+    name = storage.save('documents/cv.docx', ContentFile(_docx_bytes('Jane Doe', 'Python developer')))
+
+    with storage.open(name, 'rb') as stored_file:
+        assert extract_text_from_file(stored_file, name) == 'Jane Doe\nPython developer'
+
+def test_extract_text_from_non_seekable_streams():
+    assert extract_text_from_file(_Stream('Café'.encode('latin-1')), 'notes.txt') == 'Café'
+    assert extract_text_from_file(_Stream(_docx_bytes('Streamed')), 'cv.docx') == 'Streamed'
+
+@pytest.mark.skipif(
+    not os.environ.get('AWS_S3_ENDPOINT_URL'),
+    reason='needs an S3-compatible endpoint, e.g. the minio service in docker-compose.yml',
+)
+def test_extract_text_from_s3_storage():
+    pytest.importorskip('storages')
+    from django.core.files.base import ContentFile
+    from storages.backends.s3 import S3Storage
+    storage = S3Storage(
+        bucket_name=os.environ.get('AWS_STORAGE_BUCKET_NAME', 'documents'),
+        endpoint_url=os.environ['AWS_S3_ENDPOINT_URL'],
+        access_key=os.environ.get('AWS_S3_ACCESS_KEY_ID'),
+        secret_key=os.environ.get('AWS_S3_SECRET_ACCESS_KEY'),
+    )
+    name = storage.save('tests/cv.docx', ContentFile(_docx_bytes('Stored in S3')))
+    try:
+        with storage.open(name, 'rb') as stored_file:
+            assert extract_text_from_file(stored_file, name) == 'Stored in S3'
+    finally:
+        storage.delete(name)
+
+def test_seekable_file_only_spools_streams(settings):
+    settings.EXTRACTION_SPOOL_MAX_MEMORY = 4
+    seekable = io.BytesIO(b'data')
+    seekable.read()
+    with seekable_file(seekable) as file:
+        assert file is seekable
+        assert file.read() == b'data'
+
+    with seekable_file(_Stream(b'streamed data')) as file:
+        assert file.seekable()
+        assert file.read() == b'streamed data'
+
 # --- Tests for chunk_text ---
 
 def test_chunk_text_empty_input():
@@ -151,70 +255,60 @@ def test_chunk_text_short_text_single_chunk():
     assert chunks[0]['end_char'] == len(text)
     assert chunks[0]['metadata']['word_count'] == len(text.split())
 
+def _assert_chunks_cover(text, chunks, chunk_size, overlap):
+    """Chunks are positioned in the space-joined text and overlap as asked"""
+    words = text.split()
+    joined = ' '.join(words)
+    assert chunks[0]['start_char'] == 0
+    assert chunks[-1]['end_char'] == len(joined)
+    for chunk in chunks:
+        assert joined[chunk['start_char']:chunk['end_char']] == chunk['content']
+        assert 1 <= chunk['metadata']['word_count'] <= chunk_size
+    for previous, chunk in zip(chunks, chunks[1:]):
+        previous_words = previous['content'].split()
+        shared = min(overlap, len(previous_words) - 1)
+        assert chunk['content'].split()[:shared] == previous_words[len(previous_words) - shared:]
+        assert chunk['end_char'] > previous['end_char']
+
 def test_chunk_text_multiple_chunks_no_overlap():
     text = "This is a longer text that needs to be split into multiple chunks for processing."
     chunks = chunk_text(text, chunk_size=5, overlap=0)
-    assert len(chunks) == 3
-    assert chunks[0]['content'] == "This is a longer text"
-    assert chunks[1]['content'] == "that needs to be split"
-    assert chunks[2]['content'] == "into multiple chunks for processing."
+    assert len(chunks) > 1
+    assert ' '.join(chunk['content'] for chunk in chunks) == text
+    _assert_chunks_cover(text, chunks, 5, 0)
 
 def test_chunk_text_multiple_chunks_with_overlap():
     text = "The quick brown fox jumps over the lazy dog. This is another sentence."
     chunks = chunk_text(text, chunk_size=5, overlap=2)
-    assert len(chunks) == 4
-    assert chunks[0]['content'] == "The quick brown fox jumps"
-    assert chunks[1]['content'] == "fox jumps over the lazy"
-    assert chunks[2]['content'] == "the lazy dog. This is"
-    assert chunks[3]['content'] == "This is another sentence."
-
-def test_chunk_text_exact_chunk_size():
-    text = "One two three four five six seven eight nine ten"
-    chunks = chunk_text(text, chunk_size=5, overlap=0)
-    assert len(chunks) == 2
-    assert chunks[0]['content'] == "One two three four five"
-    assert chunks[1]['content'] == "six seven eight nine ten"
-
-def test_chunk_text_large_overlap():
-    text = "A B C D E F G H I J K L M N O P Q R S T U V W X Y Z"
-    chunks = chunk_text(text, chunk_size=5, overlap=4)
-    assert len(chunks) == 22 # Corrected from 6
-    assert chunks[0]['content'] == "A B C D E"
-    assert chunks[1]['content'] == "B C D E F"
-    assert chunks[2]['content'] == "C D E F G"
-    assert chunks[3]['content'] == "D E F G H"
-    assert chunks[4]['content'] == "E F G H I"
-    assert chunks[5]['content'] == "F G H I J"
-    assert chunks[21]['content'] == "V W X Y Z" # Added assertion for the last chunk
-
-def test_chunk_text_character_positions():
-    text = "Word1 Word2 Word3 Word4 Word5 Word6"
-    chunks = chunk_text(text, chunk_size=2, overlap=1)
-    
-    # Chunk 1: "Word1 Word2"
-    assert chunks[0]['content'] == "Word1 Word2"
-    assert chunks[0]['start_char'] == 0
-    assert chunks[0]['end_char'] == len("Word1 Word2")
-
-    # Chunk 2: "Word2 Word3" (overlap on Word2)
-    assert chunks[1]['content'] == "Word2 Word3"
-    assert chunks[1]['start_char'] == len("Word1 ")
-    assert chunks[1]['end_char'] == 17 # Corrected from len("Word1 Word2 Word3") - len(" Word1")
-
-    # Chunk 3: "Word3 Word4"
-    assert chunks[2]['content'] == "Word3 Word4"
-    assert chunks[2]['start_char'] == 12 # Corrected from len("Word1 Word2 ")
-    assert chunks[2]['end_char'] == 23 # Corrected from len("Word1 Word2 Word3 Word4") - len(" Word1 Word2")
-
-    # Chunk 4: "Word4 Word5"
-    assert chunks[3]['content'] == "Word4 Word5"
-    assert chunks[3]['start_char'] == 18 # Corrected from len("Word1 Word2 Word3 ")
-    assert chunks[3]['end_char'] == 29 # Corrected from len("Word1 Word2 Word3 Word4 Word5") - len(" Word1 Word2 Word3")
-
-    # Chunk 5: "Word5 Word6"
-    assert chunks[4]['content'] == "Word5 Word6"
-    assert chunks[4]['start_char'] == 24 # Corrected from len("Word1 Word2 Word3 Word4 ")
-    assert chunks[4]['end_char'] == 35 # Corrected from len("Word1 Word2 Word3 Word4 Word5 Word6") - len(" Word1 Word2 Word3 Word4")
+    assert chunks[0]['content'].startswith("The quick")
+    assert chunks[-1]['content'].endswith("another sentence.")
+    _assert_chunks_cover(text, chunks, 5, 2)
+
+def test_chunk_text_prefers_paragraph_and_sentence_ends():
+    paragraphs = [
+        f"Role {i} was about building things. It went well. The team grew and shipped a lot. "
+        f"Customers were happy with the results."
+        for i in range(20)
+    ]
+    text = '\n\n'.join(paragraphs)
+    chunks = chunk_text(text, chunk_size=30, overlap=0)
+    assert len(chunks) > 1
+    assert all(chunk['content'].endswith('.') for chunk in chunks)
+    _assert_chunks_cover(text, chunks, 30, 0)
+
+def test_chunk_text_cuts_do_not_depend_on_what_came_before():
+    words = [f"w{i}" for i in range(400)]
+    chunks = chunk_text(' '.join(words), chunk_size=20, overlap=0)
+    shifted = chunk_text(' '.join(["new", "words"] + words), chunk_size=20, overlap=0)
+    # After the first few chunks the boundaries are the same again
+    assert [chunk['content'] for chunk in chunks[3:]] == [chunk['content'] for chunk in shifted[-len(chunks) + 3:]]
+
+def test_chunk_text_positions_match_joined_prefix():
+    words = [f"w{i}" * (i % 7 + 1) for i in range(1000)]
+    text = ' '.join(words)
+    for chunk_size, overlap in [(300, 50), (64, 0), (10, 9)]:
+        chunks = chunk_text(text, chunk_size=chunk_size, overlap=overlap)
+        _assert_chunks_cover(text, chunks, chunk_size, overlap)
 
 def test_chunk_text_single_word_chunk_size():
     text = "One Two Three Four Five"
@@ -226,7 +320,81 @@ def test_chunk_text_single_word_chunk_size():
 def test_chunk_text_overlap_greater_than_chunk_size():
     text = "This is a test sentence."
     chunks = chunk_text(text, chunk_size=3, overlap=5) # Overlap > chunk_size, should still work
-    assert len(chunks) == 3
     assert chunks[0]['content'] == "This is a"
-    assert chunks[1]['content'] == "is a test"
-    assert chunks[2]['content'] == "a test sentence."
+    assert chunks[-1]['content'].endswith("sentence.")
+    _assert_chunks_cover(text, chunks, 3, 5)
+
+def test_unit_normalize():
+    assert unit_normalize([3.0, 4.0]) == pytest.approx([0.6, 0.8])
+
+def test_unit_normalize_zero_vector():
+    with pytest.raises(ValueError):
+        unit_normalize([0.0, 0.0])
+
+def test_vector_to_list_accepts_every_loaded_vector_type():
+    import numpy as np
+    from pgvector import HalfVector
+    assert vector_to_list([0.5, 1.0]) == [0.5, 1.0]
+    assert vector_to_list(np.array([0.5, 1.0], dtype=np.float32)) == [0.5, 1.0]
+    assert vector_to_list(HalfVector([0.5, 1.0])) == [0.5, 1.0]
+    assert vector_to_list(None) is None
+
+def _pages(count):
+    return '\f'.join(
+        f"Jane Doe | jane@example.com\n\nRole {i}:   built   things.\nDetails of role {i}.\n\n\n\nPage {i} of {count}\n"
+        for i in range(1, count + 1)
+    )
+
+def test_normalize_extracted_text_strips_repeated_headers_and_page_numbers():
+    text, stats = normalize_extracted_text(_pages(4))
+    assert "jane@example.com" not in text
+    assert "Page" not in text
+    assert text == "\n\n".join(
+        f"Role {i}: built things.\nDetails of role {i}." for i in range(1, 5)
+    )
+    assert stats['repeated_lines_removed'] == 8
+    assert stats['chars_removed'] == len(_pages(4)) - len(text)
+    assert stats['tokens_removed'] > 0
+
+def test_normalize_extracted_text_keeps_lines_on_short_documents():
+    # Two pages aren't enough to tell a header from content
+    text, stats = normalize_extracted_text(_pages(2))
+    assert text.count("Jane Doe | jane@example.com") == 2
+    assert "Page 2 of 2" in text
+    assert stats['repeated_lines_removed'] == 0
+
+def test_normalize_extracted_text_ignores_the_trailing_form_feed():
+    # pdfminer ends the last page with a form feed too: "p1\fp2\f" is two pages
+    text, stats = normalize_extracted_text(_pages(2) + '\f')
+    assert text.count("Jane Doe | jane@example.com") == 2
+    assert stats['repeated_lines_removed'] == 0
+
+    text, stats = normalize_extracted_text(_pages(3) + '\f')
+    assert "Page" not in text
+    assert stats['repeated_lines_removed'] == 6
+
+def test_normalize_extracted_text_keeps_numbers_that_are_not_page_numbers():
+    # A single page has no page numbers to strip
+    text, stats = normalize_extracted_text("Founded\n2019\nStill going")
+    assert text == "Founded\n2019\nStill going"
+    assert stats['repeated_lines_removed'] == 0
+
+    # On longer documents only the first and last line of a page can be one
+    pages = '\f'.join(
+        f"{role}\n{2015 + i}\nBuilt {role.lower()} things.\n{i}"
+        for i, role in enumerate(["Engineer", "Lead", "Manager", "Director"], start=1)
+    )
+    text, stats = normalize_extracted_text(pages)
+    assert all(str(2015 + i) in text for i in range(1, 5))
+    assert stats['repeated_lines_removed'] == 4
+
+def test_normalize_extracted_text_collapses_whitespace():
+    text, stats = normalize_extracted_text("Just  a\t short\n\n\n\ntext  ")
+    assert text == "Just a short\n\ntext"
+    assert stats['repeated_lines_removed'] == 0
+
+def test_hash_file():
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    uploaded = SimpleUploadedFile("cv.txt", b"abc")
+    assert hash_file(uploaded) == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
+    assert uploaded.read() == b"abc"  # rewound for saving
@@ -51,6 +51,99 @@ def test_document_upload_success(api_client):
         # Verify that the Celery task was called
         mock_delay.assert_called_once_with(document.id)
 
+@pytest.mark.django_db
+def test_document_replace(api_client):
+    from django.contrib.auth import get_user_model
+    user = get_user_model().objects.create_user(username='replacer', password='testpass')
+    api_client.force_authenticate(user=user)
+    document = Document.objects.create(
+        owner=user,
+        title='CV',
+        file=SimpleUploadedFile("cv_v1.txt", b"Version one"),
+        processing_status='completed',
+    )
+    url = reverse('document-replace', kwargs={'document_id': document.id})
+
+    with patch('ai_interviewee.tasks.process_document_task.delay') as mock_delay:
+        response = api_client.put(
+            url,
+            {'file': SimpleUploadedFile("cv_v2.txt", b"Version two", content_type="text/plain")},
+            format='multipart',
+        )
+
+    assert response.status_code == 200
+    document.refresh_from_db()
+    assert "cv_v2" in document.file.name
+    assert document.file_size == len(b"Version two")
+    assert document.processing_status == 'pending'
+    mock_delay.assert_called_once_with(document.id)
+
+@pytest.mark.django_db
+def test_document_replace_other_users_document(api_client):
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+    owner = User.objects.create_user(username='owner', password='testpass')
+    api_client.force_authenticate(user=User.objects.create_user(username='intruder', password='testpass'))
+    document = Document.objects.create(owner=owner, title='CV')
+
+    response = api_client.put(
+        reverse('document-replace', kwargs={'document_id': document.id}),
+        {'file': SimpleUploadedFile("cv.txt", b"Mine now", content_type="text/plain")},
+        format='multipart',
+    )
+
+    assert response.status_code == 404
+
+@pytest.mark.django_db
+def test_document_batch_upload(api_client, settings, tmp_path):
+    import io
+    import zipfile
+    from django.contrib.auth import get_user_model
+    settings.MEDIA_ROOT = str(tmp_path)
+    user = get_user_model().objects.create_user(username='candidate', password='testpass')
+    api_client.force_authenticate(user=user)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zip_file:
+        zip_file.writestr('projects/search.txt', 'Built a search engine.')
+        zip_file.writestr('projects/diagram.png', 'not a document')
+
+    with patch('ai_interviewee.services.ingestion_scheduler.group') as mock_group:
+        response = api_client.post(reverse('document-batch-upload'), {
+            'files': [
+                SimpleUploadedFile('cv.txt', b'Ten years of Python.', content_type='text/plain'),
+                SimpleUploadedFile('projects.zip', archive.getvalue(), content_type='application/zip'),
+            ],
+            'document_type': 'project_explanation',
+        }, format='multipart')
+
+    assert response.status_code == 201
+    batch = response.data['batch']
+    assert batch['progress']['total'] == 2
+    assert batch['progress']['pending'] == 2
+    assert batch['skipped'] == [{'file': 'projects/diagram.png', 'reason': 'unsupported file type'}]
+    documents = Document.objects.filter(batch_id=batch['id'])
+    assert sorted(documents.values_list('title', flat=True)) == ['cv', 'search']
+    assert {document.document_type for document in documents} == {'project_explanation'}
+    assert len(list(mock_group.call_args.args[0])) == 2
+
+    Document.objects.filter(batch_id=batch['id'], title='cv').update(processing_status='completed')
+    progress = api_client.get(reverse('document-batch', kwargs={'batch_id': batch['id']})).data['progress']
+    assert progress['completed'] == 1
+    assert progress['percent_complete'] == 50.0
+
+@pytest.mark.django_db
+def test_document_batch_upload_without_documents(api_client, settings, tmp_path):
+    from django.contrib.auth import get_user_model
+    settings.MEDIA_ROOT = str(tmp_path)
+    api_client.force_authenticate(user=get_user_model().objects.create_user(username='empty', password='testpass'))
+
+    response = api_client.post(reverse('document-batch-upload'), {
+        'files': [SimpleUploadedFile('photo.png', b'\x89PNG', content_type='image/png')],
+    }, format='multipart')
+
+    assert response.status_code == 400
+    assert response.data['skipped'][0]['file'] == 'photo.png'
+
 from ai_interviewee.models import UserProfile
 
 @pytest.mark.django_db
@@ -60,8 +153,8 @@ class TestRagQueryView:
     def setup(self, api_client):
         self.client = api_client
 
-        # Patch OpenAIEmbeddingService.generate_embedding
-        self.embedding_patcher = patch('ai_interviewee.services.rag_service.OpenAIEmbeddingService.generate_embedding')
+        # Patch OpenAIEmbeddingService.generate_embedding, used by the OpenAI embedding provider
+        self.embedding_patcher = patch('ai_interviewee.services.openai_embedding_service.OpenAIEmbeddingService.generate_embedding')
         self.mock_generate_embedding = self.embedding_patcher.start()
         self.mock_generate_embedding.return_value = [0.1] * 1536  # Dummy embedding
 
@@ -116,7 +209,7 @@ class TestRagQueryView:
         DocumentChunk.objects.create(
             document=self.document, # Link to the created document
             content="This is a relevant document chunk.",
-            embedding=[0.1] * 1536,
+            embedding=[1.0] + [0.0] * 1535,  # stored embeddings are unit length
             chunk_index=0
         )
 
@@ -134,6 +227,26 @@ class TestRagQueryView:
         self.mock_generate_embedding.assert_not_called()
         self.mock_chat_completions_create.assert_not_called()
 
+    def test_rag_query_filters(self):
+        with patch('ai_interviewee.views.RagService') as mock_rag_service_class:
+            mock_rag_service_class.return_value.call.return_value = "Filtered answer"
+            response = self.client.get(
+                f'{self.url}?question=Hello&document_type=cv&document_type=project_explanation'
+                '&tags=python&is_public=true'
+            )
+
+        assert response.status_code == 200
+        filters = mock_rag_service_class.return_value.call.call_args.kwargs['filters']
+        assert filters.document_types == ['cv', 'project_explanation']
+        assert filters.tags == ['python']
+        assert filters.is_public is True
+
+    def test_rag_query_invalid_document_type(self):
+        response = self.client.get(f'{self.url}?question=Hello&document_type=novel')
+        assert response.status_code == 400
+        assert 'document_type' in response.data
+        self.mock_generate_embedding.assert_not_called()
+
     def test_rag_query_rag_service_exception(self):
         # Simulate an error within the RagService's call method
         self.mock_generate_embedding.side_effect = Exception("Embedding service error")